@@ -1,22 +1,49 @@
 """
 Image analysis for brand compliance using GPT-4 Vision.
 """
-from openai import OpenAI
 from typing import Dict, Any, Optional
+import asyncio
 import base64
-from io import BytesIO
-from PIL import Image
+import threading
+import time
 from config import settings
-from rag.retrieval import retrieval_manager
+from rag.embeddings import get_embedding_manager_async
+from rag.guidelines import guidelines_store
+from rag.retrieval import get_retrieval_manager, get_retrieval_manager_async
+from rag.tokenizer import truncate_tokens
+
+
+# Guideline searches behind the snapshot: (query, top_k)
+_COLOR_QUERY = ("brand colors palette hex codes vista blue dusk lawn", 8)
+_TYPOGRAPHY_QUERY = ("typography fonts saans helvetica arial", 5)
+_LOGO_QUERY = ("logo usage guidelines minimum size clearspace", 3)
+_BUTTON_QUERY = ("Blocks 3.0 button component guidelines", 5)
+_COLOR_SOURCES_QUERY = ("brand colors", settings.top_k_results)
+_TYPOGRAPHY_SOURCES_QUERY = ("typography fonts", settings.top_k_results)
+
+# Token caps for document excerpts in the prompt
+_TYPOGRAPHY_EXCERPT_TOKENS = 120
+_LOGO_EXCERPT_TOKENS = 100
+_EXAMPLE_EXCERPT_TOKENS = 75
+_BUTTON_EXCERPT_TOKENS = 100
 
 
 class BrandAnalyzer:
     """Analyzes images for brand compliance using GPT-4 Vision."""
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self._client = None
+        self._refresh_lock = asyncio.Lock()
     
-    def analyze_image(
+    @property
+    def client(self):
+        """OpenAI client, created on first use (the openai package is slow to import)."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=settings.openai_api_key)
+        return self._client
+    
+    async def analyze_image(
         self,
         image_data: bytes,
         image_type: str = "image/png",
@@ -35,15 +62,15 @@ class BrandAnalyzer:
         Returns:
             Analysis results dictionary
         """
-        # Get brand guidelines from vector store
-        brand_context = self._get_brand_guidelines()
-        
         # Detect creative type if not provided
         if not creative_type:
             creative_type = self._detect_creative_type(image_data)
         
-        # Get relevant examples
-        examples_context = self._get_examples(creative_type)
+        # Brand guidelines, examples and sources come precomputed from the last sync
+        guidelines = await self.get_guidelines()
+        brand_context = guidelines["brand_context"]
+        examples_context = guidelines["examples_context"].get(creative_type, guidelines["examples_context"]["other"])
+        sources = guidelines["sources"]
         
         # Encode image to base64
         base64_image = base64.b64encode(image_data).decode('utf-8')
@@ -52,7 +79,7 @@ class BrandAnalyzer:
         prompt = custom_prompt or self._build_analysis_prompt(brand_context, examples_context, creative_type)
         
         # Call GPT-4o (supports vision)
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model="gpt-4o",
             messages=[
                 {
@@ -79,24 +106,115 @@ class BrandAnalyzer:
         # Parse the analysis into structured format
         result = {
             "analysis": analysis_text,
-            "sources": self._get_relevant_sources(),
+            "sources": sources,
             "recommendations": self._extract_recommendations(analysis_text)
         }
         
         return result
     
-    def _get_brand_guidelines(self) -> str:
+    async def get_guidelines(self) -> Dict[str, Any]:
+        """
+        Get the guidelines snapshot for the current collection, rebuilding it
+        only if the collection changed since it was built.
+        
+        Returns:
+            Snapshot with brand_context, examples_context (per creative type) and sources
+        """
+        embedding_manager = await get_embedding_manager_async()
+        snapshot = guidelines_store.get(embedding_manager.collection_version)
+        if snapshot is not None:
+            return snapshot
+        
+        async with self._refresh_lock:
+            # Another request may have rebuilt it while we waited
+            snapshot = guidelines_store.get(embedding_manager.collection_version)
+            if snapshot is not None:
+                return snapshot
+            return await self._build_guidelines()
+    
+    async def refresh_guidelines(self) -> Dict[str, Any]:
         """
-        Retrieve brand guidelines from the vector store.
+        Rebuild the guidelines snapshot from the collection (called after syncs).
+        
+        Returns:
+            The new snapshot
+        """
+        async with self._refresh_lock:
+            return await self._build_guidelines()
+    
+    async def _build_guidelines(self) -> Dict[str, Any]:
+        """
+        Run every retrieval the analysis prompt needs as one batch (a single
+        embedding request, a single unfiltered vector store query and a single
+        filtered get for the approved examples) and store the formatted
+        sections for each creative type.
+        
+        Returns:
+            The new snapshot
+        """
+        retrieval_manager = await get_retrieval_manager_async()
+        
+        # Read the version first so writes during the build leave the snapshot stale
+        collection_version = retrieval_manager.embedding_manager.collection_version
+        
+        searches = [
+            _COLOR_QUERY,
+            _TYPOGRAPHY_QUERY,
+            _LOGO_QUERY,
+            _BUTTON_QUERY,
+            _COLOR_SOURCES_QUERY,
+            _TYPOGRAPHY_SOURCES_QUERY
+        ]
+        queries = [query for query, _ in searches]
+        example_types = ["email", "ad"]
+        
+        # Embed the example queries alongside the rest so search_examples_many hits the query cache
+        await retrieval_manager.embed_queries(
+            queries + [retrieval_manager.example_query(t) for t in example_types]
+        )
+        
+        results, examples = await asyncio.gather(
+            retrieval_manager.search_many(
+                queries,
+                top_k=[top_k for _, top_k in searches],
+                include=["documents", "metadatas"]
+            ),
+            retrieval_manager.search_examples_many(example_types, top_k=3)
+        )
+        
+        color_results, typo_results, logo_results, button_results, color_sources, typo_sources = results
+        
+        examples_context = {
+            t: self._format_examples(t, found, button_results)
+            for t, found in zip(example_types, examples)
+        }
+        examples_context["other"] = self._format_examples("other", None, button_results)
+        
+        snapshot = {
+            "collection_version": collection_version,
+            "built_at": time.time(),
+            "brand_context": self._format_brand_guidelines(color_results, typo_results, logo_results),
+            "examples_context": examples_context,
+            "sources": self._format_relevant_sources(color_sources, typo_sources)
+        }
+        await asyncio.to_thread(guidelines_store.save, snapshot)
+        return snapshot
+    
+    def _format_brand_guidelines(
+        self,
+        color_results: Dict[str, Any],
+        typo_results: Dict[str, Any],
+        logo_results: Dict[str, Any]
+    ) -> str:
+        """
+        Format brand guidelines from the color, typography and logo searches.
         
         Returns:
             Formatted brand guidelines text
         """
         guidelines = []
         
-        # Get comprehensive color information
-        color_results = retrieval_manager.search("brand colors palette hex codes vista blue dusk lawn", top_k=8)
-        
+        # Comprehensive color information
         if color_results['documents']:
             guidelines.append("=== BRAND COLORS ===")
             guidelines.append("Nextdoor Brand Color Palette with Hex Codes:")
@@ -114,25 +232,21 @@ class BrandAnalyzer:
                                 seen_colors.add(line.strip())
         
         # Get typography guidelines
-        typo_results = retrieval_manager.search("typography fonts saans helvetica arial", top_k=5)
-        
         if typo_results['documents']:
             guidelines.append("")
             guidelines.append("=== TYPOGRAPHY ===")
             for doc in typo_results['documents'][:3]:
                 if 'saans' in doc.lower() or 'font' in doc.lower() or 'typeface' in doc.lower():
-                    guidelines.append(doc[:500])  # First 500 chars
+                    guidelines.append(truncate_tokens(doc, _TYPOGRAPHY_EXCERPT_TOKENS))
                     break
         
         # Get logo guidelines  
-        logo_results = retrieval_manager.search("logo usage guidelines minimum size clearspace", top_k=3)
-        
         if logo_results['documents']:
             guidelines.append("")
             guidelines.append("=== LOGO GUIDELINES ===")
             for doc in logo_results['documents'][:2]:
                 if 'logo' in doc.lower() or '19px' in doc or 'minimum' in doc.lower():
-                    guidelines.append(doc[:400])
+                    guidelines.append(truncate_tokens(doc, _LOGO_EXCERPT_TOKENS))
                     break
         
         return "\n".join(guidelines) if guidelines else "No brand guidelines found in the system."
@@ -167,22 +281,27 @@ class BrandAnalyzer:
         except:
             return "other"
     
-    def _get_examples(self, creative_type: str) -> str:
+    def _format_examples(
+        self,
+        creative_type: str,
+        examples: Optional[Dict[str, Any]],
+        button_examples: Dict[str, Any]
+    ) -> str:
         """
-        Get approved example designs for the creative type.
+        Format approved example designs for the creative type.
         
         Args:
             creative_type: "email", "ad", or "other"
+            examples: Example search results (None when the type has no examples)
+            button_examples: Blocks 3.0 button search results
             
         Returns:
             Formatted examples context
         """
         context = ""
         
-        # Get creative type specific examples
-        if creative_type in ["email", "ad"]:
-            examples = retrieval_manager.search_examples(creative_type, top_k=3)
-            
+        # Creative type specific examples
+        if examples is not None:
             if examples['documents']:
                 context += f"\n\n=== APPROVED {creative_type.upper()} EXAMPLES ===\n"
                 context += f"Reference these approved Nextdoor {creative_type} designs:\n\n"
@@ -192,14 +311,13 @@ class BrandAnalyzer:
                     context += f"From: {meta.get('file_name', 'Unknown file')}\n"
                     context += f"Link: {meta.get('url', '')}\n"
                     # Add snippet of content
-                    if len(doc) > 300:
-                        context += f"Details: {doc[:300]}...\n\n"
+                    snippet = truncate_tokens(doc, _EXAMPLE_EXCERPT_TOKENS)
+                    if snippet != doc:
+                        context += f"Details: {snippet}...\n\n"
                     else:
                         context += f"Details: {doc}\n\n"
         
         # Always include button/component guidelines from Blocks 3.0 kit
-        button_examples = retrieval_manager.search("Blocks 3.0 button component guidelines", top_k=5)
-        
         if button_examples['documents']:
             context += f"\n\n=== BUTTON COMPONENT GUIDELINES (Blocks 3.0 Kit) ===\n"
             context += f"Reference these button component standards for any buttons in the design:\n\n"
@@ -207,8 +325,9 @@ class BrandAnalyzer:
             for doc, meta in zip(button_examples['documents'], button_examples['metadatas']):
                 context += f"Component: {meta.get('name', 'Button Component')}\n"
                 context += f"From: {meta.get('file_name', 'Blocks 3.0 Kit')}\n"
-                if len(doc) > 400:
-                    context += f"Guidelines: {doc[:400]}...\n\n"
+                snippet = truncate_tokens(doc, _BUTTON_EXCERPT_TOKENS)
+                if snippet != doc:
+                    context += f"Guidelines: {snippet}...\n\n"
                 else:
                     context += f"Guidelines: {doc}\n\n"
         
@@ -228,6 +347,10 @@ class BrandAnalyzer:
         """
         creative_type_label = "creative" if creative_type == "other" else creative_type
         
+        # Keep the prompt size predictable however much the snapshot holds
+        brand_context = truncate_tokens(brand_context, settings.analysis_guidelines_tokens)
+        examples_context = truncate_tokens(examples_context, settings.analysis_examples_tokens)
+        
         return f"""You are a brand compliance expert for Nextdoor analyzing {creative_type_label} designs 
 against Nextdoor's brand guidelines.
 
@@ -295,15 +418,15 @@ IMPORTANT:
 - Be specific and actionable in your feedback
 """
     
-    def _get_relevant_sources(self) -> list:
+    def _format_relevant_sources(self, color_results: Dict[str, Any], typo_results: Dict[str, Any]) -> list:
         """
-        Get relevant brand guideline sources.
+        Format relevant brand guideline sources.
         
         Returns:
             List of source citations
         """
-        color_sources = retrieval_manager.get_sources("brand colors")[:3]
-        typo_sources = retrieval_manager.get_sources("typography fonts")[:2]
+        color_sources = get_retrieval_manager().format_sources(color_results)[:3]
+        typo_sources = get_retrieval_manager().format_sources(typo_results)[:2]
         
         return color_sources + typo_sources
     
@@ -344,6 +467,9 @@ IMPORTANT:
             True if valid image, False otherwise
         """
         try:
+            from PIL import Image
+            from io import BytesIO
+            
             image = Image.open(BytesIO(image_data))
             image.verify()
             return True
@@ -351,6 +477,17 @@ IMPORTANT:
             return False
 
 
-# Global brand analyzer instance
-brand_analyzer = BrandAnalyzer()
+# Global brand analyzer instance, created on first use
+_brand_analyzer: Optional[BrandAnalyzer] = None
+_brand_analyzer_lock = threading.Lock()
+
+
+def get_brand_analyzer() -> BrandAnalyzer:
+    """Get the global brand analyzer, creating it on first use."""
+    global _brand_analyzer
+    if _brand_analyzer is None:
+        with _brand_analyzer_lock:
+            if _brand_analyzer is None:
+                _brand_analyzer = BrandAnalyzer()
+    return _brand_analyzer
 
@@ -0,0 +1,320 @@
+"""
+Offline retrieval benchmark: recall@k, MRR and latency percentiles.
+
+Builds a throwaway index from recorded Figma and Google Slides payloads
+(benchmarks/fixtures) with the deterministic local hashing embedder, then
+runs a labeled query set through RetrievalManager. Recall and MRR score
+retrieve(), the reranked results the chat endpoints build their context
+from; the plain search() ranking is reported next to it. Nothing touches
+the network or the real ChromaDB directory.
+
+Usage (from backend/):
+    python -m benchmarks.retrieval
+    python -m benchmarks.retrieval --top-k 5 --repeat 10 --json
+    python -m benchmarks.retrieval --min-recall 0.8 --min-mrr 0.6  # exit 1 on regression
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+STAGES = ["embedding", "chroma_query", "search", "build_context"]
+
+
+def configure_environment(persist_dir: str, provider: str) -> None:
+    """
+    Point the app settings at a scratch index. Must run before config is imported,
+    since settings are read at import time.
+    """
+    os.environ["CHROMA_PERSIST_DIRECTORY"] = persist_dir
+    os.environ["EMBEDDING_PROVIDER"] = provider
+    # Measure real embedding work on every repeat
+    os.environ["QUERY_EMBEDDING_CACHE_SIZE"] = "0"
+    os.environ["QUERY_EMBEDDING_CACHE_PERSIST"] = "false"
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    os.environ.setdefault("FIGMA_ACCESS_TOKEN", "offline-benchmark")
+
+
+def load_fixture(name: str) -> Dict[str, Any]:
+    """Load a JSON fixture from the fixtures directory."""
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def matches_label(metadata: Dict[str, Any], label: Dict[str, Any]) -> bool:
+    """Whether a result's metadata has every field value of a relevance label."""
+    return all(metadata.get(field) == value for field, value in label.items())
+
+
+async def build_index() -> Dict[str, int]:
+    """
+    Ingest the recorded payloads the same way the sync endpoints do.
+    
+    Returns:
+        Number of documents written per source
+    """
+    from integrations.figma import FigmaClient
+    from rag.embeddings import get_embedding_manager
+    
+    class RecordedFigmaClient(FigmaClient):
+        """FigmaClient that answers from recorded API payloads."""
+        
+        def __init__(self, files: List[Dict[str, Any]]):
+            super().__init__(access_token="recorded")
+            self._files = {entry["file_key"]: entry for entry in files}
+        
+        def get_file(self, file_key: str, *args, **kwargs) -> Dict[str, Any]:
+            return self._files[file_key]["file"]
+        
+        @contextmanager
+        def get_file_stream(self, file_key: str):
+            yield io.BytesIO(json.dumps(self._files[file_key]["file"]).encode("utf-8"))
+        
+        def get_file_styles(self, file_key: str) -> Dict[str, Any]:
+            return self._files[file_key]["styles"]
+        
+        def get_file_components(self, file_key: str) -> Dict[str, Any]:
+            return self._files[file_key]["components"]
+    
+    embedding_manager = get_embedding_manager()
+    figma_files = load_fixture("figma_files.json")["files"]
+    figma = RecordedFigmaClient(figma_files)
+    figma_ids = []
+    for entry in figma_files:
+        file_key = entry["file_key"]
+        figma_ids += await embedding_manager.add_figma_styles(figma.extract_design_tokens(file_key))
+        figma_ids += await embedding_manager.add_figma_components(figma.extract_component_info(file_key), file_key)
+        figma_ids += await embedding_manager.add_figma_page_content(figma.extract_page_content(file_key))
+    
+    slides_ids = []
+    for presentation in recorded_presentations():
+        slides_ids += await embedding_manager.add_slides_content(presentation)
+    
+    return {"figma": len(figma_ids), "google_slides": len(slides_ids)}
+
+
+def recorded_presentations() -> List[Dict[str, Any]]:
+    """Run the recorded Slides payloads through GoogleSlidesClient's extraction."""
+    from integrations.google_slides import GoogleSlidesClient
+    
+    class RecordedSlidesClient(GoogleSlidesClient):
+        """GoogleSlidesClient that answers from recorded API payloads."""
+        
+        def __init__(self, presentations: List[Dict[str, Any]]):
+            # No credentials, no Google API services
+            self.credentials_path = None
+            self.slides_service = None
+            self.drive_service = None
+            self._presentations = {entry["file"]["id"]: entry for entry in presentations}
+        
+        def list_presentations_in_folder(self, folder_id=None, recursive: bool = True) -> List[Dict[str, Any]]:
+            return [entry["file"] for entry in self._presentations.values()]
+        
+        def get_presentation(self, presentation_id: str) -> Dict[str, Any]:
+            return self._presentations[presentation_id]["presentation"]
+    
+    client = RecordedSlidesClient(load_fixture("slides_presentations.json")["presentations"])
+    return client.get_all_presentations_content()
+
+
+async def run_queries(queries: List[Dict[str, Any]], top_k: int, repeat: int) -> Dict[str, Any]:
+    """
+    Run every labeled query, timing each retrieval stage.
+    The build_context stage times retrieve() plus formatting, and its
+    results are the ones scored; search() results are scored separately.
+    
+    Args:
+        queries: Labeled queries, each with "query" and "relevant" metadata filters
+        top_k: Number of results scored for recall and MRR
+        repeat: Number of timed passes over the query set
+        
+    Returns:
+        Per-query relevance results and per-stage latency samples (ms)
+    """
+    from rag.embeddings import get_embedding_manager
+    from rag.retrieval import get_retrieval_manager
+    
+    embedding_manager = get_embedding_manager()
+    retrieval_manager = get_retrieval_manager()
+    
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    per_query = []
+    
+    # Warm up lazy state (full-text backfill, tokenizer) outside the timed passes
+    await retrieval_manager.search(queries[0]["query"], top_k=top_k)
+    
+    for run in range(repeat):
+        for item in queries:
+            query = item["query"]
+            
+            start = time.perf_counter()
+            embedding = await embedding_manager.create_embedding(query)
+            timings["embedding"].append((time.perf_counter() - start) * 1000)
+            
+            start = time.perf_counter()
+            embedding_manager.design_collection.query(
+                query_embeddings=[embedding],
+                n_results=top_k,
+                include=["documents", "metadatas", "distances"]
+            )
+            timings["chroma_query"].append((time.perf_counter() - start) * 1000)
+            
+            start = time.perf_counter()
+            search_results = await retrieval_manager.search(query, top_k=top_k)
+            timings["search"].append((time.perf_counter() - start) * 1000)
+            
+            # The same work as build_context(), keeping the results for scoring
+            start = time.perf_counter()
+            retrieval = await retrieval_manager.retrieve(query, top_k)
+            retrieval_manager.format_context(retrieval["results"])
+            timings["build_context"].append((time.perf_counter() - start) * 1000)
+            
+            if run > 0:
+                continue
+            
+            results = retrieval["results"]
+            recall, reciprocal_rank = score(results["metadatas"], item["relevant"])
+            search_recall, search_reciprocal_rank = score(search_results["metadatas"], item["relevant"])
+            per_query.append({
+                "query": query,
+                "recall": recall,
+                "reciprocal_rank": reciprocal_rank,
+                "retrieved": [metadata.get("name") or _slide_label(metadata) for metadata in results["metadatas"]],
+                "search_recall": search_recall,
+                "search_reciprocal_rank": search_reciprocal_rank
+            })
+    
+    return {"queries": per_query, "timings": timings}
+
+
+def score(metadatas: List[Dict[str, Any]], relevant: List[Dict[str, Any]]) -> Tuple[float, float]:
+    """
+    Score a ranked result list against relevance labels.
+    
+    Args:
+        metadatas: Metadata of the results, in rank order
+        relevant: Relevance labels
+        
+    Returns:
+        (recall, reciprocal rank of the first relevant result)
+    """
+    hits = [any(matches_label(metadata, label) for label in relevant) for metadata in metadatas]
+    found = sum(1 for label in relevant if any(matches_label(metadata, label) for metadata in metadatas))
+    first_hit = next((rank for rank, hit in enumerate(hits, 1) if hit), None)
+    return (found / len(relevant) if relevant else 0.0), (1.0 / first_hit if first_hit else 0.0)
+
+
+def _slide_label(metadata: Dict[str, Any]) -> str:
+    """Readable label for documents without a name (slides)."""
+    return f"{metadata.get('presentation_name', '?')} #{metadata.get('slide_number', '?')}"
+
+
+def summarize(run: Dict[str, Any], top_k: int) -> Dict[str, Any]:
+    """Aggregate per-query results into recall@k, MRR and latency percentiles."""
+    queries = run["queries"]
+    return {
+        "top_k": top_k,
+        "queries": len(queries),
+        f"recall@{top_k}": round(sum(q["recall"] for q in queries) / len(queries), 4),
+        "mrr": round(sum(q["reciprocal_rank"] for q in queries) / len(queries), 4),
+        "search": {
+            f"recall@{top_k}": round(sum(q["search_recall"] for q in queries) / len(queries), 4),
+            "mrr": round(sum(q["search_reciprocal_rank"] for q in queries) / len(queries), 4)
+        },
+        "latency_ms": {
+            stage: {
+                "p50": round(percentile(samples, 50), 3),
+                "p95": round(percentile(samples, 95), 3),
+                "p99": round(percentile(samples, 99), 3)
+            }
+            for stage, samples in run["timings"].items()
+        }
+    }
+
+
+def print_report(summary: Dict[str, Any], run: Dict[str, Any], index_sizes: Dict[str, int]) -> None:
+    """Print a human-readable report."""
+    top_k = summary["top_k"]
+    print(f"Indexed documents: {index_sizes}")
+    print()
+    print(f"{'query':<48} {'recall':>7} {'rr':>6}  retrieved")
+    for q in run["queries"]:
+        print(f"{q['query'][:48]:<48} {q['recall']:>7.2f} {q['reciprocal_rank']:>6.2f}  {', '.join(map(str, q['retrieved']))}")
+    print()
+    print(f"retrieve  recall@{top_k}: {summary[f'recall@{top_k}']:.4f}   MRR: {summary['mrr']:.4f}   ({summary['queries']} queries)")
+    search = summary["search"]
+    print(f"search    recall@{top_k}: {search[f'recall@{top_k}']:.4f}   MRR: {search['mrr']:.4f}")
+    print()
+    print(f"{'stage':<16} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for stage, stats in summary["latency_ms"].items():
+        print(f"{stage:<16} {stats['p50']:>10.3f} {stats['p95']:>10.3f} {stats['p99']:>10.3f}")
+
+
+async def main(args: argparse.Namespace) -> int:
+    from config import settings
+    
+    top_k = args.top_k or settings.top_k_results
+    queries = load_fixture(args.queries)["queries"]
+    
+    index_sizes = await build_index()
+    run = await run_queries(queries, top_k, args.repeat)
+    summary = summarize(run, top_k)
+    
+    if args.json:
+        print(json.dumps({"index": index_sizes, **summary, "per_query": run["queries"]}, indent=2))
+    else:
+        print_report(summary, run, index_sizes)
+    
+    failed = False
+    if args.min_recall is not None and summary[f"recall@{top_k}"] < args.min_recall:
+        print(f"FAIL: recall@{top_k} {summary[f'recall@{top_k}']:.4f} < {args.min_recall}", file=sys.stderr)
+        failed = True
+    if args.min_mrr is not None and summary["mrr"] < args.min_mrr:
+        print(f"FAIL: MRR {summary['mrr']:.4f} < {args.min_mrr}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline retrieval quality and latency benchmark")
+    parser.add_argument("--top-k", type=int, default=None, help="Results scored per query (default: TOP_K_RESULTS)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the query set")
+    parser.add_argument("--queries", default="queries.json", help="Labeled query fixture in benchmarks/fixtures")
+    parser.add_argument("--provider", default="hashing", help="Embedding provider (hashing is offline and deterministic)")
+    parser.add_argument("--min-recall", type=float, default=None, help="Exit non-zero if recall@k falls below this")
+    parser.add_argument("--min-mrr", type=float, default=None, help="Exit non-zero if MRR falls below this")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--keep-index", action="store_true", help="Keep the scratch index directory")
+    cli_args = parser.parse_args()
+    
+    scratch = tempfile.mkdtemp(prefix="retrieval-bench-")
+    configure_environment(scratch, cli_args.provider)
+    try:
+        exit_code = asyncio.run(main(cli_args))
+    finally:
+        if cli_args.keep_index:
+            print(f"Index kept at {scratch}", file=sys.stderr)
+        else:
+            shutil.rmtree(scratch, ignore_errors=True)
+    sys.exit(exit_code)
@@ -0,0 +1,150 @@
+"""
+Startup benchmark: cold import time of the API and time to first response.
+
+Each sample runs in a fresh interpreter, timing the import of main (what an
+autoscaled or serverless instance pays before it can serve), a first
+/api/health response through the ASGI app, and the first use of the RAG
+singletons (opening ChromaDB). It also reports which heavy dependencies
+were loaded by the import alone.
+
+Usage (from backend/):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --json
+    python -m benchmarks.startup --fail-on-heavy-imports  # exit 1 if importing main loads them
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.retrieval import configure_environment, percentile
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only load once the feature needing them is used
+HEAVY_MODULES = ["chromadb", "openai", "googleapiclient", "PIL", "tiktoken"]
+
+STAGES = ["import_main", "first_health", "first_rag_use"]
+
+# Runs in a fresh interpreter; prints one JSON line of measurements
+_CHILD = """
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - start) * 1000
+heavy = [name for name in HEAVY if name in sys.modules]
+
+async def first_health():
+    messages = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        messages.append(message)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/health", "raw_path": b"/api/health",
+        "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 8000),
+    }
+    await main.app(scope, receive, send)
+    return messages[0]["status"]
+
+start = time.perf_counter()
+status = asyncio.run(first_health())
+health_ms = (time.perf_counter() - start) * 1000
+
+start = time.perf_counter()
+main.get_retrieval_manager()
+rag_ms = (time.perf_counter() - start) * 1000
+
+print(json.dumps({
+    "import_main": import_ms,
+    "first_health": health_ms,
+    "first_rag_use": rag_ms,
+    "health_status": status,
+    "heavy_modules": heavy,
+}))
+"""
+
+
+def run_sample() -> Dict[str, Any]:
+    """Measure one cold start in a fresh interpreter."""
+    code = f"HEAVY = {HEAVY_MODULES!r}\n{_CHILD}"
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate samples into per-stage percentiles."""
+    return {
+        "runs": len(samples),
+        "latency_ms": {
+            stage: {
+                "p50": round(percentile([s[stage] for s in samples], 50), 1),
+                "p95": round(percentile([s[stage] for s in samples], 95), 1),
+                "max": round(max(s[stage] for s in samples), 1)
+            }
+            for stage in STAGES
+        },
+        "heavy_modules_on_import": sorted({name for s in samples for name in s["heavy_modules"]}),
+        "health_status": sorted({s["health_status"] for s in samples})
+    }
+
+
+def print_report(summary: Dict[str, Any]) -> None:
+    """Print a human-readable report."""
+    print(f"Cold starts measured: {summary['runs']}")
+    print()
+    print(f"{'stage':<16} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for stage, stats in summary["latency_ms"].items():
+        print(f"{stage:<16} {stats['p50']:>10.1f} {stats['p95']:>10.1f} {stats['max']:>10.1f}")
+    print()
+    heavy = summary["heavy_modules_on_import"]
+    print(f"Heavy modules loaded by 'import main': {', '.join(heavy) if heavy else 'none'}")
+
+
+def main(args: argparse.Namespace) -> int:
+    samples = [run_sample() for _ in range(args.runs)]
+    summary = summarize(samples)
+    
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+    
+    if args.fail_on_heavy_imports and summary["heavy_modules_on_import"]:
+        print(f"FAIL: importing main loaded {', '.join(summary['heavy_modules_on_import'])}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start benchmark for the API")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--provider", default="hashing", help="Embedding provider (hashing is offline and deterministic)")
+    parser.add_argument("--fail-on-heavy-imports", action="store_true", help="Exit non-zero if importing main loads heavy modules")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    cli_args = parser.parse_args()
+    
+    scratch = tempfile.mkdtemp(prefix="startup-bench-")
+    configure_environment(scratch, cli_args.provider)
+    # Measure startup itself, not the background warm-up racing it
+    os.environ["WARM_UP_ON_STARTUP"] = "false"
+    try:
+        exit_code = main(cli_args)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    sys.exit(exit_code)
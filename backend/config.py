@@ -15,6 +15,11 @@ class Settings(BaseSettings):
     # Figma Configuration
     figma_team_id: Optional[str] = None
     figma_file_keys: Optional[str] = None  # Comma-separated list of file keys
+    figma_file_cache_enabled: bool = True  # Keep downloaded file documents until their version changes
+    figma_file_cache_dir: Optional[str] = None  # Defaults to <chroma_persist_directory>/figma_files
+    figma_file_cache_memory_files: int = 4  # Parsed file documents kept in memory
+    figma_file_cache_check_interval: float = 60  # Seconds a file's version is trusted before checking it again
+    figma_streaming_extraction: bool = True  # Parse page text incrementally from the response stream or the cached copy on disk instead of loading the whole file (needs ijson); downloaded bodies are still written to the file cache
     
     # Google Configuration
     google_application_credentials: Optional[str] = None
@@ -32,9 +37,30 @@ class Settings(BaseSettings):
     app_name: str = "Design Assistant"
     debug: bool = False
     allowed_origins: str = "http://localhost:3000,http://localhost:8000"
+    warm_up_on_startup: bool = True  # Open the index in the background at startup instead of on the first request
     
     # Database Settings
     chroma_persist_directory: str = "./data/chromadb"
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: Optional[str] = None  # Defaults to <chroma_persist_directory>/embedding_cache.sqlite3
+    embedding_cache_max_entries: int = 200000
+    query_embedding_cache_size: int = 1024  # In-memory LRU of query embeddings
+    query_embedding_cache_ttl: float = 86400  # Seconds a query embedding stays in memory; with persistence on, an expired entry is reloaded from disk, not re-embedded
+    query_embedding_cache_persist: bool = True  # Back the query LRU with the embedding cache (which has no TTL: a model's embedding of a text never changes)
+    answer_cache_enabled: bool = True  # Replay answers to repeat questions without calling the chat model
+    answer_cache_size: int = 512  # Cached answers kept in memory
+    answer_cache_ttl: float = 3600  # Seconds before a cached answer expires
+    answer_cache_similarity: float = 0.97  # Minimum cosine similarity for two questions to share an answer
+    reindex_min_count_ratio: float = 0.5  # A full reindex must produce at least this share of the live documents
+    reindex_spot_checks: int = 20  # Documents sampled before a reindex goes live; each must find itself by its own vector
+    reindex_spot_check_min_hit_rate: float = 0.5  # Share of sampled documents that must be found (HNSW is approximate)
+    reindex_gc_grace_seconds: float = 60  # Time in-flight queries get before the replaced collection is deleted
+    reindex_shadow_max_age_seconds: float = 21600  # An unfinished reindex older than this is treated as abandoned and deleted
+    snapshot_path: Optional[str] = None  # Vector store snapshot loaded at startup when the index is empty
+    
+    # Embedding Provider Settings
+    embedding_provider: str = "openai"  # "openai" or "hashing" (local, offline)
+    local_embedding_dim: int = 768  # Vector size for the hashing provider
     
     # OpenAI Settings
     embedding_model: str = "text-embedding-3-small"
@@ -42,11 +68,33 @@ class Settings(BaseSettings):
     vision_model: str = "gpt-4-vision-preview"
     max_tokens: int = 1024  # Reduced for faster, more concise responses
     temperature: float = 0.7
+    embedding_max_concurrency: int = 4  # Parallel embedding requests during ingestion
+    embedding_batch_max_tokens: int = 100000  # Token budget per embedding request
+    embedding_batch_max_items: int = 512  # Inputs per embedding request
+    embedding_max_retries: int = 5  # Retries on 429/5xx before a sync fails
     
     # RAG Settings
-    chunk_size: int = 1000
-    chunk_overlap: int = 200
+    chunk_size: int = 1000  # Tokens per chunk
+    chunk_overlap: int = 200  # Tokens shared between consecutive chunks
     top_k_results: int = 3  # Reduced from 5 for faster responses
+    hybrid_search_enabled: bool = True  # Fuse BM25 full-text results with vector search
+    lexical_index_path: Optional[str] = None  # Defaults to <chroma_persist_directory>/lexical_<collection>.sqlite3, one file per collection generation
+    rrf_k: int = 60  # Reciprocal rank fusion constant
+    lexical_exact_max_words: int = 4  # Longest query treated as an exact name lookup
+    filtered_search_exact_max: int = 256  # Filtered sets up to this size are ranked exactly instead of via the index
+    mmr_enabled: bool = True  # Rerank chat context for diversity (maximal marginal relevance)
+    mmr_fetch_k: int = 10  # Candidates retrieved before reranking
+    mmr_lambda: float = 0.8  # Relevance (by retrieval rank) vs. diversity trade-off (1.0 = relevance only)
+    mmr_duplicate_threshold: float = 0.95  # Cosine similarity at which two chunks count as duplicates
+    
+    # Prompt Budget Settings (tokens)
+    prompt_token_budget: int = 6000  # Whole chat prompt; max_tokens for the reply comes on top
+    context_max_tokens: int = 1500  # Retrieved context when no prompt budget applies
+    prompt_history_tokens: int = 1500  # Conversation history
+    prompt_files_tokens: int = 600  # Figma file listings
+    prompt_examples_tokens: int = 600  # Approved example listings
+    analysis_guidelines_tokens: int = 1500  # Brand guidelines in the image analysis prompt
+    analysis_examples_tokens: int = 1200  # Examples and button guidance in the image analysis prompt
     
     class Config:
         env_file = ".env"
@@ -2,8 +2,14 @@
 Figma API integration for fetching design files, components, and styles.
 """
 import requests
+import threading
+from contextlib import ExitStack, contextmanager
 from typing import List, Dict, Any, Optional
 from config import settings
+from integrations.figma_cache import FigmaFileCache
+from integrations.figma_index import NodeNameIndex
+from integrations.figma_stream import iter_file_events
+from integrations.figma_tree import FileTree
 
 
 class FigmaClient:
@@ -11,30 +17,149 @@ class FigmaClient:
     
     BASE_URL = "https://api.figma.com/v1"
     
-    def __init__(self, access_token: Optional[str] = None):
+    # Pages and their top-level frames (document -> CANVAS -> FRAME)
+    FRAME_SEARCH_DEPTH = 2
+    
+    def __init__(self, access_token: Optional[str] = None, file_cache: Optional[FigmaFileCache] = None):
         self.access_token = access_token or settings.figma_access_token
         self.headers = {
             "X-Figma-Token": self.access_token,
         }
-        self._file_cache: Optional[List[Dict[str, Any]]] = None
-        self._cache_timestamp: Optional[float] = None
-        self._cache_ttl = 3600  # Cache for 1 hour
+        # Team file list for get_all_team_files_with_metadata
+        self._team_files: Optional[List[Dict[str, Any]]] = None
+        self._team_files_timestamp: Optional[float] = None
+        self._team_files_ttl = 3600  # Cache for 1 hour
+        
+        # Full file documents, downloaded again only when the file's version changes
+        self.file_cache = file_cache
+        if self.file_cache is None and settings.figma_file_cache_enabled:
+            self.file_cache = FigmaFileCache()
     
-    def get_file(self, file_key: str) -> Dict[str, Any]:
+    def get_file(self, file_key: str, depth: Optional[int] = None) -> Dict[str, Any]:
         """
         Fetch a Figma file's structure.
+        The local file cache answers when its copy matches the file's current
+        version, which is checked with a depth-limited request at most once
+        per FIGMA_FILE_CACHE_CHECK_INTERVAL.
         
         Args:
             file_key: The Figma file key
+            depth: Only return this many levels of the document tree (1 = pages).
+                A current copy of the full file already in memory is returned
+                instead when there is one, so callers must tolerate deeper trees.
             
         Returns:
             File data including document structure
         """
+        if depth is not None:
+            return self._get_file_partial(file_key, depth)
+        
+        if not self.file_cache:
+            return self._download_file(file_key)
+        
+        # One download per file at a time; concurrent callers wait for the cached copy
+        with self.file_cache.lock_for(file_key):
+            version = self.file_cache.known_version(file_key)
+            if version is None:
+                try:
+                    version = self.get_file_version(file_key)["version"]
+                except requests.RequestException as e:
+                    cached = self.file_cache.get(file_key)
+                    if cached is None:
+                        raise
+                    print(f"Figma version check failed for {file_key}, using cached copy: {e}")
+                    return cached
+            
+            cached = self.file_cache.get(file_key, version)
+            if cached is not None:
+                return cached
+            
+            file_data = self._download_file(file_key)
+            self.file_cache.put(file_key, file_data)
+            return file_data
+    
+    def _download_file(self, file_key: str) -> Dict[str, Any]:
+        """Download a file's full document from the Figma API."""
         url = f"{self.BASE_URL}/files/{file_key}"
         response = requests.get(url, headers=self.headers)
         response.raise_for_status()
         return response.json()
     
+    def _cached_file(self, file_key: str) -> Optional[Dict[str, Any]]:
+        """Get the cached full file if it was recently confirmed to be the current version."""
+        if not self.file_cache:
+            return None
+        version = self.file_cache.known_version(file_key)
+        return self.file_cache.get(file_key, version) if version else None
+    
+    def _get_file_partial(self, file_key: str, depth: int) -> Dict[str, Any]:
+        """Fetch the top levels of a file's tree, unless the full file is already in memory."""
+        # A depth-limited request is far cheaper than loading the full document from disk
+        version = self.file_cache.known_version(file_key) if self.file_cache else None
+        cached = self.file_cache.get_memory(file_key, version) if version else None
+        if cached is not None:
+            return cached
+        
+        url = f"{self.BASE_URL}/files/{file_key}"
+        response = requests.get(url, headers=self.headers, params={"depth": depth})
+        response.raise_for_status()
+        data = response.json()
+        if self.file_cache:
+            self.file_cache.note_version(file_key, data.get("version", ""))
+        return data
+    
+    def get_file_nodes(self, file_key: str, node_ids: List[str], depth: Optional[int] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetch specific nodes (and their subtrees) without downloading the whole file.
+        Served from the cached full file when it is known to be current.
+        
+        Args:
+            file_key: The Figma file key
+            node_ids: IDs of the nodes to fetch
+            depth: Only return this many levels below each node
+            
+        Returns:
+            Dictionary mapping each node ID to its node, or None if it doesn't exist
+        """
+        cached = self._cached_file(file_key)
+        if cached is not None:
+            tree = self._file_tree(file_key, cached)
+            return {node_id: tree.nodes_by_id.get(node_id) for node_id in node_ids}
+        
+        url = f"{self.BASE_URL}/files/{file_key}/nodes"
+        params = {"ids": ",".join(node_ids)}
+        if depth is not None:
+            params["depth"] = depth
+        response = requests.get(url, headers=self.headers, params=params)
+        response.raise_for_status()
+        nodes = response.json().get("nodes", {})
+        return {
+            node_id: (nodes.get(node_id) or {}).get("document")
+            for node_id in node_ids
+        }
+    
+    def get_file_version(self, file_key: str) -> Dict[str, Any]:
+        """
+        Fetch a file's version markers without downloading the document tree.
+        
+        Args:
+            file_key: The Figma file key
+            
+        Returns:
+            Dictionary with the file's name, last_modified and version
+        """
+        url = f"{self.BASE_URL}/files/{file_key}"
+        response = requests.get(url, headers=self.headers, params={"depth": 1})
+        response.raise_for_status()
+        data = response.json()
+        if self.file_cache:
+            self.file_cache.note_version(file_key, data.get("version", ""))
+        return {
+            "name": data.get("name", ""),
+            "last_modified": data.get("lastModified", ""),
+            "version": data.get("version", ""),
+        }
+    
     def get_file_components(self, file_key: str) -> Dict[str, Any]:
         """
         Fetch components from a Figma file.
@@ -105,7 +230,8 @@ class FigmaClient:
         Returns:
             Structured design tokens
         """
-        file_data = self.get_file(file_key)
+        # Only the file's name and modification time are needed, not its tree
+        file_data = self.get_file(file_key, depth=1)
         styles = self.get_file_styles(file_key)
         
         tokens = {
@@ -181,22 +307,83 @@ class FigmaClient:
         
         return components
     
-    def extract_text_content(self, node: Dict[str, Any], texts: List[str]) -> None:
+    @contextmanager
+    def get_file_stream(self, file_key: str):
         """
-        Recursively extract text content from Figma nodes.
+        Open a file's full JSON response as a byte stream, without parsing it.
         
         Args:
-            node: Figma node dictionary
-            texts: List to accumulate text content
+            file_key: The Figma file key
+            
+        Yields:
+            Binary file-like object with the response body
+        """
+        url = f"{self.BASE_URL}/files/{file_key}"
+        with requests.get(url, headers=self.headers, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            yield response.raw
+    
+    def _read_page_texts(self, file_key: str):
         """
-        if node.get("type") == "TEXT":
-            characters = node.get("characters", "")
-            if characters:
-                texts.append(characters)
+        Get a file's name and the text of each page.
+        A current copy of the file already in memory is used if there is one.
+        Otherwise the file is parsed incrementally, so only page texts are held
+        in memory: from the file cache's copy on disk when it is current, or
+        from the download, whose body is written to the file cache as it is read.
         
-        # Recursively process children
-        for child in node.get("children", []):
-            self.extract_text_content(child, texts)
+        Args:
+            file_key: The Figma file key
+            
+        Returns:
+            File name, and a list of (page ID, page name, texts) tuples
+        """
+        version = self.file_cache.known_version(file_key) if self.file_cache else None
+        cached = self.file_cache.get_memory(file_key, version) if version else None
+        if cached is None and settings.figma_streaming_extraction:
+            try:
+                with ExitStack() as stack:
+                    stream = self.file_cache.open_stream(file_key, version) if version else None
+                    writer = None
+                    if stream is not None:
+                        stack.enter_context(stream)
+                    else:
+                        stream = stack.enter_context(self.get_file_stream(file_key))
+                        if self.file_cache:
+                            writer = stack.enter_context(self.file_cache.writer(file_key))
+                            stream = writer.tee(stream)
+                    return self._parse_page_texts(stream, writer)
+            except ImportError:
+                print("ijson is not installed; loading the whole Figma file to extract page content")
+        
+        file_data = cached if cached is not None else self.get_file(file_key)
+        return file_data.get("name", ""), self._file_tree(file_key, file_data).pages
+    
+    def _parse_page_texts(self, stream, writer=None):
+        """
+        Collect page texts from a file's JSON as it is parsed.
+        
+        Args:
+            stream: Binary file-like object with the file's JSON
+            writer: File cache writer to commit once the file's version is read
+            
+        Returns:
+            File name, and a list of (page ID, page name, texts) tuples
+        """
+        pages = []
+        texts = []
+        file_name = ""
+        for event, fields in iter_file_events(stream):
+            if event == "text":
+                texts.append(fields["characters"])
+            elif event == "page":
+                pages.append((fields["id"], fields["name"], texts))
+                texts = []
+            elif event == "file":
+                file_name = fields["name"]
+                if writer:
+                    writer.commit(fields["version"])
+        return file_name, pages
     
     def extract_page_content(self, file_key: str) -> List[Dict[str, Any]]:
         """
@@ -208,9 +395,8 @@ class FigmaClient:
         Returns:
             List of page content dictionaries
         """
-        file_data = self.get_file(file_key)
+        file_name, pages = self._read_page_texts(file_key)
         pages_content = []
-        file_name = file_data.get("name", "")
         
         # Detect content type from file name
         content_category = "general"
@@ -219,13 +405,7 @@ class FigmaClient:
         elif "ad" in file_name.lower() or "paid" in file_name.lower():
             content_category = "ad_example"
         
-        for page in file_data.get("document", {}).get("children", []):
-            page_name = page.get("name", "Untitled Page")
-            texts = []
-            
-            # Extract all text from this page
-            self.extract_text_content(page, texts)
-            
+        for page_id, page_name, texts in pages:
             # Combine all text from the page
             page_text = "\n".join(texts)
             
@@ -243,6 +423,7 @@ class FigmaClient:
             if page_text.strip():
                 pages_content.append({
                     "page_name": page_name,
+                    "page_id": page_id,
                     "content": page_text,
                     "file_key": file_key,
                     "file_name": file_name,
@@ -328,10 +509,10 @@ class FigmaClient:
         
         # Check if cache is valid
         current_time = time.time()
-        if (self._file_cache is not None and 
-            self._cache_timestamp is not None and 
-            current_time - self._cache_timestamp < self._cache_ttl):
-            return self._file_cache
+        if (self._team_files is not None and 
+            self._team_files_timestamp is not None and 
+            current_time - self._team_files_timestamp < self._team_files_ttl):
+            return self._team_files
         
         # Build new cache
         all_files = []
@@ -349,8 +530,8 @@ class FigmaClient:
                 })
         
         # Update cache
-        self._file_cache = all_files
-        self._cache_timestamp = current_time
+        self._team_files = all_files
+        self._team_files_timestamp = current_time
         
         return all_files
     
@@ -398,12 +579,18 @@ class FigmaClient:
         # If that failed or returned minimal content, check if it's an INSTANCE
         # and try to find a VECTOR child
         try:
-            file_data = self.get_file(file_key)
-            node = self._find_node_by_id(file_data.get("document", {}), node_id)
+            # A cached file already has a FileTree; otherwise index just the node's subtree
+            cached = self._cached_file(file_key)
+            if cached is not None:
+                tree = self._file_tree(file_key, cached)
+                node = tree.nodes_by_id.get(node_id)
+            else:
+                node = self.get_file_nodes(file_key, [node_id]).get(node_id)
+                tree = FileTree(node) if node else None
             
             if node and node.get("type") == "INSTANCE":
                 # Look for VECTOR children
-                vector_children = self._find_vector_children(node)
+                vector_children = tree.vector_descendants(node_id)
                 for vector_id in vector_children:
                     try:
                         svg_content = self._export_node_as_svg_direct(file_key, vector_id)
@@ -444,28 +631,6 @@ class FigmaClient:
         
         return svg_response.text
     
-    def _find_node_by_id(self, node, target_id):
-        """Find a node by ID recursively."""
-        if node.get('id') == target_id:
-            return node
-        if 'children' in node:
-            for child in node['children']:
-                result = self._find_node_by_id(child, target_id)
-                if result:
-                    return result
-        return None
-    
-    def _find_vector_children(self, node):
-        """Find all VECTOR children of a node."""
-        vector_ids = []
-        if 'children' in node:
-            for child in node['children']:
-                if child.get('type') == 'VECTOR':
-                    vector_ids.append(child.get('id'))
-                # Also check nested children
-                vector_ids.extend(self._find_vector_children(child))
-        return vector_ids
-    
     def export_node_as_image(self, file_key: str, node_id: str, scale: int = 2) -> Optional[str]:
         """
         Export a specific node as PNG image from Figma and return the URL.
@@ -497,6 +662,8 @@ class FigmaClient:
     def get_frame_by_name(self, file_key: str, frame_name: str, page_name: Optional[str] = None) -> Optional[str]:
         """
         Find a frame by name in a file and return its node ID.
+        Top-level frames on each page are searched first, using a depth-limited
+        fetch; the full document is only downloaded for nested frames.
         
         Args:
             file_key: The Figma file key
@@ -506,37 +673,30 @@ class FigmaClient:
         Returns:
             Node ID if found, None otherwise
         """
-        file_data = self.get_file(file_key)
-        
-        def search_frames(node, target_name, current_page=None):
-            # Check if this is the target frame
-            node_type = node.get("type", "")
-            node_name = node.get("name", "")
-            
-            if node_type == "FRAME" and target_name.lower() in node_name.lower():
-                # If page filter specified, check if we're on the right page
-                if page_name is None or (current_page and page_name.lower() in current_page.lower()):
-                    return node.get("id")
-            
-            # Track current page
-            if node_type == "CANVAS":
-                current_page = node_name
-            
-            # Search children
-            for child in node.get("children", []):
-                result = search_frames(child, target_name, current_page)
-                if result:
-                    return result
-            
-            return None
-        
-        return search_frames(file_data.get("document", {}), frame_name)
+        # Same two passes over the cached full file, so results don't depend on what is cached
+        cached = self._cached_file(file_key)
+        if cached is not None:
+            tree = self._file_tree(file_key, cached)
+            return (
+                tree.find_frame(frame_name, page_name, max_depth=self.FRAME_SEARCH_DEPTH)
+                or tree.find_frame(frame_name, page_name)
+            )
+        
+        top_levels = self.get_file(file_key, depth=self.FRAME_SEARCH_DEPTH)
+        result = FileTree(top_levels.get("document", {})).find_frame(
+            frame_name, page_name, max_depth=self.FRAME_SEARCH_DEPTH
+        )
+        if result:
+            return result
+        
+        return self.get_file_tree(file_key).find_frame(frame_name, page_name)
     
     def search_node_by_name(self, file_key: str, node_name: str) -> Optional[str]:
         """
         Search for a node by name in a file and return its ID.
         Uses fuzzy matching to find nodes even with slight name variations.
         Prioritizes Component/Instance nodes over Text nodes.
+        Lookups go through the file's node name index.
         
         Args:
             file_key: The Figma file key
@@ -545,62 +705,65 @@ class FigmaClient:
         Returns:
             Node ID if found, None otherwise
         """
-        file_data = self.get_file(file_key)
-        target_lower = node_name.lower().strip()
-        target_words = set(target_lower.split())
-        
-        best_match = None
-        best_score = 0
+        return self.get_node_index(file_key).search(node_name)
+    
+    def get_node_index(self, file_key: str) -> NodeNameIndex:
+        """
+        Get the node name index for the current version of a file.
+        Built once per file version and stored in the file cache, so
+        repeated name lookups don't walk the whole document; the document is
+        only loaded when no index exists for the current version.
         
-        def search_recursive(node):
-            nonlocal best_match, best_score
-            
-            node_name_str = node.get("name", "")
-            node_name_lower = node_name_str.lower()
-            node_type = node.get("type", "")
-            
-            # Calculate base score
-            score = 0
-            
-            # Exact match (case-insensitive) - highest priority
-            if node_name_lower == target_lower:
-                score = 1000  # Much higher score for exact matches
-            # Hyphenated exact match (e.g., "ice-cream-cone" matches "ice cream cone")
-            elif node_name_lower.replace('-', ' ') == target_lower or target_lower.replace(' ', '-') == node_name_lower:
-                score = 900
-            # Contains match
-            elif target_lower in node_name_lower or node_name_lower in target_lower:
-                score = 50
-                # Word overlap scoring
-                node_words = set(node_name_lower.split())
-                overlap = len(target_words & node_words)
-                if overlap > 0:
-                    score = 50 + (overlap * 10)
-            
-            # Type priority: INSTANCE > COMPONENT > FRAME > others > TEXT
-            type_priority = {
-                'INSTANCE': 1000,
-                'COMPONENT': 800,
-                'FRAME': 600,
-                'GROUP': 400,
-                'RECTANGLE': 200,
-                'ELLIPSE': 200,
-                'TEXT': 0  # Lowest priority for text nodes
-            }
-            
-            type_bonus = type_priority.get(node_type, 100)
-            total_score = score + type_bonus
-            
-            if score > 0 and total_score > best_score:
-                best_score = total_score
-                best_match = node.get("id")
+        Args:
+            file_key: The Figma file key
             
-            for child in node.get("children", []):
-                search_recursive(child)
+        Returns:
+            Node name index
+        """
+        if not self.file_cache:
+            return self._file_tree(file_key, self.get_file(file_key)).name_index
+        
+        version = self.file_cache.known_version(file_key)
+        if version is None:
+            try:
+                version = self.get_file_version(file_key)["version"]
+            except requests.RequestException:
+                # get_file falls back to the cached copy
+                version = None
+        if version is not None:
+            index = self.file_cache.get_index(file_key, str(version))
+            if index is not None:
+                return index
         
-        search_recursive(file_data.get("document", {}))
+        file_data = self.get_file(file_key)
+        index = self._file_tree(file_key, file_data).name_index
+        self.file_cache.put_index(file_key, str(file_data.get("version", "")), index)
+        return index
+    
+    def get_file_tree(self, file_key: str) -> FileTree:
+        """
+        Get the FileTree for the current version of a file.
         
-        return best_match
+        Args:
+            file_key: The Figma file key
+            
+        Returns:
+            Index of the file's nodes, pages, frames and vectors
+        """
+        return self._file_tree(file_key, self.get_file(file_key))
+    
+    def _file_tree(self, file_key: str, file_data: Dict[str, Any]) -> FileTree:
+        """Build a file's FileTree once per version, reusing it while the document is cached."""
+        document = file_data.get("document", {})
+        if not self.file_cache:
+            return FileTree(document)
+        
+        version = str(file_data.get("version", ""))
+        tree = self.file_cache.get_tree(file_key, version)
+        if tree is None:
+            tree = FileTree(document)
+            self.file_cache.put_tree(file_key, version, tree)
+        return tree
     
     def change_svg_color(self, svg_content: str, new_color: str) -> str:
         """
@@ -621,6 +784,17 @@ class FigmaClient:
         return svg_content
 
 
-# Global Figma client instance
-figma_client = FigmaClient()
+# Global Figma client instance, created on first use
+_figma_client: Optional[FigmaClient] = None
+_figma_client_lock = threading.Lock()
+
+
+def get_figma_client() -> FigmaClient:
+    """Get the global Figma client, creating it on first use."""
+    global _figma_client
+    if _figma_client is None:
+        with _figma_client_lock:
+            if _figma_client is None:
+                _figma_client = FigmaClient()
+    return _figma_client
 
@@ -0,0 +1,416 @@
+"""
+Local cache of full Figma file documents, keyed by file key and version.
+"""
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+from config import settings
+from integrations.figma_index import NodeNameIndex
+from integrations.figma_tree import FileTree
+
+
+class FigmaFileCache:
+    """
+    Full file responses kept in an in-memory LRU and as gzip-compressed JSON
+    on disk. Entries are addressed by (file key, version), so a cached
+    document is only served for the version Figma reports as current; the
+    last version seen for each file is remembered for a short interval so
+    repeated lookups skip the freshness check entirely. Each version's node
+    name index is stored next to its document, and the FileTree built over a
+    document is kept in memory for as long as the document itself.
+    """
+    
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_memory_files: Optional[int] = None,
+        check_interval: Optional[float] = None
+    ):
+        self.directory = (
+            directory
+            or settings.figma_file_cache_dir
+            or os.path.join(settings.chroma_persist_directory, "figma_files")
+        )
+        self.max_memory_files = (
+            max_memory_files if max_memory_files is not None else settings.figma_file_cache_memory_files
+        )
+        self.check_interval = (
+            check_interval if check_interval is not None else settings.figma_file_cache_check_interval
+        )
+        self.hits = 0
+        self.misses = 0
+        
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+        self._indexes: Dict[str, Tuple[str, NodeNameIndex]] = {}
+        self._trees: Dict[str, Tuple[str, FileTree]] = {}
+        self._known_versions: Dict[str, Tuple[str, float]] = {}
+        self._file_locks: Dict[str, threading.Lock] = {}
+    
+    def lock_for(self, file_key: str) -> threading.Lock:
+        """
+        Lock serializing downloads of one file, so concurrent misses fetch it once.
+        
+        Args:
+            file_key: The Figma file key
+            
+        Returns:
+            Lock for the file
+        """
+        with self._lock:
+            return self._file_locks.setdefault(file_key, threading.Lock())
+    
+    def note_version(self, file_key: str, version: str) -> None:
+        """
+        Record the version Figma just reported for a file.
+        
+        Args:
+            file_key: The Figma file key
+            version: Current file version
+        """
+        with self._lock:
+            self._known_versions[file_key] = (version, time.monotonic())
+    
+    def known_version(self, file_key: str) -> Optional[str]:
+        """
+        Get the file's version if it was checked within the check interval.
+        
+        Args:
+            file_key: The Figma file key
+            
+        Returns:
+            Recently seen version, or None if it should be checked again
+        """
+        with self._lock:
+            entry = self._known_versions.get(file_key)
+        if entry is None or time.monotonic() - entry[1] >= self.check_interval:
+            return None
+        return entry[0]
+    
+    def get(self, file_key: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached file document.
+        
+        Args:
+            file_key: The Figma file key
+            version: Required version; None accepts whatever version is cached
+            
+        Returns:
+            File data, or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(file_key)
+            if entry is not None and (version is None or entry[0] == version):
+                self._memory.move_to_end(file_key)
+                self.hits += 1
+                return entry[1]
+        
+        path = self._path(file_key, version) if version else self._latest_path(file_key)
+        data = self._read(path) if path else None
+        
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(file_key, data.get("version", version or ""), data)
+        return data
+    
+    def get_memory(self, file_key: str, version: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a file document only in the memory LRU, never loading it from disk.
+        
+        Args:
+            file_key: The Figma file key
+            version: Required version
+            
+        Returns:
+            File data, or None if this version isn't in memory
+        """
+        with self._lock:
+            entry = self._memory.get(file_key)
+            if entry is None or entry[0] != version:
+                return None
+            self._memory.move_to_end(file_key)
+            self.hits += 1
+            return entry[1]
+    
+    def open_stream(self, file_key: str, version: str) -> Optional[BinaryIO]:
+        """
+        Open a cached file document's JSON for incremental parsing, without
+        loading it into memory.
+        
+        Args:
+            file_key: The Figma file key
+            version: Required version
+            
+        Returns:
+            Binary file-like object with the decompressed JSON, or None on a miss
+        """
+        try:
+            stream = gzip.open(self._path(file_key, version), "rb")
+        except OSError:
+            stream = None
+        with self._lock:
+            if stream is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return stream
+    
+    def get_index(self, file_key: str, version: str) -> Optional[NodeNameIndex]:
+        """
+        Look up the node name index built for a file version.
+        
+        Args:
+            file_key: The Figma file key
+            version: File version the index must belong to
+            
+        Returns:
+            The index, or None if it hasn't been built for this version
+        """
+        with self._lock:
+            entry = self._indexes.get(file_key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        
+        data = self._read(self._index_path(file_key, version))
+        index = NodeNameIndex.from_dict(data) if data else None
+        if index is not None:
+            with self._lock:
+                self._indexes[file_key] = (version, index)
+        return index
+    
+    def put_index(self, file_key: str, version: str, index: NodeNameIndex) -> None:
+        """
+        Store the node name index for a file version.
+        
+        Args:
+            file_key: The Figma file key
+            version: File version the index was built from
+            index: The index
+        """
+        path = self._index_path(file_key, version)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(index.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        
+        with self._lock:
+            self._indexes[file_key] = (version, index)
+    
+    def get_tree(self, file_key: str, version: str) -> Optional[FileTree]:
+        """
+        Look up the FileTree built for a file version held in memory.
+        
+        Args:
+            file_key: The Figma file key
+            version: File version the tree must belong to
+            
+        Returns:
+            The tree, or None if it hasn't been built for this version
+        """
+        with self._lock:
+            entry = self._trees.get(file_key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        return None
+    
+    def put_tree(self, file_key: str, version: str, tree: FileTree) -> None:
+        """
+        Keep the FileTree for a file version until its document leaves memory.
+        
+        Args:
+            file_key: The Figma file key
+            version: File version the tree was built from
+            tree: The tree
+        """
+        with self._lock:
+            if file_key in self._memory:
+                self._trees[file_key] = (version, tree)
+    
+    def put(self, file_key: str, data: Dict[str, Any]) -> None:
+        """
+        Store a freshly downloaded file document, replacing older versions.
+        
+        Args:
+            file_key: The Figma file key
+            data: Full file response (its "version" field keys the entry)
+        """
+        version = str(data.get("version", ""))
+        tmp_path = f"{self._path(file_key, version)}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(data, f, separators=(",", ":"))
+        self._install(file_key, version, tmp_path)
+        
+        with self._lock:
+            self._remember(file_key, version, data)
+            self._known_versions[file_key] = (version, time.monotonic())
+    
+    def writer(self, file_key: str) -> "StreamedFileWriter":
+        """
+        Start caching a file document whose response body is being streamed.
+        
+        Args:
+            file_key: The Figma file key
+            
+        Returns:
+            Writer to tee the stream through and commit once its version is known
+        """
+        return StreamedFileWriter(self, file_key)
+    
+    def clear(self) -> None:
+        """Remove every cached file, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+            self._indexes.clear()
+            self._trees.clear()
+            self._known_versions.clear()
+            for name in os.listdir(self.directory):
+                if name.endswith(".json.gz"):
+                    os.remove(os.path.join(self.directory, name))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and cache size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "memory_files": len(self._memory),
+                "disk_files": sum(1 for name in os.listdir(self.directory) if self._is_document(name)),
+                "node_indexes": len(self._indexes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+    
+    def _install(self, file_key: str, version: str, tmp_path: str) -> None:
+        """Move a written document into place and remove older versions of the file."""
+        os.replace(tmp_path, self._path(file_key, version))
+        
+        # Only the newest version of each file (and its index) is kept on disk
+        prefix = f"{self._safe_key(file_key)}."
+        current = f"{prefix}{self._safe_key(version)}."
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and not name.startswith(current) and name.endswith(".json.gz"):
+                os.remove(os.path.join(self.directory, name))
+    
+    def _remember(self, file_key: str, version: str, data: Dict[str, Any]) -> None:
+        """Put a document in the memory LRU (caller holds the lock)."""
+        self._memory[file_key] = (str(version), data)
+        self._memory.move_to_end(file_key)
+        while len(self._memory) > max(self.max_memory_files, 0):
+            evicted, _ = self._memory.popitem(last=False)
+            self._trees.pop(evicted, None)
+    
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        """Load a cached document from disk, treating unreadable files as misses."""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError, EOFError):
+            return None
+    
+    def _latest_path(self, file_key: str) -> Optional[str]:
+        """Path of whichever version of a file is on disk, if any."""
+        prefix = f"{self._safe_key(file_key)}."
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and self._is_document(name):
+                return os.path.join(self.directory, name)
+        return None
+    
+    def _path(self, file_key: str, version: str) -> str:
+        """Path of one version of a file on disk."""
+        return os.path.join(self.directory, f"{self._safe_key(file_key)}.{self._safe_key(str(version))}.json.gz")
+    
+    def _index_path(self, file_key: str, version: str) -> str:
+        """Path of the node name index for one version of a file."""
+        return os.path.join(self.directory, f"{self._safe_key(file_key)}.{self._safe_key(str(version))}.index.json.gz")
+    
+    @staticmethod
+    def _is_document(name: str) -> bool:
+        """Whether a cache directory entry is a file document (not an index)."""
+        return name.endswith(".json.gz") and not name.endswith(".index.json.gz")
+    
+    @staticmethod
+    def _safe_key(value: str) -> str:
+        """Make a file key or version safe to use in a file name."""
+        return re.sub(r"[^A-Za-z0-9_-]", "_", value)
+
+
+class StreamedFileWriter:
+    """
+    Gzip-compresses a file response body into the cache as it is read, so a
+    streamed extraction leaves the full document on disk for later lookups
+    without ever holding it in memory. Used as a context manager: the partial
+    file is discarded unless commit was called.
+    """
+    
+    def __init__(self, cache: FigmaFileCache, file_key: str):
+        self.cache = cache
+        self.file_key = file_key
+        self._tmp_path = os.path.join(
+            cache.directory,
+            f"{cache._safe_key(file_key)}.{os.getpid()}.{threading.get_ident()}.stream.tmp"
+        )
+        self._out = gzip.open(self._tmp_path, "wb", compresslevel=6)
+        self._stream: Optional[BinaryIO] = None
+        self._committed = False
+    
+    def __enter__(self) -> "StreamedFileWriter":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        if not self._committed:
+            self.discard()
+    
+    def tee(self, stream: BinaryIO) -> "StreamedFileWriter":
+        """
+        Read from a response stream through this writer.
+        
+        Args:
+            stream: Binary file-like object with the response body
+            
+        Returns:
+            File-like object yielding the same bytes
+        """
+        self._stream = stream
+        return self
+    
+    def read(self, size: int = -1) -> bytes:
+        """Read from the stream, writing what was read to the cache file."""
+        data = self._stream.read(size)
+        if data:
+            self._out.write(data)
+        return data
+    
+    def commit(self, version: str) -> None:
+        """
+        Store the document once the whole body has been read.
+        
+        Args:
+            version: File version reported in the body
+        """
+        # Whatever the parser didn't need still belongs to the document
+        while True:
+            data = self._stream.read(1 << 16)
+            if not data:
+                break
+            self._out.write(data)
+        self._out.close()
+        self.cache._install(self.file_key, str(version), self._tmp_path)
+        self.cache.note_version(self.file_key, str(version))
+        self._committed = True
+    
+    def discard(self) -> None:
+        """Drop the partially written document."""
+        self._out.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,192 @@
+"""
+Name index over a Figma file's nodes for fast node lookup by name.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Type priority: INSTANCE > COMPONENT > FRAME > others > TEXT
+TYPE_PRIORITY = {
+    'INSTANCE': 1000,
+    'COMPONENT': 800,
+    'FRAME': 600,
+    'GROUP': 400,
+    'RECTANGLE': 200,
+    'ELLIPSE': 200,
+    'TEXT': 0  # Lowest priority for text nodes
+}
+DEFAULT_TYPE_PRIORITY = 100
+
+INDEX_FORMAT = 1
+
+
+def match_score(name_lower: str, target_lower: str, target_words: Set[str]) -> int:
+    """
+    Score how well a node name matches a search target (0 means no match).
+    
+    Args:
+        name_lower: Lowercased node name
+        target_lower: Lowercased, stripped search target
+        target_words: Words in the search target
+        
+    Returns:
+        1000 for an exact match, 900 for a hyphen/space variant, 50 plus
+        10 per shared word when one name contains the other, else 0
+    """
+    # Exact match (case-insensitive) - highest priority
+    if name_lower == target_lower:
+        return 1000
+    # Hyphenated exact match (e.g., "ice-cream-cone" matches "ice cream cone")
+    if name_lower.replace('-', ' ') == target_lower or target_lower.replace(' ', '-') == name_lower:
+        return 900
+    # Contains match, with word overlap scoring
+    if target_lower in name_lower or name_lower in target_lower:
+        overlap = len(target_words & set(name_lower.split()))
+        return 50 + overlap * 10
+    return 0
+
+
+class NodeNameIndex:
+    """
+    Lookup structure over every node name in a file.
+    Nodes are grouped by lowercased name; each name keeps only its best node
+    (highest type priority, first in document order), since the match score
+    depends on the name alone. A query is answered from the candidate names
+    that can possibly match (exact and hyphen variants, substrings of the
+    query, and names containing the query via a trigram index) instead of a
+    walk over the whole document. Ranking is the same as the walk: highest
+    match score plus type priority, ties going to the node found first.
+    """
+    
+    def __init__(self, names: List[str], best: List[Tuple[int, int, str]]):
+        """
+        Args:
+            names: Distinct lowercased node names
+            best: For each name, (type priority, document order, node id) of its best node
+        """
+        self.names = names
+        self.best = best
+        self._name_ids = {name: i for i, name in enumerate(names)}
+        self._max_name_length = max((len(name) for name in names), default=0)
+        
+        # "ice-cream-cone" is found by "ice cream cone"
+        self._dehyphenated: Dict[str, List[int]] = {}
+        for i, name in enumerate(names):
+            if '-' in name:
+                self._dehyphenated.setdefault(name.replace('-', ' '), []).append(i)
+        
+        # Trigram postings for "name contains the query" candidates
+        self._trigrams: Dict[str, Set[int]] = {}
+        for i, name in enumerate(names):
+            for gram in self._grams(name):
+                self._trigrams.setdefault(gram, set()).add(i)
+    
+    def search(self, query: str) -> Optional[str]:
+        """
+        Find the best-matching node for a name.
+        
+        Args:
+            query: Name to search for
+            
+        Returns:
+            Node ID, or None if nothing matches
+        """
+        target = query.lower().strip()
+        target_words = set(target.split())
+        
+        best_key = None
+        best_match = None
+        for i in self._candidates(target):
+            score = match_score(self.names[i], target, target_words)
+            if score <= 0:
+                continue
+            priority, order, node_id = self.best[i]
+            key = (score + priority, -order)
+            if best_key is None or key > best_key:
+                best_key = key
+                best_match = node_id
+        
+        return best_match
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the index for storage next to the cached file."""
+        return {"format": INDEX_FORMAT, "names": self.names, "best": [list(entry) for entry in self.best]}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional["NodeNameIndex"]:
+        """
+        Load a serialized index.
+        
+        Args:
+            data: Output of to_dict()
+            
+        Returns:
+            The index, or None if it was written in another format
+        """
+        if data.get("format") != INDEX_FORMAT:
+            return None
+        return cls(data["names"], [tuple(entry) for entry in data["best"]])
+    
+    def _candidates(self, target: str) -> Iterable[int]:
+        """Names that could score above zero for the target."""
+        candidates: Set[int] = set()
+        
+        for key in (target, target.replace(' ', '-')):
+            if key in self._name_ids:
+                candidates.add(self._name_ids[key])
+        candidates.update(self._dehyphenated.get(target, ()))
+        
+        # Names contained in the target (including unnamed nodes)
+        for start in range(len(target) + 1):
+            for end in range(start, min(len(target), start + self._max_name_length) + 1):
+                i = self._name_ids.get(target[start:end])
+                if i is not None:
+                    candidates.add(i)
+        
+        # Names containing the target
+        grams = self._grams(target)
+        if grams:
+            postings = sorted((self._trigrams.get(gram, set()) for gram in grams), key=len)
+            matches = set(postings[0]).intersection(*postings[1:])
+            candidates.update(i for i in matches if target in self.names[i])
+        else:
+            # Too short for trigrams; check every name
+            candidates.update(i for i, name in enumerate(self.names) if target in name)
+        
+        return candidates
+    
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        """Character trigrams of a string."""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NodeNameIndexBuilder:
+    """Collects nodes, in document order, into a NodeNameIndex."""
+    
+    def __init__(self):
+        self._names: List[str] = []
+        self._best: List[Tuple[int, int, str]] = []
+        self._name_ids: Dict[str, int] = {}
+    
+    def add(self, node: Dict[str, Any], order: int) -> None:
+        """
+        Add a node.
+        
+        Args:
+            node: Figma node dictionary
+            order: Position of the node in a depth-first (preorder) walk
+        """
+        name = node.get("name", "").lower()
+        priority = TYPE_PRIORITY.get(node.get("type", ""), DEFAULT_TYPE_PRIORITY)
+        
+        i = self._name_ids.get(name)
+        if i is None:
+            self._name_ids[name] = len(self._names)
+            self._names.append(name)
+            self._best.append((priority, order, node.get("id")))
+        elif priority > self._best[i][0]:
+            self._best[i] = (priority, order, node.get("id"))
+    
+    def build(self) -> NodeNameIndex:
+        """Create the index from the nodes added so far."""
+        return NodeNameIndex(self._names, self._best)
@@ -0,0 +1,65 @@
+"""
+Incremental parsing of Figma file responses, without building the document tree.
+"""
+from typing import Any, BinaryIO, Dict, Iterator, Tuple
+
+
+# Node fields tracked while a node is open; everything else is skipped
+NODE_FIELDS = ("id", "name", "type", "characters")
+
+# File-level fields reported once the response has been read
+FILE_FIELDS = ("name", "version", "lastModified")
+
+PAGE_PREFIX = "document.children.item"
+
+
+def iter_file_events(stream: BinaryIO) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Parse a GET /files/:key response body as a stream of events.
+    Only the fields of the nodes currently open (at most one per tree level)
+    are held in memory, so memory use doesn't grow with the file size.
+    
+    Events, in document order (a node's event fires when the node ends):
+        ("text", {"id", "name", "characters"})  a TEXT node with characters
+        ("frame", {"id", "name"})               a FRAME node
+        ("page", {"id", "name"})                a page (CANVAS), after its texts and frames
+        ("file", {"name", "version", "lastModified"})  once the whole body has been read
+        
+    Args:
+        stream: File-like object with the raw JSON body
+        
+    Yields:
+        (event type, fields) tuples
+        
+    Raises:
+        ImportError: If ijson is not installed
+    """
+    import ijson
+    
+    file_fields = {field: "" for field in FILE_FIELDS}
+    # (prefix, fields) for each node map currently open
+    open_nodes = []
+    
+    for prefix, event, value in ijson.parse(stream):
+        if event == "start_map":
+            if prefix == "document" or (prefix.startswith(PAGE_PREFIX) and prefix.endswith(".children.item")):
+                open_nodes.append((prefix, {}))
+        elif event == "end_map":
+            if open_nodes and open_nodes[-1][0] == prefix:
+                _, node = open_nodes.pop()
+                node_type = node.get("type")
+                if prefix == PAGE_PREFIX:
+                    yield "page", {"id": node.get("id", ""), "name": node.get("name", "Untitled Page")}
+                elif node_type == "TEXT" and node.get("characters"):
+                    yield "text", {"id": node.get("id", ""), "name": node.get("name", ""), "characters": node["characters"]}
+                elif node_type == "FRAME":
+                    yield "frame", {"id": node.get("id", ""), "name": node.get("name", "")}
+        elif event == "string":
+            if prefix in file_fields:
+                file_fields[prefix] = value
+            elif open_nodes:
+                parent, _, key = prefix.rpartition(".")
+                if key in NODE_FIELDS and parent == open_nodes[-1][0]:
+                    open_nodes[-1][1][key] = value
+    
+    yield "file", file_fields
@@ -0,0 +1,124 @@
+"""
+Single-pass index over a Figma document tree.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+from integrations.figma_index import NodeNameIndex, NodeNameIndexBuilder
+
+
+class FileTree:
+    """
+    Everything the client looks up in a document, built by one iterative walk.
+    The walk uses an explicit stack, so deeply nested files can't hit the
+    recursion limit, and visits each node once:
+    
+        nodes_by_id   node ID -> node (first occurrence in document order)
+        pages         (page ID, page name, texts) for each top-level child, texts in document order
+        frames        (frame ID, name, page name, depth) for each FRAME, in document order
+        name_index    NodeNameIndex for search by name
+        
+    Vector descendants of any node are answered from each node's preorder
+    interval, without walking its subtree again.
+    """
+    
+    def __init__(self, document: Dict[str, Any]):
+        """
+        Args:
+            document: Root node to index (usually the file's "document")
+        """
+        self.nodes_by_id: Dict[str, Dict[str, Any]] = {}
+        self.pages: List[Tuple[str, str, List[str]]] = []
+        self.frames: List[Tuple[str, str, Optional[str], int]] = []
+        
+        # Preorder interval [start, end) of each node's subtree, and positions of VECTOR nodes
+        self._spans: Dict[str, Tuple[int, int]] = {}
+        self._vector_positions: List[int] = []
+        self._vector_ids: List[str] = []
+        
+        names = NodeNameIndexBuilder()
+        order = 0
+        
+        # (node, depth, page index, current page name, start) entries; start is None until the node is entered
+        stack: List[Tuple[Dict[str, Any], int, Optional[int], Optional[str], Optional[int]]] = [
+            (document, 0, None, None, None)
+        ]
+        while stack:
+            node, depth, page_index, current_page, start = stack.pop()
+            node_id = node.get("id")
+            
+            if start is not None:
+                # Leaving the node: its subtree is [start, order)
+                if node_id is not None:
+                    self._spans.setdefault(node_id, (start, order))
+                continue
+            
+            node_type = node.get("type", "")
+            names.add(node, order)
+            if node_id is not None:
+                self.nodes_by_id.setdefault(node_id, node)
+            
+            if depth == 1:
+                page_index = len(self.pages)
+                self.pages.append((node.get("id", ""), node.get("name", "Untitled Page"), []))
+            
+            if node_type == "TEXT" and page_index is not None:
+                characters = node.get("characters", "")
+                if characters:
+                    self.pages[page_index][2].append(characters)
+            elif node_type == "FRAME":
+                self.frames.append((node_id, node.get("name", ""), current_page, depth))
+            elif node_type == "VECTOR":
+                self._vector_positions.append(order)
+                self._vector_ids.append(node_id)
+            
+            # Track current page
+            if node_type == "CANVAS":
+                current_page = node.get("name", "")
+            
+            stack.append((node, depth, page_index, current_page, order))
+            order += 1
+            for child in reversed(node.get("children", [])):
+                stack.append((child, depth + 1, page_index, current_page, None))
+        
+        self.name_index: NodeNameIndex = names.build()
+    
+    def find_frame(self, frame_name: str, page_name: Optional[str] = None, max_depth: Optional[int] = None) -> Optional[str]:
+        """
+        Find the first frame whose name contains frame_name.
+        
+        Args:
+            frame_name: Name (or part of it) to look for, case-insensitive
+            page_name: Only consider frames on pages whose name contains this
+            max_depth: Only consider frames at most this many levels below the root
+            
+        Returns:
+            Node ID if found, None otherwise
+        """
+        target = frame_name.lower()
+        for frame_id, name, current_page, depth in self.frames:
+            if max_depth is not None and depth > max_depth:
+                continue
+            if target not in name.lower():
+                continue
+            if page_name is None or (current_page and page_name.lower() in current_page.lower()):
+                return frame_id
+        return None
+    
+    def vector_descendants(self, node_id: str) -> List[str]:
+        """
+        Get the IDs of all VECTOR nodes below a node, in document order.
+        
+        Args:
+            node_id: ID of the node
+            
+        Returns:
+            Vector node IDs (empty if the node is unknown)
+        """
+        span = self._spans.get(node_id)
+        if span is None:
+            return []
+        start, end = span
+        # The node itself is excluded
+        low = bisect_right(self._vector_positions, start)
+        high = bisect_left(self._vector_positions, end)
+        return self._vector_ids[low:high]
@@ -1,13 +1,15 @@
 """
 Google Slides API integration for fetching presentation content.
 """
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import threading
 from typing import List, Dict, Any, Optional
 from config import settings
 
 
+class SlidesListingError(RuntimeError):
+    """The Drive listing of presentations failed or is incomplete."""
+
+
 class GoogleSlidesClient:
     """Client for interacting with Google Slides API."""
     
@@ -28,6 +30,10 @@ class GoogleSlidesClient:
             return
         
         try:
+            # Imported here: the Google client libraries are slow to import
+            from google.oauth2 import service_account
+            from googleapiclient.discovery import build
+            
             credentials = service_account.Credentials.from_service_account_file(
                 self.credentials_path,
                 scopes=self.SCOPES
@@ -51,6 +57,8 @@ class GoogleSlidesClient:
         if not self.slides_service:
             raise ValueError("Google Slides service not initialized")
         
+        from googleapiclient.errors import HttpError
+        
         try:
             presentation = self.slides_service.presentations().get(
                 presentationId=presentation_id
@@ -69,31 +77,25 @@ class GoogleSlidesClient:
             
         Returns:
             List of all folder IDs (including parent)
+            
+        Raises:
+            HttpError: If any folder can't be listed (a partial tree would hide its decks)
         """
         if not self.drive_service:
             return []
         
         all_folders = [folder_id]
         
-        try:
-            # Get all folders in this folder
-            query = f"'{folder_id}' in parents and mimeType='application/vnd.google-apps.folder'"
-            results = self.drive_service.files().list(
-                q=query,
-                fields="files(id, name)"
-            ).execute()
-            
-            subfolders = results.get('files', [])
-            
-            # Recursively get subfolders
-            for subfolder in subfolders:
-                subfolder_id = subfolder['id']
-                all_folders.extend(self.list_all_folders_recursive(subfolder_id))
-            
-            return all_folders
-        except HttpError as e:
-            print(f"Error listing folders: {e}")
-            return all_folders
+        # Get all folders in this folder
+        query = f"'{folder_id}' in parents and mimeType='application/vnd.google-apps.folder'"
+        subfolders = self._list_files(query, "id, name")
+        
+        # Recursively get subfolders
+        for subfolder in subfolders:
+            subfolder_id = subfolder['id']
+            all_folders.extend(self.list_all_folders_recursive(subfolder_id))
+        
+        return all_folders
     
     def list_presentations_in_folder(self, folder_id: Optional[str] = None, recursive: bool = True) -> List[Dict[str, Any]]:
         """
@@ -104,11 +106,20 @@ class GoogleSlidesClient:
             recursive: If True, includes all subfolders (default: True)
             
         Returns:
-            List of presentation metadata
+            List of presentation metadata (empty if no folder or credentials are configured)
+            
+        Raises:
+            SlidesListingError: If the Google services failed to initialise or any
+                part of the listing failed, so callers never mistake it for an
+                empty folder
         """
         folder_id = folder_id or settings.google_drive_folder_id
-        if not folder_id or not self.drive_service:
+        if not folder_id or not self.credentials_path:
             return []
+        if not self.drive_service:
+            raise SlidesListingError("Google Drive service not initialized")
+        
+        from googleapiclient.errors import HttpError
         
         all_presentations = []
         
@@ -123,21 +134,40 @@ class GoogleSlidesClient:
             # Search for presentations in all folders
             for fid in folder_ids:
                 query = f"'{fid}' in parents and mimeType='application/vnd.google-apps.presentation'"
-                results = self.drive_service.files().list(
-                    q=query,
-                    fields="files(id, name, modifiedTime, webViewLink)",
-                    orderBy="modifiedTime desc"
-                ).execute()
-                
-                presentations = results.get('files', [])
+                presentations = self._list_files(
+                    query, "id, name, modifiedTime, webViewLink", order_by="modifiedTime desc"
+                )
                 all_presentations.extend(presentations)
             
             print(f"Found {len(all_presentations)} total presentations")
             return all_presentations
             
         except HttpError as e:
-            print(f"Error listing presentations: {e}")
-            return []
+            raise SlidesListingError(f"Error listing presentations: {e}") from e
+    
+    def _list_files(self, query: str, fields: str, order_by: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Run a Drive files query, following every result page.
+        
+        Args:
+            query: Drive search query
+            fields: File fields to return
+            order_by: Optional sort order
+            
+        Returns:
+            Every matching file
+        """
+        files = []
+        page_token = None
+        while True:
+            params = {"q": query, "fields": f"nextPageToken, files({fields})", "pageToken": page_token}
+            if order_by:
+                params["orderBy"] = order_by
+            results = self.drive_service.files().list(**params).execute()
+            files.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return files
     
     def extract_text_from_presentation(self, presentation_id: str) -> Dict[str, Any]:
         """
@@ -240,6 +270,17 @@ class GoogleSlidesClient:
         return all_content
 
 
-# Global Google Slides client instance
-google_slides_client = GoogleSlidesClient()
+# Global Google Slides client instance, created on first use
+_google_slides_client: Optional[GoogleSlidesClient] = None
+_google_slides_client_lock = threading.Lock()
+
+
+def get_google_slides_client() -> GoogleSlidesClient:
+    """Get the global Google Slides client, building the Google API services on first use."""
+    global _google_slides_client
+    if _google_slides_client is None:
+        with _google_slides_client_lock:
+            if _google_slides_client is None:
+                _google_slides_client = GoogleSlidesClient()
+    return _google_slides_client
 
@@ -6,17 +6,22 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+import asyncio
 import json
-from openai import OpenAI
+import os
 import re
 
 from config import settings
 from auth import get_current_user
-from integrations.figma import figma_client
-from integrations.google_slides import google_slides_client
-from rag.embeddings import embedding_manager
-from rag.retrieval import retrieval_manager
-from analyzer import brand_analyzer
+from integrations.figma import get_figma_client
+from integrations.google_slides import SlidesListingError, get_google_slides_client
+from rag.embeddings import get_embedding_manager, get_embedding_manager_async
+from rag.retrieval import get_retrieval_manager, get_retrieval_manager_async
+from rag.sync_state import sync_state
+from rag.answer_cache import answer_cache
+from rag.prompt import PromptBuilder, PromptTooLongError
+from rag.snapshot import import_snapshot
+from analyzer import get_brand_analyzer
 
 
 # Initialize FastAPI app
@@ -36,8 +41,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=settings.openai_api_key)
+# OpenAI client, created on first use (the openai package is slow to import)
+_openai_client = None
+
+
+def get_openai_client():
+    """Get the shared AsyncOpenAI client, creating it on first use."""
+    global _openai_client
+    if _openai_client is None:
+        from openai import AsyncOpenAI
+        _openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
+    return _openai_client
+
+
+# Static system instructions; per-request context is appended after them
+CHAT_INSTRUCTIONS = """You are a helpful design system assistant for Nextdoor's design team.
+You have access to the company's design system from Figma and documentation from Google Slides.
+
+When answering:
+- Be specific and reference the design system when applicable
+- Cite sources when providing information
+- Provide actionable guidance
+- If asked for a Figma file link, provide the full URL from the available Figma files listed below
+- If you're not sure, say so rather than guessing
+- Format your responses clearly with markdown
+
+Use the following context to answer questions accurately:"""
+
+CHAT_SIMPLE_INSTRUCTIONS = """You are a helpful design system assistant for Nextdoor's design team.
+
+When answering:
+- Provide clear, accurate answers based on the design system
+- If asked about UXR insights, research findings, or user feedback:
+  * Synthesize findings from multiple sources if available
+  * Quote specific insights and data points
+  * Reference which research deck/slide each finding came from
+  * Provide links to the original presentation slides
+  * Organize findings into themes or categories
+- If asked about design team organization, ownership, or leadership, check the context below for "Nextdoor Design and Research Organization" content and reference it
+- If the org structure is in the context but doesn't have specific names, explain what team areas exist (Consumer Team, Advertising Experience, etc.) based on the information provided
+- If asked for a Figma file link, provide the full URL from the available Figma files listed below
+- If asked about "latest" or "recent" files, use the file list below which is sorted by last_modified date (newest first). Show the file name, when it was last modified, and provide the link. Note: The Figma API doesn't provide information about WHO edited files, only WHEN they were last modified.
+- If asked to export/download ANY asset from the Brand Asset Kit (logo, icon, symbol, graphic, button, component, illustration, etc.) or show visuals/examples, ALWAYS respond positively:
+  * For logo requests: "I can export that for you! Click the download button below to get the [asset name] in [color if specified]."
+  * For button/component requests: "I can export that for you! Click the download button below to get visual examples of the buttons in various sizes, colors, and states."
+  * For icon requests: "I can export that for you! Click the download button below to get the [icon name] in [color if specified]."
+  * For any other asset: "I can export that for you! Click the download button below to get the [asset name]."
+  The system can export ANY asset from the Brand Asset Kit - it will automatically search for and find the asset by name.
+  The download button will appear automatically - you just need to confirm the export is ready.
+  Even if you're not 100% sure the exact asset name, confirm the export - the system uses fuzzy matching to find the asset.
+- Be helpful and specific
+
+Context from design system:"""
 
 
 # Pydantic models
@@ -70,6 +125,45 @@ class ExportRequest(BaseModel):
     color: Optional[str] = None  # Hex color like "#1B8751"
 
 
+def _sse_replay(answer: Dict[str, Any]):
+    """Replay a cached answer in the same server-sent event format as a live stream."""
+    yield f"data: {json.dumps({'content': answer['response']})}\n\n"
+    yield f"data: {json.dumps({'sources': answer['sources']})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+# Warm start from a vector store snapshot
+@app.on_event("startup")
+async def load_snapshot():
+    """Load settings.snapshot_path into an empty index, so new replicas serve without re-embedding."""
+    if not settings.snapshot_path:
+        return
+    embedding_manager = await get_embedding_manager_async()
+    if embedding_manager.design_collection.count() > 0:
+        return
+    if not os.path.exists(settings.snapshot_path):
+        print(f"Snapshot {settings.snapshot_path} not found, starting with an empty index")
+        return
+    
+    try:
+        header = await import_snapshot(settings.snapshot_path)
+        print(f"Loaded {header['count']} documents from snapshot {settings.snapshot_path}")
+    except Exception as e:
+        print(f"Failed to load snapshot {settings.snapshot_path}: {e}")
+
+
+# Background initialization of the index and clients
+_warm_up_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def warm_up():
+    """Open ChromaDB and build the RAG singletons off the event loop, so /api/health answers right away."""
+    global _warm_up_task
+    if settings.warm_up_on_startup:
+        _warm_up_task = asyncio.create_task(asyncio.to_thread(get_retrieval_manager))
+
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
@@ -95,31 +189,52 @@ async def chat(
     Main chat endpoint with RAG and streaming response.
     """
     try:
+        # The message is sent in full, so one that can't fit is rejected before any retrieval
+        prompt = PromptBuilder(CHAT_INSTRUCTIONS)
+        prompt.check(chat_message.message)
+        
+        # Opens ChromaDB in a worker thread if the warm-up hasn't finished
+        retrieval_manager = await get_retrieval_manager_async()
+        
         # Enhance queries about specific colors to get better results
         enhanced_query = chat_message.message
         if any(keyword in chat_message.message.lower() for keyword in ['hex', 'color', 'vista', 'blue ridge', 'dusk', 'lawn', 'plaster', 'dew', 'pine']):
             enhanced_query = chat_message.message + " brand colors palette"
         
-        # Build context from retrieved documents
-        context = retrieval_manager.build_context(enhanced_query)
-        
-        # Get source citations
-        sources = retrieval_manager.get_sources(enhanced_query)
-        
         # Check if user is asking for a Figma file link
-        figma_files_context = ""
         message_lower = chat_message.message.lower()
         should_search_files = any(keyword in message_lower for keyword in [
             'figma file', 'link to', 'file called', 'file named', 'show me the file',
             'send me', 'share the', 'find the file', 'link for', 'where is the', 'file?'
         ])
         
+        # Standalone questions can be answered from the semantic answer cache.
+        # Answers are addressed to the user, so each user has their own entries;
+        # file-link answers depend on live team files and are never cached.
+        # The cache key is the user's own question; the retrieval suffix added
+        # above is shared by many questions and would make them look alike.
+        # Both strings are embedded in one request, and the retrieval below
+        # finds the enhanced query's vector in the query embedding cache.
+        collection_version = retrieval_manager.embedding_manager.collection_version
+        cache_namespace = f"chat:{current_user.get('email', '')}"
+        query_embedding = None
+        if settings.answer_cache_enabled and not chat_message.conversation_history and not should_search_files:
+            query_embedding, _ = await retrieval_manager.embed_queries([chat_message.message, enhanced_query])
+            cached = answer_cache.get(cache_namespace, chat_message.message, query_embedding, collection_version)
+            if cached is not None:
+                return StreamingResponse(_sse_replay(cached), media_type="text/event-stream")
+        
+        # Build context and source citations from a single retrieval pass
+        retrieval = await retrieval_manager.retrieve(enhanced_query)
+        sources = retrieval['sources']
+        
+        figma_files_context = ""
         if should_search_files:
             # Search for files using all significant words in the query
             words = [w.strip('?.,!') for w in chat_message.message.split() if len(w) > 3]
             all_results = {}
             for word in words[:5]:  # Check first 5 significant words
-                file_results = figma_client.search_team_files(word)
+                file_results = await asyncio.to_thread(get_figma_client().search_team_files, word)
                 for file in file_results:
                     all_results[file['key']] = file
             
@@ -128,43 +243,20 @@ async def chat(
                 for file in list(all_results.values())[:10]:
                     figma_files_context += f"- {file['name']}: {file['url']}\n"
         
-        # Build system prompt
-        system_prompt = f"""You are a helpful design system assistant for Nextdoor's design team.
-You have access to the company's design system from Figma and documentation from Google Slides.
-
-Use the following context to answer questions accurately:
-
-{context}
-
-{figma_files_context}
-
-When answering:
-- Be specific and reference the design system when applicable
-- Cite sources when providing information
-- Provide actionable guidance
-- If asked for a Figma file link, provide the full URL from the available Figma files listed above
-- If you're not sure, say so rather than guessing
-- Format your responses clearly with markdown
-
-User: {current_user.get('name', 'Unknown')} ({current_user.get('email', 'Unknown')})
-"""
-        
-        # Build messages for OpenAI
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history
-        for msg in chat_message.conversation_history[-5:]:  # Last 5 messages
-            messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
-            })
-        
-        # Add current message
-        messages.append({"role": "user", "content": chat_message.message})
+        # Build messages for OpenAI within the prompt token budget; the static
+        # instructions come first so the prompt prefix is the same for every request
+        prompt.add_section(
+            lambda budget: retrieval_manager.format_context(retrieval['results'], budget),
+            priority=1
+        )
+        prompt.add_section(figma_files_context.strip(), max_tokens=settings.prompt_files_tokens)
+        prompt.add_section(f"User: {current_user.get('name', 'Unknown')} ({current_user.get('email', 'Unknown')})")
+        prompt.add_history(chat_message.conversation_history[-5:])  # Last 5 messages
+        messages = prompt.build(chat_message.message)
         
         # Stream response
         async def generate():
-            stream = openai_client.chat.completions.create(
+            stream = await get_openai_client().chat.completions.create(
                 model=settings.chat_model,
                 messages=messages,
                 temperature=settings.temperature,
@@ -172,16 +264,30 @@ User: {current_user.get('name', 'Unknown')} ({current_user.get('email', 'Unknown
                 stream=True
             )
             
-            for chunk in stream:
+            parts = []
+            async for chunk in stream:
                 if chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
                     yield f"data: {json.dumps({'content': chunk.choices[0].delta.content})}\n\n"
             
+            # Only complete answers are cached
+            if query_embedding is not None:
+                answer_cache.put(
+                    cache_namespace,
+                    chat_message.message,
+                    query_embedding,
+                    collection_version,
+                    {"response": "".join(parts), "sources": sources}
+                )
+            
             # Send sources at the end
             yield f"data: {json.dumps({'sources': sources})}\n\n"
             yield "data: [DONE]\n\n"
         
         return StreamingResponse(generate(), media_type="text/event-stream")
     
+    except PromptTooLongError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -194,6 +300,13 @@ async def chat_simple(
 ):
     """Simple non-streaming chat endpoint."""
     try:
+        # The message is sent in full, so one that can't fit is rejected before any retrieval
+        prompt = PromptBuilder(CHAT_SIMPLE_INSTRUCTIONS)
+        prompt.check(chat_message.message)
+        
+        # Opens ChromaDB in a worker thread if the warm-up hasn't finished
+        retrieval_manager = await get_retrieval_manager_async()
+        
         # Enhance queries for better retrieval
         message_lower = chat_message.message.lower()
         enhanced_query = chat_message.message
@@ -210,6 +323,32 @@ async def chat_simple(
         if any(keyword in message_lower for keyword in ['research', 'uxr', 'user research', 'insights', 'findings', 'learned', 'users say', 'feedback', 'pain points', 'user needs']):
             enhanced_query = chat_message.message + " research insights findings user feedback"
         
+        # Standalone questions can be answered from the semantic answer cache. Export
+        # requests and "latest files" questions depend on details a similar question
+        # may not share (asset, color, live file list), so they always go to the model.
+        is_export_request = any(keyword in message_lower for keyword in [
+            'export', 'download', 'give me the', 'looking to download', 'get me the',
+            'show me', 'visual', 'visuals', 'examples', 'example', 'button', 'buttons',
+            'component', 'components', 'logo', 'logos', 'icon', 'icons'
+        ])
+        is_recent_files_query = any(keyword in message_lower for keyword in [
+            'latest', 'recent', 'recently', 'last edited', 'last modified', 
+            'most recent', 'newest', 'current', 'up to date'
+        ])
+        collection_version = retrieval_manager.embedding_manager.collection_version
+        query_embedding = None
+        if (
+            settings.answer_cache_enabled
+            and not chat_message.conversation_history
+            and not is_export_request
+            and not is_recent_files_query
+        ):
+            # One embedding request for the cache key and the retrieval query
+            query_embedding, _ = await retrieval_manager.embed_queries([chat_message.message, enhanced_query])
+            cached = answer_cache.get("chat_simple", chat_message.message, query_embedding, collection_version)
+            if cached is not None:
+                return cached
+        
         # Check if asking for visual examples
         examples_context = ""
         example_images = []
@@ -217,7 +356,7 @@ async def chat_simple(
         
         if show_visual_examples:
             if 'email' in message_lower or 'smb' in message_lower:
-                email_examples = retrieval_manager.search_examples("email", top_k=3)
+                email_examples = await retrieval_manager.search_examples("email", top_k=3)
                 if email_examples['documents']:
                     examples_context += "\n\nApproved Email Examples:\n"
                     for meta in email_examples['metadatas']:
@@ -226,20 +365,20 @@ async def chat_simple(
                     # Try to export first example as image
                     try:
                         # Get a frame from the email creative file
-                        frame_id = figma_client.get_frame_by_name("HU0Fiwou6ZpIrnxuRixJV0", "template")
+                        frame_id = await asyncio.to_thread(get_figma_client().get_frame_by_name, "HU0Fiwou6ZpIrnxuRixJV0", "template")
                         if not frame_id:
                             # Try other common names
-                            frame_id = figma_client.get_frame_by_name("HU0Fiwou6ZpIrnxuRixJV0", "email")
+                            frame_id = await asyncio.to_thread(get_figma_client().get_frame_by_name, "HU0Fiwou6ZpIrnxuRixJV0", "email")
                         
                         if frame_id:
-                            image_url = figma_client.export_node_as_image("HU0Fiwou6ZpIrnxuRixJV0", frame_id)
+                            image_url = await asyncio.to_thread(get_figma_client().export_node_as_image, "HU0Fiwou6ZpIrnxuRixJV0", frame_id)
                             if image_url:
                                 example_images.append(image_url)
                     except Exception as e:
                         print(f"Error exporting email example: {e}")
             
             if 'ad' in message_lower or 'social' in message_lower or 'paid' in message_lower:
-                ad_examples = retrieval_manager.search_examples("ad", top_k=3)
+                ad_examples = await retrieval_manager.search_examples("ad", top_k=3)
                 if ad_examples['documents']:
                     examples_context += "\n\nApproved Ad Templates:\n"
                     for meta in ad_examples['metadatas']:
@@ -248,32 +387,22 @@ async def chat_simple(
                     # Try to export first example as image
                     try:
                         # Get a frame from the paid ad templates file
-                        frame_id = figma_client.get_frame_by_name("5NHfO3JiYYNeuFAz7Ug4kJ", "option 1")
+                        frame_id = await asyncio.to_thread(get_figma_client().get_frame_by_name, "5NHfO3JiYYNeuFAz7Ug4kJ", "option 1")
                         if not frame_id:
-                            frame_id = figma_client.get_frame_by_name("5NHfO3JiYYNeuFAz7Ug4kJ", "template")
+                            frame_id = await asyncio.to_thread(get_figma_client().get_frame_by_name, "5NHfO3JiYYNeuFAz7Ug4kJ", "template")
                         
                         if frame_id:
-                            image_url = figma_client.export_node_as_image("5NHfO3JiYYNeuFAz7Ug4kJ", frame_id)
+                            image_url = await asyncio.to_thread(get_figma_client().export_node_as_image, "5NHfO3JiYYNeuFAz7Ug4kJ", frame_id)
                             if image_url:
                                 example_images.append(image_url)
                     except Exception as e:
                         print(f"Error exporting ad example: {e}")
         
-        context = retrieval_manager.build_context(enhanced_query)
-        if examples_context:
-            context += examples_context
-        
-        sources = retrieval_manager.get_sources(enhanced_query)
+        retrieval = await retrieval_manager.retrieve(enhanced_query)
+        sources = retrieval['sources']
         
         # Check if user is asking for a Figma file link or recent files
         figma_files_context = ""
-        message_lower = chat_message.message.lower()
-        
-        # Check for recent/latest files queries
-        is_recent_files_query = any(keyword in message_lower for keyword in [
-            'latest', 'recent', 'recently', 'last edited', 'last modified', 
-            'most recent', 'newest', 'current', 'up to date'
-        ])
         
         should_search_files = any(keyword in message_lower for keyword in [
             'figma file', 'link to', 'file called', 'file named', 'show me the file',
@@ -286,7 +415,9 @@ async def chat_simple(
             if is_recent_files_query:
                 # Get fresh file metadata from Figma for recent files queries
                 print("Fetching recent files from Figma...")
-                fresh_files = figma_client.get_all_team_files_with_metadata(settings.figma_team_id)
+                fresh_files = await asyncio.to_thread(
+                    get_figma_client().get_all_team_files_with_metadata, settings.figma_team_id
+                )
                 
                 # Sort by last_modified, most recent first
                 fresh_files.sort(key=lambda x: x.get('last_modified', ''), reverse=True)
@@ -300,7 +431,7 @@ async def chat_simple(
                 # Regular file search by name
                 words = [w.strip('?.,!') for w in chat_message.message.split() if len(w) > 3]
                 for word in words[:5]:  # Check first 5 significant words
-                    file_results = figma_client.search_team_files(word)
+                    file_results = await asyncio.to_thread(get_figma_client().search_team_files, word)
                     for file in file_results:
                         all_results[file['key']] = file
             
@@ -312,41 +443,16 @@ async def chat_simple(
                     figma_files_context += f"  Project: {file.get('project', 'Unknown')}\n"
                     figma_files_context += f"  URL: {file['url']}\n"
         
-        system_prompt = f"""You are a helpful design system assistant for Nextdoor's design team.
 
-Context from design system:
-{context}
-
-{figma_files_context}
-
-When answering:
-- Provide clear, accurate answers based on the design system
-- If asked about UXR insights, research findings, or user feedback:
-  * Synthesize findings from multiple sources if available
-  * Quote specific insights and data points
-  * Reference which research deck/slide each finding came from
-  * Provide links to the original presentation slides
-  * Organize findings into themes or categories
-- If asked about design team organization, ownership, or leadership, check the context above for "Nextdoor Design and Research Organization" content and reference it
-- If the org structure is in the context but doesn't have specific names, explain what team areas exist (Consumer Team, Advertising Experience, etc.) based on the information provided
-- If asked for a Figma file link, provide the full URL from the available Figma files listed above
-- If asked about "latest" or "recent" files, use the file list above which is sorted by last_modified date (newest first). Show the file name, when it was last modified, and provide the link. Note: The Figma API doesn't provide information about WHO edited files, only WHEN they were last modified.
-- If asked to export/download ANY asset from the Brand Asset Kit (logo, icon, symbol, graphic, button, component, illustration, etc.) or show visuals/examples, ALWAYS respond positively:
-  * For logo requests: "I can export that for you! Click the download button below to get the [asset name] in [color if specified]."
-  * For button/component requests: "I can export that for you! Click the download button below to get visual examples of the buttons in various sizes, colors, and states."
-  * For icon requests: "I can export that for you! Click the download button below to get the [icon name] in [color if specified]."
-  * For any other asset: "I can export that for you! Click the download button below to get the [asset name]."
-  The system can export ANY asset from the Brand Asset Kit - it will automatically search for and find the asset by name.
-  The download button will appear automatically - you just need to confirm the export is ready.
-  Even if you're not 100% sure the exact asset name, confirm the export - the system uses fuzzy matching to find the asset.
-- Be helpful and specific"""
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": chat_message.message}
-        ]
+        prompt.add_section(
+            lambda budget: retrieval_manager.format_context(retrieval['results'], budget),
+            priority=1
+        )
+        prompt.add_section(examples_context.strip(), max_tokens=settings.prompt_examples_tokens)
+        prompt.add_section(figma_files_context.strip(), max_tokens=settings.prompt_files_tokens)
+        messages = prompt.build(chat_message.message)
         
-        response = openai_client.chat.completions.create(
+        response = await get_openai_client().chat.completions.create(
             model=settings.chat_model,
             messages=messages,
             temperature=settings.temperature,
@@ -355,13 +461,6 @@ When answering:
         
         # Check if this is an export request
         export_data = None
-        message_lower = chat_message.message.lower()
-        
-        is_export_request = any(keyword in message_lower for keyword in [
-            'export', 'download', 'give me the', 'looking to download', 'get me the',
-            'show me', 'visual', 'visuals', 'examples', 'example', 'button', 'buttons',
-            'component', 'components', 'logo', 'logos', 'icon', 'icons'
-        ])
         
         if is_export_request:
             # Detect what asset is being requested
@@ -453,7 +552,9 @@ When answering:
             
             # If we don't have a node_id from the asset map, try fuzzy search
             if node_id is None:
-                node_id = figma_client.search_node_by_name("3x616Uy5sRIDXcXHlNzyB7", node_name)
+                node_id = await asyncio.to_thread(
+                    get_figma_client().search_node_by_name, "3x616Uy5sRIDXcXHlNzyB7", node_name
+                )
             
             export_data = {
                 "node_name": node_name,
@@ -464,13 +565,20 @@ When answering:
             
             print(f"Export request detected. Node name: {node_name}, Node ID: {node_id}, Color: {export_color}")
         
-        return {
+        result = {
             "response": response.choices[0].message.content,
             "sources": sources,
             "export_data": export_data,
             "example_images": example_images if example_images else None
         }
+        
+        if query_embedding is not None:
+            answer_cache.put("chat_simple", chat_message.message, query_embedding, collection_version, result)
+        
+        return result
     
+    except PromptTooLongError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -489,11 +597,11 @@ async def analyze_image(
         image_data = await file.read()
         
         # Validate image
-        if not brand_analyzer.validate_image(image_data):
+        if not get_brand_analyzer().validate_image(image_data):
             raise HTTPException(status_code=400, detail="Invalid image file")
         
         # Analyze image
-        result = brand_analyzer.analyze_image(
+        result = await get_brand_analyzer().analyze_image(
             image_data=image_data,
             image_type=file.content_type or "image/png"
         )
@@ -515,17 +623,39 @@ async def sync_figma(
     """
     Sync Figma files to the vector database.
     Indexes ALL team files as metadata, plus full content for key files.
+    Files whose lastModified/version is unchanged since the last successful
+    sync are skipped unless force is set.
     """
     try:
+        embedding_manager = await get_embedding_manager_async()
         synced_files = []
+        skipped_files = []
         all_files = []
         
         # First, index all team files as metadata for searchability
         if settings.figma_team_id:
             print("Indexing all team files metadata...")
-            all_files = figma_client.get_all_team_files_with_metadata(settings.figma_team_id)
-            embedding_manager.add_figma_file_metadata(all_files)
-            print(f"Indexed {len(all_files)} file metadata entries")
+            all_files = await asyncio.to_thread(
+                get_figma_client().get_all_team_files_with_metadata, settings.figma_team_id
+            )
+            metadata_ids = embedding_manager.file_metadata_ids(all_files)
+            # Entries missing from the index are rewritten even if the file is unchanged
+            missing_ids = set(await embedding_manager.missing_ids(metadata_ids))
+            changed_files = [
+                file for file, doc_id in zip(all_files, metadata_ids)
+                if sync_request.force or doc_id in missing_ids or not sync_state.is_unchanged(
+                    embedding_manager.sync_namespace("figma_file_metadata"), file['key'], file.get('last_modified')
+                )
+            ]
+            
+            if changed_files:
+                await embedding_manager.add_figma_file_metadata(changed_files)
+                for file in changed_files:
+                    sync_state.record(embedding_manager.sync_namespace("figma_file_metadata"), file['key'], file.get('last_modified'))
+            
+            # Drop metadata for files that no longer exist in the team
+            await embedding_manager.prune_documents({"type": "file_metadata"}, metadata_ids)
+            print(f"Indexed {len(changed_files)} changed file metadata entries ({len(all_files)} total)")
         
         # Get file keys for full content sync (priority files)
         file_keys = []
@@ -534,6 +664,7 @@ async def sync_figma(
         
         if not file_keys:
             # If no specific files, just return metadata sync results
+            await _refresh_guidelines()
             return {
                 "status": "success",
                 "message": f"Indexed {len(all_files)} files as searchable metadata",
@@ -545,17 +676,43 @@ async def sync_figma(
         for file_key in file_keys[:10]:  # Limit to 10 files for now
             file_key = file_key.strip()
             
+            # Skip files that haven't changed since the last successful sync
+            file_version = await asyncio.to_thread(get_figma_client().get_file_version, file_key)
+            version = file_version.get('version') or file_version.get('last_modified')
+            if not sync_request.force and sync_state.is_unchanged(embedding_manager.sync_namespace("figma_file"), file_key, version):
+                skipped_files.append({
+                    "file_key": file_key,
+                    "name": file_version.get('name', 'Unknown'),
+                    "last_modified": file_version.get('last_modified', '')
+                })
+                continue
+            
             # Extract design tokens
-            tokens = figma_client.extract_design_tokens(file_key)
-            embedding_manager.add_figma_styles(tokens)
+            tokens = await asyncio.to_thread(get_figma_client().extract_design_tokens, file_key)
             
             # Extract components
-            components = figma_client.extract_component_info(file_key)
-            embedding_manager.add_figma_components(components, file_key)
+            components = await asyncio.to_thread(get_figma_client().extract_component_info, file_key)
             
             # Extract page content (for brand kits and documentation)
-            page_content = figma_client.extract_page_content(file_key)
-            embedding_manager.add_figma_page_content(page_content)
+            page_content = await asyncio.to_thread(get_figma_client().extract_page_content, file_key)
+            
+            # Upsert the file's documents, then drop chunks it no longer produces
+            # (file metadata entries are handled above)
+            written_ids = []
+            written_ids += await embedding_manager.add_figma_styles(tokens)
+            written_ids += await embedding_manager.add_figma_components(components, file_key)
+            written_ids += await embedding_manager.add_figma_page_content(page_content)
+            await embedding_manager.prune_documents(
+                {"$and": [{"file_key": file_key}, {"type": {"$ne": "file_metadata"}}]},
+                written_ids
+            )
+            
+            sync_state.record(
+                embedding_manager.sync_namespace("figma_file"),
+                file_key,
+                version,
+                last_modified=file_version.get('last_modified', '')
+            )
             
             synced_files.append({
                 "file_key": file_key,
@@ -565,12 +722,14 @@ async def sync_figma(
                 "pages": len(page_content)
             })
         
+        await _refresh_guidelines()
         stats = embedding_manager.get_collection_stats()
         
         return {
             "status": "success",
-            "message": f"Indexed {len(all_files) if settings.figma_team_id else 0} files as metadata, synced {len(synced_files)} files with full content",
+            "message": f"Indexed {len(all_files) if settings.figma_team_id else 0} files as metadata, synced {len(synced_files)} files with full content, skipped {len(skipped_files)} unchanged files",
             "synced_files": synced_files,
+            "skipped_files": skipped_files,
             "total_files_indexed": len(all_files) if settings.figma_team_id else 0,
             "total_documents": stats['total_documents']
         }
@@ -579,6 +738,18 @@ async def sync_figma(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _refresh_guidelines() -> None:
+    """Rebuild the brand guidelines snapshot after a sync; a failure here shouldn't fail the sync."""
+    embedding_manager = await get_embedding_manager_async()
+    if embedding_manager.rebuilding:
+        # The snapshot is rebuilt once the reindex goes live
+        return
+    try:
+        await get_brand_analyzer().refresh_guidelines()
+    except Exception as e:
+        print(f"Failed to rebuild brand guidelines snapshot: {e}")
+
+
 # Sync Google Slides
 @app.post("/api/sync/slides")
 async def sync_slides(
@@ -589,19 +760,41 @@ async def sync_slides(
     Sync Google Slides presentations to the vector database.
     """
     try:
+        embedding_manager = await get_embedding_manager_async()
+        
         # Get all presentations
-        presentations = google_slides_client.get_all_presentations_content()
+        presentations = await asyncio.to_thread(
+            lambda: get_google_slides_client().get_all_presentations_content()
+        )
         
         synced_presentations = []
+        written_ids = []
+        failed_presentations = 0
         
         # Process each presentation
         for pres in presentations:
-            embedding_manager.add_slides_content(pres)
+            if not pres.get('presentation_id'):
+                # Fetch failed; keep whatever was indexed for it previously
+                failed_presentations += 1
+                continue
+            
+            written_ids += await embedding_manager.add_slides_content(pres)
             synced_presentations.append({
                 "name": pres.get('name', 'Unknown'),
                 "slides": len(pres.get('slides', []))
             })
         
+        # Remove slides from presentations that were deleted or shrank. An empty
+        # listing is more likely a misconfigured folder than a deleted one, so it
+        # never clears the index; a full reindex drops decks that are really gone.
+        if failed_presentations:
+            print(f"Skipping stale slide cleanup: {failed_presentations} presentations failed to load")
+        elif not presentations:
+            print("Skipping stale slide cleanup: no presentations were listed")
+        else:
+            await embedding_manager.prune_documents({"source": "google_slides"}, written_ids)
+        
+        await _refresh_guidelines()
         stats = embedding_manager.get_collection_stats()
         
         return {
@@ -610,6 +803,50 @@ async def sync_slides(
             "total_documents": stats['total_documents']
         }
     
+    except SlidesListingError as e:
+        # Nothing was written or pruned
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Full reindex
+@app.post("/api/reindex")
+async def reindex(current_user: Dict[str, Any] = Depends(get_current_user)):
+    """
+    Rebuild the whole vector database from Figma and Google Slides without downtime.
+    Everything is written to a shadow collection while chat keeps reading the
+    live one; the shadow is validated and swapped in atomically at the end.
+    """
+    embedding_manager = await get_embedding_manager_async()
+    if embedding_manager.rebuilding:
+        raise HTTPException(status_code=409, detail="A full reindex is already running")
+    
+    try:
+        try:
+            async with embedding_manager.rebuild():
+                figma_result = await sync_figma(SyncRequest(force=True), current_user)
+                slides_result = await sync_slides(SyncRequest(force=True), current_user)
+        except Exception:
+            # The live collection may be behind the file versions the failed rebuild recorded
+            sync_state.forget(embedding_manager.sync_namespace("figma_file_metadata"))
+            sync_state.forget(embedding_manager.sync_namespace("figma_file"))
+            raise
+        
+        await _refresh_guidelines()
+        stats = embedding_manager.get_collection_stats()
+        
+        return {
+            "status": "success",
+            "message": figma_result["message"],
+            "synced_files": figma_result.get("synced_files", []),
+            "synced_presentations": slides_result.get("synced_presentations", []),
+            "live_collection": stats['live_collection'],
+            "total_documents": stats['total_documents']
+        }
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -618,7 +855,12 @@ async def sync_slides(
 @app.get("/api/stats")
 async def get_stats(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get statistics about the vector database."""
-    stats = embedding_manager.get_collection_stats()
+    retrieval_manager = await get_retrieval_manager_async()
+    stats = await asyncio.to_thread(retrieval_manager.embedding_manager.get_collection_stats)
+    stats["query_embedding_cache"] = retrieval_manager.query_cache.stats()
+    stats["answer_cache"] = answer_cache.stats()
+    figma_file_cache = get_figma_client().file_cache
+    stats["figma_file_cache"] = figma_file_cache.stats() if figma_file_cache else None
     return stats
 
 
@@ -630,7 +872,8 @@ async def search(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Search the design system."""
-    results = retrieval_manager.search(query, top_k=top_k)
+    retrieval_manager = await get_retrieval_manager_async()
+    results = await retrieval_manager.search(query, top_k=top_k)
     return results
 
 
@@ -644,7 +887,7 @@ async def search_figma_files(
     Search for Figma files by name.
     """
     try:
-        results = figma_client.search_team_files(query)
+        results = await asyncio.to_thread(get_figma_client().search_team_files, query)
         return {
             "query": query,
             "results": results,
@@ -671,7 +914,7 @@ async def export_figma_asset(
         if export_request.node_id:
             node_id = export_request.node_id
         else:
-            node_id = figma_client.search_node_by_name(file_key, export_request.node_name)
+            node_id = await asyncio.to_thread(get_figma_client().search_node_by_name, file_key, export_request.node_name)
         
         if not node_id:
             raise HTTPException(
@@ -680,7 +923,7 @@ async def export_figma_asset(
             )
         
         # Export as SVG
-        svg_content = figma_client.export_node_as_svg(file_key, node_id)
+        svg_content = await asyncio.to_thread(get_figma_client().export_node_as_svg, file_key, node_id)
         
         if not svg_content:
             raise HTTPException(
@@ -690,7 +933,7 @@ async def export_figma_asset(
         
         # Change color if requested
         if export_request.color:
-            svg_content = figma_client.change_svg_color(svg_content, export_request.color)
+            svg_content = get_figma_client().change_svg_color(svg_content, export_request.color)
         
         # Clean filename
         filename = re.sub(r'[^a-zA-Z0-9-_]', '-', export_request.node_name.lower())
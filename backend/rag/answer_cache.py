@@ -0,0 +1,166 @@
+"""
+Semantic cache of chat answers keyed on query embeddings.
+"""
+import itertools
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
+import numpy as np
+from config import settings
+
+
+# Brand color names; questions about different colors embed almost identically
+BRAND_COLOR_NAMES = ('vista blue', 'vista', 'blue ridge', 'dusk', 'lawn', 'plaster', 'dew', 'pine')
+
+# "#1b8751", "#fff", or a bare code with a digit in it (so words like "decade" don't count)
+HEX_CODE = re.compile(r'#(?:[0-9a-f]{6}|[0-9a-f]{3})\b|\b(?=[a-f]*\d)[0-9a-f]{6}\b')
+QUOTED = re.compile(r'"([^"]+)"|“([^”]+)”')
+NAMED_ASSET = re.compile(r'\b([\w-]+)\s+(?:icon|logo|symbol)s?\b')
+
+
+def key_terms(question: str) -> FrozenSet[str]:
+    """
+    Extract the terms that decide what a question is about: hex codes, quoted
+    names, brand color names and "<name> icon/logo/symbol" assets.
+    
+    Args:
+        question: Question text
+        
+    Returns:
+        Lowercased key terms
+    """
+    text = question.lower()
+    terms = {match.lstrip('#') for match in HEX_CODE.findall(text)}
+    terms.update(next(group for group in match if group).strip() for match in QUOTED.findall(text))
+    terms.update(name for name in NAMED_ASSET.findall(text) if name not in ('the', 'a', 'an', 'this', 'that'))
+    for name in BRAND_COLOR_NAMES:
+        if re.search(rf'\b{name}\b', text):
+            terms.add(name)
+            # "vista blue" also contains "vista"
+            text = text.replace(name, ' ')
+    return frozenset(terms)
+
+
+class SemanticAnswerCache:
+    """
+    In-process LRU cache of chat answers with a TTL.
+    A lookup hits when a cached question for the same endpoint was embedded
+    within similarity_threshold (cosine) of the new one, names the same key
+    terms (see key_terms) and was answered against the same collection
+    version, so any sync invalidates every entry.
+    """
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        similarity_threshold: Optional[float] = None
+    ):
+        self.max_entries = max_entries if max_entries is not None else settings.answer_cache_size
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.answer_cache_ttl
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None else settings.answer_cache_similarity
+        )
+        self.hits = 0
+        self.misses = 0
+        self._ids = itertools.count()
+        self._entries: "OrderedDict[int, Tuple[float, str, str, FrozenSet[str], np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(
+        self,
+        namespace: str,
+        question: str,
+        embedding: List[float],
+        collection_version: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up the answer to a semantically equivalent question.
+        
+        Args:
+            namespace: Scope the answer is valid in (e.g. "chat_simple", or "chat:<user>" for personalized answers)
+            question: Question text
+            embedding: Embedding of the question text
+            collection_version: Current collection version
+            
+        Returns:
+            Cached answer payload, or None on a miss
+        """
+        query = self._normalize(embedding)
+        terms = key_terms(question)
+        now = time.monotonic()
+        
+        with self._lock:
+            best_id, best_similarity = None, self.similarity_threshold
+            for entry_id, (created, entry_namespace, version, entry_terms, vector, _) in list(self._entries.items()):
+                if now - created >= self.ttl_seconds or version != collection_version:
+                    del self._entries[entry_id]
+                    continue
+                if entry_namespace != namespace or entry_terms != terms:
+                    continue
+                similarity = float(np.dot(query, vector))
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            
+            if best_id is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][5]
+    
+    def put(
+        self,
+        namespace: str,
+        question: str,
+        embedding: List[float],
+        collection_version: str,
+        payload: Dict[str, Any]
+    ) -> None:
+        """
+        Store an answer.
+        
+        Args:
+            namespace: Scope the answer is valid in
+            question: Question text
+            embedding: Embedding of the question text
+            collection_version: Collection version the answer was built from
+            payload: Answer to replay on a hit
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._entries[next(self._ids)] = (
+                time.monotonic(), namespace, collection_version, key_terms(question), vector, payload
+            )
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop every cached answer."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Unit-length float32 copy of an embedding, so a dot product is cosine similarity."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+# Global answer cache instance
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,106 @@
+"""
+Token-aware text chunking shared by the ingestion paths.
+"""
+import re
+from typing import List, Optional, Tuple
+from config import settings
+from rag.tokenizer import encode, decode, count_tokens
+
+
+# Split after sentence-ending punctuation, keeping the whitespace with the sentence
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+class TextChunker:
+    """Splits text into overlapping chunks measured in tokens."""
+    
+    def __init__(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None):
+        self.chunk_size = chunk_size or settings.chunk_size
+        self.chunk_overlap = min(
+            chunk_overlap if chunk_overlap is not None else settings.chunk_overlap,
+            self.chunk_size // 2
+        )
+    
+    def chunk(self, text: str) -> List[str]:
+        """
+        Split text into chunks of at most chunk_size tokens.
+        Chunks break on line boundaries where possible, then on sentence
+        boundaries, and only split inside a sentence when it is longer than
+        a whole chunk. Consecutive chunks share up to chunk_overlap tokens.
+        
+        Args:
+            text: Text to split
+            
+        Returns:
+            List of chunk strings (a single chunk if the text already fits)
+        """
+        if not text or not text.strip():
+            return []
+        
+        if count_tokens(text) <= self.chunk_size:
+            return [text]
+        
+        chunks = []
+        current: List[Tuple[str, int]] = []
+        current_tokens = 0
+        
+        for segment, tokens in self._segments(text):
+            if current and current_tokens + tokens > self.chunk_size:
+                chunks.append("".join(seg for seg, _ in current))
+                current = self._overlap_tail(current)
+                current_tokens = sum(n for _, n in current)
+                
+                # Drop overlap from the front until the new segment fits
+                while current and current_tokens + tokens > self.chunk_size:
+                    current_tokens -= current.pop(0)[1]
+            
+            current.append((segment, tokens))
+            current_tokens += tokens
+        
+        if current:
+            chunks.append("".join(seg for seg, _ in current))
+        
+        return [chunk.strip() for chunk in chunks if chunk.strip()]
+    
+    def _segments(self, text: str):
+        """Yield (segment, token_count) pairs no larger than chunk_size."""
+        for line in text.splitlines(keepends=True):
+            line_tokens = count_tokens(line)
+            if line_tokens <= self.chunk_size:
+                yield line, line_tokens
+                continue
+            
+            start = 0
+            sentences = []
+            for match in _SENTENCE_BOUNDARY.finditer(line):
+                sentences.append(line[start:match.end()])
+                start = match.end()
+            sentences.append(line[start:])
+            
+            for sentence in sentences:
+                if not sentence:
+                    continue
+                tokens = encode(sentence)
+                if len(tokens) <= self.chunk_size:
+                    yield sentence, len(tokens)
+                    continue
+                
+                # A single sentence longer than a chunk: hard split on tokens
+                for i in range(0, len(tokens), self.chunk_size):
+                    window = tokens[i:i + self.chunk_size]
+                    yield decode(window), len(window)
+    
+    def _overlap_tail(self, segments: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+        """Return the trailing segments that fit within chunk_overlap tokens."""
+        tail = []
+        total = 0
+        for segment, tokens in reversed(segments):
+            if total + tokens > self.chunk_overlap:
+                break
+            tail.insert(0, (segment, tokens))
+            total += tokens
+        return tail
+
+
+# Global chunker instance configured from settings
+text_chunker = TextChunker()
@@ -0,0 +1,238 @@
+"""
+Persistent, content-addressed cache for embedding vectors.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from config import settings
+
+
+class EmbeddingCache:
+    """SQLite-backed cache mapping hash(embedding model + text) to a vector."""
+    
+    # SQLite caps the number of bound parameters per statement
+    _MAX_VARIABLES = 500
+    # Eviction trims this fraction below max_entries so it runs once per batch of new rows
+    _EVICT_SLACK = 0.1
+    
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.path = path or os.path.join(settings.chroma_persist_directory, "embedding_cache.sqlite3")
+        self.max_entries = max_entries if max_entries is not None else settings.embedding_cache_max_entries
+        
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        # Upper bound on the row count from this process's view; other processes
+        # sharing the file are picked up by the exact count taken before evicting
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """
+        Build the cache key for a text embedded with a given model.
+        
+        Args:
+            model: Embedding model name
+            text: Text that was embedded
+            
+        Returns:
+            Hex digest identifying the (model, text) pair
+        """
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+    
+    def get_many(self, model: str, texts: List[str]) -> Dict[int, List[float]]:
+        """
+        Look up cached embeddings for a list of texts.
+        
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+            
+        Returns:
+            Mapping of text index to embedding vector for every cache hit
+        """
+        keys = [self.make_key(model, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        
+        with self._lock:
+            for i in range(0, len(keys), self._MAX_VARIABLES):
+                batch = keys[i:i + self._MAX_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            
+            # Touch hits so eviction drops the least recently used entries first
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        
+        return {idx: found[key] for idx, key in enumerate(keys) if key in found}
+    
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]) -> None:
+        """
+        Store embeddings for a list of texts and evict old entries if needed.
+        
+        Args:
+            model: Embedding model name
+            texts: Texts that were embedded
+            embeddings: Embedding vectors, aligned with texts
+        """
+        now = time.time()
+        rows = [
+            (self.make_key(model, text), array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows
+            )
+            # Replaced rows are counted too, which only makes eviction check sooner
+            self._rows += len(rows)
+            self._evict()
+            self._conn.commit()
+    
+    def count(self) -> int:
+        """Return the number of cached embeddings."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    
+    def clear(self) -> None:
+        """Remove every cached embedding."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._rows = 0
+    
+    def _evict(self) -> None:
+        """
+        Once the running row count passes max_entries, drop least recently used
+        entries down to the low-water mark (caller holds the lock).
+        """
+        if not self.max_entries or self.max_entries <= 0 or self._rows <= self.max_entries:
+            return
+        
+        total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = total - self.max_entries
+        if overflow > 0:
+            overflow += int(self.max_entries * self._EVICT_SLACK)
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+            total -= overflow
+        self._rows = total
+
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU cache of query text -> embedding with a TTL.
+    Optionally backed by the persistent EmbeddingCache so query vectors
+    survive restarts. The TTL only bounds how long an entry stays in memory:
+    a model's embedding of a text never changes, so an expired entry is
+    reloaded from the persistent cache rather than embedded again.
+    """
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        persistent: Optional[EmbeddingCache] = None
+    ):
+        self.max_entries = max_entries if max_entries is not None else settings.query_embedding_cache_size
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.query_embedding_cache_ttl
+        self.persistent = persistent
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, model: str, query: str) -> Optional[List[float]]:
+        """
+        Look up the embedding for a query.
+        
+        Args:
+            model: Embedding model name
+            query: Query text
+            
+        Returns:
+            Cached embedding, or None on a miss
+        """
+        key = (model, query)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+        
+        if self.persistent is not None:
+            found = self.persistent.get_many(model, [query])
+            if found:
+                embedding = found[0]
+                self._store(key, embedding)
+                with self._lock:
+                    self.hits += 1
+                return embedding
+        
+        with self._lock:
+            self.misses += 1
+        return None
+    
+    def put(self, model: str, query: str, embedding: List[float]) -> None:
+        """
+        Store the embedding for a query.
+        
+        Args:
+            model: Embedding model name
+            query: Query text
+            embedding: Embedding vector
+        """
+        self._store((model, query), embedding)
+        if self.persistent is not None:
+            self.persistent.put_many(model, [query], [embedding])
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+    
+    def _store(self, key: Tuple[str, str], embedding: List[float]) -> None:
+        """Insert into the in-memory LRU, evicting the oldest entries past max_entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -1,21 +1,83 @@
 """
 Vector embeddings and ChromaDB management.
 """
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from openai import OpenAI
-from typing import List, Dict, Any, Optional
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
 from config import settings
+from rag.embedding_cache import EmbeddingCache
+from rag.chunking import text_chunker
+from rag.ingestion import IngestionPipeline
+from rag.lexical import LexicalIndex
+from rag.providers import EmbeddingProvider, get_embedding_provider
+from rag.sync_state import sync_state
 import hashlib
 
 
+# Single collection used before collections were named per embedding model;
+# its vectors always came from the configured OpenAI embedding model
+LEGACY_COLLECTION_NAME = "design_system"
+
+
+def collection_name_for(model_id: str) -> str:
+    """
+    Name of the collection holding vectors from one embedding provider/model,
+    so switching providers never mixes incompatible vectors in one index.
+    
+    Args:
+        model_id: Provider model identifier (e.g. "openai:text-embedding-3-small")
+        
+    Returns:
+        ChromaDB collection name
+    """
+    slug = re.sub(r"[^a-zA-Z0-9]+", "_", model_id).strip("_").lower()
+    return f"design_system__{slug}"[:63].rstrip("_")
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """Identity of a file's current contents (atomic replaces change the inode), or None if it's missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _file_age(path: str) -> Optional[float]:
+    """Seconds since a file was last written, or None if it's missing."""
+    try:
+        return time.time() - os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
 class EmbeddingManager:
     """Manages vector embeddings and ChromaDB storage."""
     
-    def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+    def __init__(self, provider: Optional[EmbeddingProvider] = None):
+        # Embedding backend (OpenAI or local), selected by settings.embedding_provider
+        self.provider = provider or get_embedding_provider()
+        self.model_id = self.provider.model_id
+        self.collection_name = collection_name_for(self.model_id)
+        
+        # Persistent cache so unchanged documents are never re-embedded
+        self.embedding_cache = None
+        if settings.embedding_cache_enabled:
+            self.embedding_cache = EmbeddingCache(path=settings.embedding_cache_path)
+        
+        # Token-packed, concurrent embedding requests for ingestion
+        self.ingestion_pipeline = IngestionPipeline(self.create_embeddings_batch)
         
-        # Initialize ChromaDB
+        # Initialize ChromaDB (imported here: it is slow to import and only needed once the index is used)
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
         self.chroma_client = chromadb.PersistentClient(
             path=settings.chroma_persist_directory,
             settings=ChromaSettings(
@@ -23,15 +85,80 @@ class EmbeddingManager:
             )
         )
         
-        # Get or create collections
-        self.design_collection = self.chroma_client.get_or_create_collection(
-            name="design_system",
-            metadata={"description": "Design system components, styles, and documentation"}
-        )
+        # Full reindexes are written to a shadow generation of the collection and made
+        # live by atomically rewriting this alias file; queries always read the live one.
+        # Other processes sharing the persist directory (replicas, the snapshot CLI)
+        # can swap it too, so it is re-checked before every query and write.
+        self._alias_path = os.path.join(settings.chroma_persist_directory, f"{self.collection_name}.alias")
+        self._rebuild_lock = asyncio.Lock()
+        self._follow_lock = threading.Lock()
+        self._shadow: Optional[Tuple[str, Any, Optional[LexicalIndex]]] = None
+        # (name, full-text index, whether this process swapped it out and may delete it)
+        self._retired: List[Tuple[str, Optional[LexicalIndex], bool]] = []
+        self._gc_task: Optional[asyncio.Task] = None
+        
+        # Live collection plus the full-text index kept in step with it for hybrid search.
+        # Nothing is deleted here: generations this process doesn't know about may be
+        # another process's reindex in progress.
+        self._alias_stamp = _file_stamp(self._alias_path)
+        self.live_collection_name = self._read_alias() or self._adopt_legacy_collection() or self.collection_name
+        self.design_collection, self.lexical_index = self._open_generation(self.live_collection_name)
+        if self.live_collection_name == LEGACY_COLLECTION_NAME:
+            self._convert_legacy_metadata(self.design_collection)
+        
+        # Changes on every write so artifacts derived from the collection can detect staleness
+        self._version_path = os.path.join(settings.chroma_persist_directory, f"{self.collection_name}.version")
+        self._version_stamp = None
+        self._collection_version = ""
+        self._load_version()
+    
+    @property
+    def collection_version(self) -> str:
+        """Current collection version, re-read when another process has written to the collection."""
+        if _file_stamp(self._version_path) != self._version_stamp:
+            self._load_version()
+        return self._collection_version
+    
+    def alias_changed(self) -> bool:
+        """Whether the alias file was rewritten since this process last read it."""
+        return _file_stamp(self._alias_path) != self._alias_stamp
+    
+    def follow_alias(self) -> bool:
+        """
+        Switch to the generation the alias file names, if another process swapped
+        one in. The replaced generation's full-text index is closed at the next
+        garbage collection; the generation itself is left to the process that
+        retired it.
+        
+        Returns:
+            Whether the live collection changed
+        """
+        with self._follow_lock:
+            stamp = _file_stamp(self._alias_path)
+            if stamp == self._alias_stamp:
+                return False
+            self._alias_stamp = stamp
+            name = self._read_alias() or self.collection_name
+            if name == self.live_collection_name:
+                return False
+            
+            collection, lexical_index = self._open_generation(name)
+            self._retired.append((self.live_collection_name, self.lexical_index, False))
+            self.live_collection_name = name
+            self.design_collection = collection
+            self.lexical_index = lexical_index
+        
+        print(f"Following reindex by another process: {name} is live")
+        return True
     
-    def create_embedding(self, text: str) -> List[float]:
+    async def refresh_live(self) -> None:
+        """Follow a swap made by another process, opening the new generation off the event loop."""
+        if self.alias_changed():
+            await asyncio.to_thread(self.follow_alias)
+    
+    async def create_embedding(self, text: str) -> List[float]:
         """
-        Create an embedding for the given text using OpenAI.
+        Create an embedding for the given text using the configured provider.
         
         Args:
             text: Text to embed
@@ -39,15 +166,12 @@ class EmbeddingManager:
         Returns:
             Embedding vector
         """
-        response = self.client.embeddings.create(
-            model=settings.embedding_model,
-            input=text
-        )
-        return response.data[0].embedding
+        return (await self.provider.embed([text]))[0]
     
-    def create_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+    async def create_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """
         Create embeddings for multiple texts in a batch.
+        Texts already in the embedding cache are not sent to the provider.
         
         Args:
             texts: List of texts to embed
@@ -58,51 +182,131 @@ class EmbeddingManager:
         if not texts:
             return []
         
-        response = self.client.embeddings.create(
-            model=settings.embedding_model,
-            input=texts
-        )
-        return [item.embedding for item in response.data]
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        if self.embedding_cache:
+            cached = await asyncio.to_thread(self.embedding_cache.get_many, self.model_id, texts)
+            for idx, embedding in cached.items():
+                embeddings[idx] = embedding
+        
+        # Embed each distinct cache miss once
+        missing_texts = list(dict.fromkeys(text for text, emb in zip(texts, embeddings) if emb is None))
+        if missing_texts:
+            new_embeddings = await self.provider.embed(missing_texts)
+            if self.embedding_cache:
+                await asyncio.to_thread(
+                    self.embedding_cache.put_many, self.model_id, missing_texts, new_embeddings
+                )
+            
+            by_text = dict(zip(missing_texts, new_embeddings))
+            embeddings = [emb if emb is not None else by_text[text] for text, emb in zip(texts, embeddings)]
+        
+        return embeddings
     
-    def add_documents(
+    async def add_documents(
         self,
         documents: List[str],
         metadatas: List[Dict[str, Any]],
         ids: Optional[List[str]] = None
-    ) -> None:
+    ) -> List[str]:
         """
-        Add documents to the vector store.
+        Add or update documents in the vector store.
+        Writes are upserts keyed by stable IDs, so re-syncing the same content
+        replaces documents in place instead of duplicating them.
         
         Args:
             documents: List of text documents
             metadatas: List of metadata dictionaries
-            ids: Optional list of document IDs (auto-generated if not provided)
+            ids: Optional list of document IDs (derived from metadata if not provided)
+            
+        Returns:
+            List of document IDs that were written
         """
         if not documents:
-            return
+            return []
         
         # Generate IDs if not provided
         if ids is None:
-            ids = [self._generate_id(doc, meta, idx) for idx, (doc, meta) in enumerate(zip(documents, metadatas))]
+            ids = [self._generate_id(meta) for meta in metadatas]
         
-        # Create embeddings
-        embeddings = self.create_embeddings_batch(documents)
+        # Chroma rejects duplicate IDs within one call; the last occurrence wins
+        latest = {doc_id: idx for idx, doc_id in enumerate(ids)}
+        if len(latest) < len(ids):
+            keep = sorted(latest.values())
+            documents = [documents[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            ids = [ids[i] for i in keep]
         
-        # Add to ChromaDB
-        self.design_collection.add(
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
-        )
+        # Embed in parallel batches; each batch is upserted into ChromaDB as soon as it's ready
+        await self.refresh_live()
+        collection, lexical_index = self._write_target()
+        
+        def write_batch(batch_docs, batch_embeddings, batch_metas, batch_ids):
+            collection.upsert(
+                documents=batch_docs,
+                embeddings=batch_embeddings,
+                metadatas=batch_metas,
+                ids=batch_ids
+            )
+            if lexical_index:
+                lexical_index.upsert(batch_ids, batch_docs, batch_metas)
+        
+        try:
+            await self.ingestion_pipeline.run(documents, metadatas, ids, write_batch)
+        finally:
+            # Some batches may have landed even if a later one failed
+            await asyncio.to_thread(self._bump_version)
+        
+        return ids
+    
+    def write_embedded(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Any,
+        batch_size: int = 1000
+    ) -> int:
+        """
+        Write documents whose embeddings are already known (e.g. from a snapshot),
+        without calling the embedding provider.
+        
+        Args:
+            ids: Document IDs
+            documents: Document texts
+            metadatas: Metadata dictionaries
+            embeddings: Embedding vectors (list or 2-D array), aligned with ids
+            batch_size: Documents per ChromaDB upsert
+            
+        Returns:
+            Number of documents written
+        """
+        self.follow_alias()
+        collection, lexical_index = self._write_target()
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            collection.upsert(
+                documents=documents[start:end],
+                embeddings=np.asarray(embeddings[start:end], dtype=np.float32).tolist(),
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
+            if lexical_index:
+                lexical_index.upsert(ids[start:end], documents[start:end], metadatas[start:end])
+        
+        if ids:
+            self._bump_version()
+        return len(ids)
     
-    def add_figma_components(self, components: List[Dict[str, Any]], file_key: str) -> None:
+    async def add_figma_components(self, components: List[Dict[str, Any]], file_key: str) -> List[str]:
         """
         Add Figma components to the vector store.
         
         Args:
             components: List of component dictionaries
             file_key: Figma file key
+            
+        Returns:
+            List of document IDs that were written
         """
         documents = []
         metadatas = []
@@ -123,14 +327,17 @@ class EmbeddingManager:
                 "url": f"https://www.figma.com/file/{file_key}?node-id={comp['id']}"
             })
         
-        self.add_documents(documents, metadatas)
+        return await self.add_documents(documents, metadatas)
     
-    def add_figma_page_content(self, pages: List[Dict[str, Any]]) -> None:
+    async def add_figma_page_content(self, pages: List[Dict[str, Any]]) -> List[str]:
         """
         Add Figma page content to the vector store.
         
         Args:
             pages: List of page content dictionaries
+            
+        Returns:
+            List of document IDs that were written
         """
         documents = []
         metadatas = []
@@ -138,20 +345,15 @@ class EmbeddingManager:
         for page in pages:
             content = page['content']
             page_name = page['page_name']
+            page_id = page.get('page_id') or page_name
             is_example = page.get('is_example', False)
             example_type = page.get('example_type')
             content_category = page.get('content_category', 'general')
             
-            # Chunk large content to avoid embedding token limits
-            max_chunk_size = 2000  # characters per chunk
+            # Chunk large content by tokens to stay within embedding limits
+            chunks = text_chunker.chunk(content)
             
-            if len(content) > max_chunk_size:
-                # Split into chunks
-                chunks = []
-                for i in range(0, len(content), max_chunk_size):
-                    chunk = content[i:i+max_chunk_size]
-                    chunks.append(chunk)
-                
+            if len(chunks) > 1:
                 # Add each chunk as a separate document
                 for idx, chunk in enumerate(chunks):
                     doc_text = f"Page: {page_name} from {page['file_name']} (Part {idx+1}/{len(chunks)})\n\n{chunk}"
@@ -162,8 +364,10 @@ class EmbeddingManager:
                         "name": f"{page_name} (Part {idx+1})",
                         "file_key": page['file_key'],
                         "file_name": page['file_name'],
+                        "node_id": page_id,
+                        "chunk_index": idx,
                         "url": f"https://www.figma.com/file/{page['file_key']}",
-                        "is_example": str(is_example),
+                        "is_example": bool(is_example),
                         "example_type": example_type or "",
                         "content_category": content_category
                     })
@@ -177,26 +381,25 @@ class EmbeddingManager:
                     "name": page_name,
                     "file_key": page['file_key'],
                     "file_name": page['file_name'],
+                    "node_id": page_id,
+                    "chunk_index": 0,
                     "url": f"https://www.figma.com/file/{page['file_key']}",
-                    "is_example": str(is_example),
+                    "is_example": bool(is_example),
                     "example_type": example_type or "",
                     "content_category": content_category
                 })
         
-        if documents:
-            # Add in batches to avoid overwhelming the API
-            batch_size = 20
-            for i in range(0, len(documents), batch_size):
-                batch_docs = documents[i:i+batch_size]
-                batch_metas = metadatas[i:i+batch_size]
-                self.add_documents(batch_docs, batch_metas)
+        return await self.add_documents(documents, metadatas)
     
-    def add_figma_styles(self, tokens: Dict[str, Any]) -> None:
+    async def add_figma_styles(self, tokens: Dict[str, Any]) -> List[str]:
         """
         Add Figma design tokens/styles to the vector store.
         
         Args:
             tokens: Design tokens dictionary
+            
+        Returns:
+            List of document IDs that were written
         """
         documents = []
         metadatas = []
@@ -234,15 +437,17 @@ class EmbeddingManager:
                 "url": f"https://www.figma.com/file/{file_key}"
             })
         
-        if documents:
-            self.add_documents(documents, metadatas)
+        return await self.add_documents(documents, metadatas)
     
-    def add_figma_file_metadata(self, files: List[Dict[str, Any]]) -> None:
+    async def add_figma_file_metadata(self, files: List[Dict[str, Any]]) -> List[str]:
         """
         Add Figma file metadata to the vector store for searchability.
         
         Args:
             files: List of file metadata dictionaries
+            
+        Returns:
+            List of document IDs that were written
         """
         documents = []
         metadatas = []
@@ -255,25 +460,46 @@ class EmbeddingManager:
             doc_text += f"URL: {file['url']}\n"
             
             documents.append(doc_text)
-            metadatas.append({
-                "source": "figma",
-                "type": "file_metadata",
-                "name": file['name'],
-                "file_key": file['key'],
-                "project": file['project'],
-                "url": file['url'],
-                "last_modified": file.get('last_modified', '')
-            })
+            metadatas.append(self._file_metadata(file))
+        
+        return await self.add_documents(documents, metadatas)
+    
+    def _file_metadata(self, file: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadata stored with a Figma file's metadata document."""
+        return {
+            "source": "figma",
+            "type": "file_metadata",
+            "name": file['name'],
+            "file_key": file['key'],
+            "project": file['project'],
+            "url": file['url'],
+            "last_modified": file.get('last_modified', '')
+        }
+    
+    def file_metadata_ids(self, files: List[Dict[str, Any]]) -> List[str]:
+        """
+        Get the document IDs used for Figma file metadata entries.
         
-        if documents:
-            self.add_documents(documents, metadatas)
+        Args:
+            files: List of file metadata dictionaries
+            
+        Returns:
+            List of document IDs, aligned with files
+        """
+        return [
+            self._generate_id(self._file_metadata(file))
+            for file in files
+        ]
     
-    def add_slides_content(self, presentation: Dict[str, Any]) -> None:
+    async def add_slides_content(self, presentation: Dict[str, Any]) -> List[str]:
         """
         Add Google Slides content to the vector store.
         
         Args:
             presentation: Presentation content dictionary
+            
+        Returns:
+            List of document IDs that were written
         """
         documents = []
         metadatas = []
@@ -287,59 +513,570 @@ class EmbeddingManager:
             all_text = ' '.join(slide.get('texts', []))
             speaker_notes = slide.get('speaker_notes', '')
             
-            doc_text = f"Slide {slide['slide_number']} from '{pres_name}'\n"
+            body = ""
             if all_text:
-                doc_text += f"Content: {all_text}\n"
+                body += f"Content: {all_text}\n"
             if speaker_notes:
-                doc_text += f"Notes: {speaker_notes}\n"
+                body += f"Notes: {speaker_notes}\n"
             
-            if all_text or speaker_notes:
-                documents.append(doc_text)
+            # Long decks (UXR readouts) can exceed a chunk; split them the same way as pages
+            chunks = text_chunker.chunk(body)
+            for idx, chunk in enumerate(chunks):
+                header = f"Slide {slide['slide_number']} from '{pres_name}'"
+                if len(chunks) > 1:
+                    header += f" (Part {idx+1}/{len(chunks)})"
+                
+                documents.append(f"{header}\n{chunk}\n")
                 metadatas.append({
                     "source": "google_slides",
                     "type": "slide",
                     "presentation_name": pres_name,
                     "presentation_id": pres_id,
                     "slide_number": slide['slide_number'],
+                    "chunk_index": idx,
                     "url": web_link
                 })
         
-        if documents:
-            self.add_documents(documents, metadatas)
+        return await self.add_documents(documents, metadatas)
+    
+    async def missing_ids(self, ids: List[str]) -> List[str]:
+        """
+        Find which of the given document IDs are not stored.
+        
+        Args:
+            ids: Document IDs to check
+            
+        Returns:
+            IDs that are not in the collection writes currently go to
+        """
+        if not ids:
+            return []
+        await self.refresh_live()
+        collection, _ = self._write_target()
+        stored = set((await asyncio.to_thread(collection.get, ids=ids, include=[]))['ids'])
+        return [doc_id for doc_id in ids if doc_id not in stored]
+    
+    async def delete_documents(self, where: Dict[str, Any]) -> None:
+        """
+        Delete every document matching a metadata filter.
+        
+        Args:
+            where: ChromaDB metadata filter
+        """
+        await self.refresh_live()
+        collection, lexical_index = self._write_target()
+        ids = (await asyncio.to_thread(collection.get, where=where, include=[]))['ids']
+        if ids:
+            await asyncio.to_thread(collection.delete, ids=ids)
+            if lexical_index:
+                await asyncio.to_thread(lexical_index.delete, ids)
+            await asyncio.to_thread(self._bump_version)
+    
+    async def prune_documents(self, where: Dict[str, Any], keep_ids: List[str]) -> int:
+        """
+        Delete documents in a scope that the source no longer produces.
+        
+        Args:
+            where: ChromaDB metadata filter selecting the scope (e.g. one file)
+            keep_ids: IDs written by the latest sync of that scope
+            
+        Returns:
+            Number of documents deleted
+        """
+        keep = set(keep_ids)
+        await self.refresh_live()
+        collection, lexical_index = self._write_target()
+        existing = (await asyncio.to_thread(collection.get, where=where, include=[]))['ids']
+        stale = [doc_id for doc_id in existing if doc_id not in keep]
+        if stale:
+            await asyncio.to_thread(collection.delete, ids=stale)
+            if lexical_index:
+                await asyncio.to_thread(lexical_index.delete, stale)
+            await asyncio.to_thread(self._bump_version)
+        return len(stale)
+    
+    async def clear_collection(self) -> None:
+        """
+        Clear all documents from the collection.
+        An empty generation is swapped in rather than deleting the live
+        collection, so concurrent queries never hit a missing collection; the
+        old generation is removed after a grace period. Recorded sync state is
+        dropped so the next sync writes every file again.
+        
+        Raises:
+            RuntimeError: If a full reindex is running
+        """
+        if self._rebuild_lock.locked():
+            raise RuntimeError("A full reindex is already running")
+        
+        async with self._rebuild_lock:
+            name, collection, lexical_index = await asyncio.to_thread(self._create_generation)
+            self._swap_generation(name, collection, lexical_index)
+        
+        for kind in ("figma_file_metadata", "figma_file"):
+            sync_state.forget(self.sync_namespace(kind))
+        
+        self._gc_task = asyncio.create_task(self._collect_garbage_later(settings.reindex_gc_grace_seconds))
+    
+    def sync_namespace(self, kind: str) -> str:
+        """Sync-state namespace scoped to this collection, so a new embedding model resyncs everything."""
+        return f"{self.collection_name}/{kind}"
+    
+    @property
+    def rebuilding(self) -> bool:
+        """Whether a full reindex is currently writing to a shadow collection."""
+        return self._shadow is not None
+    
+    @asynccontextmanager
+    async def rebuild(self):
+        """
+        Run a full reindex into a shadow collection.
+        While the block runs, every write (add, delete, prune) goes to a fresh
+        shadow generation and queries keep reading the live collection. When
+        the block exits, the shadow is validated and atomically swapped in; the
+        previous generation is removed after a grace period. If the block
+        raises or validation fails, the shadow is dropped and the live
+        collection is untouched.
+        
+        Usage:
+            async with embedding_manager.rebuild():
+                await embedding_manager.add_figma_styles(tokens)
+                ...
+        """
+        if self._rebuild_lock.locked():
+            raise RuntimeError("A full reindex is already running")
+        
+        async with self._rebuild_lock:
+            name, collection, lexical_index = await asyncio.to_thread(self._create_generation)
+            self._shadow = (name, collection, lexical_index)
+            try:
+                yield self
+                await asyncio.to_thread(self.validate_generation, collection, lexical_index)
+            except BaseException:
+                self._shadow = None
+                await asyncio.to_thread(self._drop_generation, name, lexical_index)
+                raise
+            
+            self._swap_generation(name, collection, lexical_index)
+            print(f"Reindex complete: {name} is live ({collection.count()} documents)")
+        
+        self._gc_task = asyncio.create_task(self._collect_garbage_later(settings.reindex_gc_grace_seconds))
     
-    def clear_collection(self) -> None:
-        """Clear all documents from the collection."""
-        self.chroma_client.delete_collection(name="design_system")
-        self.design_collection = self.chroma_client.get_or_create_collection(
-            name="design_system",
-            metadata={"description": "Design system components, styles, and documentation"}
+    def validate_generation(self, collection, lexical_index: Optional[LexicalIndex]) -> None:
+        """
+        Check a rebuilt collection before it goes live.
+        
+        Args:
+            collection: Shadow ChromaDB collection
+            lexical_index: Full-text index built alongside it
+            
+        Raises:
+            RuntimeError: If the collection is empty, much smaller than the live
+                one, out of step with its full-text index, or too many sampled
+                documents can't be found by their own vectors
+        """
+        # Compare against what is live now, which another process may have swapped in
+        self.follow_alias()
+        count = collection.count()
+        live_count = self.design_collection.count()
+        if count == 0:
+            raise RuntimeError("Reindex produced an empty collection")
+        if count < live_count * settings.reindex_min_count_ratio:
+            raise RuntimeError(
+                f"Reindex produced {count} documents, fewer than "
+                f"{settings.reindex_min_count_ratio:.0%} of the {live_count} live documents"
+            )
+        if lexical_index and lexical_index.count() != count:
+            raise RuntimeError(
+                f"Full-text index has {lexical_index.count()} documents, collection has {count}"
+            )
+        
+        # Spot checks: sampled documents must come back as near neighbours of their own vectors
+        sample_ids = []
+        sample_embeddings = []
+        for offset in random.sample(range(count), min(settings.reindex_spot_checks, count)):
+            doc = collection.get(include=["embeddings"], limit=1, offset=offset)
+            sample_ids += doc['ids']
+            sample_embeddings += list(doc['embeddings'])
+        if not sample_ids:
+            return
+        
+        results = collection.query(
+            query_embeddings=sample_embeddings,
+            n_results=min(10, count),
+            include=["distances"]
+        )
+        # An identical vector under another ID (duplicate text) counts as a hit; HNSW
+        # is approximate, so only a low hit rate means vectors are missing or garbled
+        found = sum(
+            1 for doc_id, hits, distances in zip(sample_ids, results['ids'], results['distances'])
+            if doc_id in hits or (distances and distances[0] <= 1e-6)
         )
+        if found < len(sample_ids) * settings.reindex_spot_check_min_hit_rate:
+            raise RuntimeError(f"Reindex failed spot-check queries: {found}/{len(sample_ids)} documents found")
+    
+    def collect_garbage(self) -> List[str]:
+        """
+        Remove collection generations that are no longer in use.
+        Generations this process swapped out are removed. Any other generation
+        (swapped out by another process, or left behind by one that crashed) is
+        removed only once the alias has been stable for the GC grace period,
+        and an unfinished reindex only once it is older than
+        REINDEX_SHADOW_MAX_AGE_SECONDS, so a reindex running in another
+        process is never touched.
+        
+        Returns:
+            Names of the collections that were removed
+        """
+        # Another process may have swapped in a generation this one hasn't seen yet
+        self.follow_alias()
+        keep = {self.live_collection_name}
+        if self._shadow:
+            keep.add(self._shadow[0])
+        
+        owned: Dict[str, Optional[LexicalIndex]] = {}
+        for name, lexical_index, own in self._retired:
+            if name in keep:
+                continue
+            if own:
+                owned[name] = lexical_index
+            elif lexical_index:
+                lexical_index.close()
+        self._retired = [entry for entry in self._retired if entry[0] in keep]
+        
+        alias_age = _file_age(self._alias_path)
+        alias_settled = alias_age is None or alias_age >= settings.reindex_gc_grace_seconds
+        
+        prefix = self._generation_prefix()
+        removed = []
+        for name in self._collection_names():
+            if name in keep:
+                continue
+            if name in owned:
+                self._drop_generation(name, owned.pop(name))
+            elif (name == self.collection_name or name.startswith(prefix)) and self._abandoned(name, alias_settled):
+                self._drop_generation(name)
+            elif name == LEGACY_COLLECTION_NAME and alias_settled and self.design_collection.count() > 0:
+                # Pre-upgrade index that wasn't adopted, now that a resync has filled its replacement
+                self._drop_generation(name)
+            else:
+                continue
+            removed.append(name)
+        
+        # Retired generations whose collection was already gone
+        for lexical_index in owned.values():
+            if lexical_index:
+                lexical_index.close()
+        
+        if removed:
+            print(f"Removed retired collections: {', '.join(removed)}")
+        return removed
+    
+    async def wait_for_garbage_collection(self) -> None:
+        """Wait for the pending removal of a swapped-out generation, if there is one."""
+        if self._gc_task is not None:
+            await self._gc_task
+    
+    def sync_lexical_index(self, page_size: int = 1000) -> int:
+        """
+        Backfill the full-text index from the collection if they've drifted apart
+        (e.g. documents ingested before hybrid search was enabled).
+        
+        Args:
+            page_size: Number of documents to read from ChromaDB per page
+            
+        Returns:
+            Number of documents written to the full-text index
+        """
+        if not self.lexical_index:
+            return 0
+        
+        total = self.design_collection.count()
+        if self.lexical_index.count() == total:
+            return 0
+        
+        self.lexical_index.clear()
+        written = 0
+        for offset in range(0, total, page_size):
+            page = self.design_collection.get(
+                include=["documents", "metadatas"],
+                limit=page_size,
+                offset=offset
+            )
+            self.lexical_index.upsert(page['ids'], page['documents'], page['metadatas'])
+            written += len(page['ids'])
+        
+        return written
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the collection."""
         count = self.design_collection.count()
         return {
             "total_documents": count,
-            "collection_name": "design_system"
+            "collection_name": self.collection_name,
+            "live_collection": self.live_collection_name,
+            "rebuilding": self.rebuilding,
+            "embedding_model": self.model_id,
+            "collection_version": self.collection_version,
+            "lexical_documents": self.lexical_index.count() if self.lexical_index else 0,
+            "cached_embeddings": self.embedding_cache.count() if self.embedding_cache else 0
         }
     
-    def _generate_id(self, document: str, metadata: Dict[str, Any], index: int = 0) -> str:
-        """Generate a unique ID for a document."""
-        # Include more metadata to ensure uniqueness across files
+    def _write_target(self) -> Tuple[Any, Optional[LexicalIndex]]:
+        """Collection and full-text index that writes go to: the shadow during a rebuild, else the live one."""
+        if self._shadow:
+            return self._shadow[1], self._shadow[2]
+        return self.design_collection, self.lexical_index
+    
+    def _generation_prefix(self) -> str:
+        """Name prefix shared by every generation of this model's collection."""
+        return f"{self.collection_name[:52].rstrip('_')}__g"
+    
+    def _new_generation_name(self) -> str:
+        """Name for a new collection generation (within ChromaDB's 63 character limit)."""
+        return f"{self._generation_prefix()}{uuid.uuid4().hex[:8]}"
+    
+    def _collection_names(self) -> List[str]:
+        """Names of every collection in the ChromaDB database."""
+        return [
+            c if isinstance(c, str) else c.name
+            for c in self.chroma_client.list_collections()
+        ]
+    
+    def _adopt_legacy_collection(self) -> Optional[str]:
+        """
+        Keep serving an index built before collections were named per embedding
+        model. When this model has no collection yet and the old "design_system"
+        collection holds vectors of the configured OpenAI model's size, the alias
+        is pointed at it instead of starting from an empty index.
+        
+        Returns:
+            The adopted collection's name, or None if there is nothing to adopt
+        """
+        if self.provider.name != "openai" or not self.provider.dimensions:
+            return None
+        names = self._collection_names()
+        if self.collection_name in names or LEGACY_COLLECTION_NAME not in names:
+            return None
+        
+        sample = self.chroma_client.get_collection(LEGACY_COLLECTION_NAME).get(limit=1, include=["embeddings"])
+        if not sample['ids'] or len(sample['embeddings'][0]) != self.provider.dimensions:
+            return None
+        
+        self._write_alias(LEGACY_COLLECTION_NAME)
+        print(f"Adopted the existing {LEGACY_COLLECTION_NAME} collection for {self.model_id}")
+        return LEGACY_COLLECTION_NAME
+    
+    def _convert_legacy_metadata(self, collection, batch_size: int = 1000) -> int:
+        """
+        Rewrite is_example flags the legacy collection stored as "True"/"False"
+        strings as booleans, so example filters match them without a reindex.
+        Converted documents no longer match, so running it again is a no-op.
+        
+        Args:
+            collection: The adopted legacy collection
+            batch_size: Documents per ChromaDB get/update
+            
+        Returns:
+            Number of documents converted
+        """
+        converted = 0
+        while True:
+            batch = collection.get(
+                where={"is_example": {"$in": ["True", "False"]}},
+                limit=batch_size,
+                include=["metadatas"]
+            )
+            if not batch['ids']:
+                break
+            metadatas = [
+                {**metadata, "is_example": metadata["is_example"] == "True"}
+                for metadata in batch['metadatas']
+            ]
+            collection.update(ids=batch['ids'], metadatas=metadatas)
+            converted += len(batch['ids'])
+        if converted:
+            print(f"Converted is_example to a boolean on {converted} documents in {LEGACY_COLLECTION_NAME}")
+        return converted
+    
+    def _shadow_marker_path(self, name: str) -> str:
+        """File marking a generation as not yet swapped in; its age tells other processes how old the reindex is."""
+        return os.path.join(settings.chroma_persist_directory, f"{name}.shadow")
+    
+    def _create_generation(self) -> Tuple[str, Any, Optional[LexicalIndex]]:
+        """Create a new, empty generation, marked as a shadow before it becomes visible to other processes."""
+        name = self._new_generation_name()
+        marker = self._shadow_marker_path(name)
+        os.makedirs(os.path.dirname(os.path.abspath(marker)), exist_ok=True)
+        with open(marker, "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+        collection, lexical_index = self._open_generation(name)
+        return name, collection, lexical_index
+    
+    def _abandoned(self, name: str, alias_settled: bool) -> bool:
+        """Whether a generation no process is using can be removed (see collect_garbage)."""
+        marker_age = _file_age(self._shadow_marker_path(name))
+        if marker_age is not None:
+            return marker_age >= settings.reindex_shadow_max_age_seconds
+        return alias_settled
+    
+    def _lexical_path(self, name: str) -> str:
+        """Full-text index file for a collection generation."""
+        if settings.lexical_index_path:
+            if name == self.collection_name:
+                return settings.lexical_index_path
+            root, ext = os.path.splitext(settings.lexical_index_path)
+            return f"{root}-{name}{ext}"
+        return os.path.join(settings.chroma_persist_directory, f"lexical_{name}.sqlite3")
+    
+    def _open_generation(self, name: str) -> Tuple[Any, Optional[LexicalIndex]]:
+        """Get or create a collection generation and its full-text index."""
+        collection = self.chroma_client.get_or_create_collection(
+            name=name,
+            metadata={
+                "description": "Design system components, styles, and documentation",
+                "embedding_model": self.model_id
+            }
+        )
+        lexical_index = None
+        if settings.hybrid_search_enabled:
+            lexical_index = LexicalIndex(path=self._lexical_path(name))
+        return collection, lexical_index
+    
+    def _drop_generation(self, name: str, lexical_index: Optional[LexicalIndex] = None) -> None:
+        """Delete a collection generation and its full-text index file."""
+        try:
+            self.chroma_client.delete_collection(name=name)
+        except Exception as e:
+            print(f"Could not delete collection {name}: {e}")
+        if lexical_index:
+            lexical_index.close()
+        path = self._lexical_path(name)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        self._remove_shadow_marker(name)
+    
+    def _remove_shadow_marker(self, name: str) -> None:
+        """Delete a generation's shadow marker, if it has one."""
+        try:
+            os.remove(self._shadow_marker_path(name))
+        except FileNotFoundError:
+            pass
+    
+    def _swap_generation(self, name: str, collection, lexical_index: Optional[LexicalIndex]) -> None:
+        """Atomically make a generation live; the previous one is kept until garbage collection."""
+        self._write_alias(name)
+        self._remove_shadow_marker(name)
+        
+        self._retired.append((self.live_collection_name, self.lexical_index, True))
+        self.live_collection_name = name
+        self.design_collection = collection
+        self.lexical_index = lexical_index
+        self._shadow = None
+        self._bump_version()
+    
+    def _write_alias(self, name: str) -> None:
+        """Atomically point the alias file at a collection."""
+        os.makedirs(os.path.dirname(os.path.abspath(self._alias_path)), exist_ok=True)
+        tmp_path = f"{self._alias_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(name)
+        with self._follow_lock:
+            os.replace(tmp_path, self._alias_path)
+            self._alias_stamp = _file_stamp(self._alias_path)
+    
+    def _read_alias(self) -> Optional[str]:
+        """Read the name of the live collection generation, if one was ever swapped in."""
+        try:
+            with open(self._alias_path, "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+    
+    async def _collect_garbage_later(self, delay: float) -> None:
+        """Remove retired generations once in-flight queries against them have finished."""
+        await asyncio.sleep(delay)
+        try:
+            await asyncio.to_thread(self.collect_garbage)
+        except Exception as e:
+            print(f"Failed to remove retired collections: {e}")
+    
+    def _load_version(self) -> None:
+        """Read the persisted collection version, creating one if there is none yet."""
+        stamp = _file_stamp(self._version_path)
+        try:
+            with open(self._version_path, "r", encoding="utf-8") as f:
+                version = f.read().strip()
+            if version:
+                self._collection_version = version
+                self._version_stamp = stamp
+                return
+        except OSError:
+            pass
+        self._bump_version()
+    
+    def _bump_version(self) -> None:
+        """Mark the collection as changed and atomically persist the new version."""
+        if self._shadow:
+            # Writes into a shadow collection don't change what queries see
+            return
+        version = uuid.uuid4().hex
+        os.makedirs(os.path.dirname(os.path.abspath(self._version_path)), exist_ok=True)
+        tmp_path = f"{self._version_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, self._version_path)
+        self._collection_version = version
+        self._version_stamp = _file_stamp(self._version_path)
+    
+    def _generate_id(self, metadata: Dict[str, Any]) -> str:
+        """
+        Generate a stable ID for a document from where it came from.
+        The same source item always maps to the same ID, independent of
+        batch position or document text, so writes can be upserts.
+        """
+        # Most specific node identifier available for the document; a file's
+        # metadata entry is keyed on the file alone so renaming it keeps its ID
+        if metadata.get('type') == 'file_metadata':
+            node = ''
+        else:
+            node = (
+                metadata.get('node_id')
+                or metadata.get('component_id')
+                or metadata.get('style_id')
+                or metadata.get('slide_number')
+                or metadata.get('name', '')
+            )
         unique_parts = [
-            str(index),  # Add index to ensure uniqueness
             metadata.get('source', ''),
             metadata.get('type', ''),
-            metadata.get('file_key', ''),
-            metadata.get('presentation_id', ''),
-            metadata.get('name', ''),
-            str(metadata.get('slide_number', '')),
-            document[:200]
+            metadata.get('file_key') or metadata.get('presentation_id', ''),
+            node,
+            metadata.get('chunk_index', 0)
         ]
-        content = "_".join(str(p) for p in unique_parts if p)
+        content = "_".join(str(p) for p in unique_parts)
         return hashlib.md5(content.encode()).hexdigest()
 
 
-# Global embedding manager instance
-embedding_manager = EmbeddingManager()
+# Global embedding manager instance, created on first use
+_embedding_manager: Optional[EmbeddingManager] = None
+_embedding_manager_lock = threading.Lock()
+
+
+def get_embedding_manager() -> EmbeddingManager:
+    """Get the global embedding manager, opening ChromaDB on first use."""
+    global _embedding_manager
+    if _embedding_manager is None:
+        with _embedding_manager_lock:
+            if _embedding_manager is None:
+                _embedding_manager = EmbeddingManager()
+    return _embedding_manager
+
+
+async def get_embedding_manager_async() -> EmbeddingManager:
+    """Get the global embedding manager from async code; ChromaDB is opened in a worker thread, not on the event loop."""
+    if _embedding_manager is not None:
+        return _embedding_manager
+    return await asyncio.to_thread(get_embedding_manager)
 
@@ -0,0 +1,63 @@
+"""
+Precomputed brand-guidelines snapshot used by image analysis.
+"""
+import json
+import os
+import threading
+from typing import Dict, Any, Optional
+from config import settings
+
+
+class GuidelinesStore:
+    """
+    Brand guideline prompt sections built from the collection at sync time.
+    Each snapshot is stamped with the collection version it was built from,
+    so any later write to the collection makes it stale.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.chroma_persist_directory, "brand_guidelines.json")
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = self._load()
+    
+    def get(self, collection_version: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the snapshot if it was built from the given collection version.
+        
+        Args:
+            collection_version: Current version of the collection
+            
+        Returns:
+            Snapshot dictionary, or None if missing or stale
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.get("collection_version") != collection_version:
+            return None
+        return snapshot
+    
+    def save(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Replace the snapshot and persist it.
+        
+        Args:
+            snapshot: Snapshot dictionary including its collection_version
+        """
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+            self._snapshot = snapshot
+    
+    def _load(self) -> Optional[Dict[str, Any]]:
+        """Load the snapshot from disk, if a readable one exists."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+# Global guidelines store instance
+guidelines_store = GuidelinesStore()
@@ -0,0 +1,246 @@
+"""
+Concurrent embedding and write pipeline for document ingestion.
+"""
+import asyncio
+import random
+import time
+from typing import List, Dict, Any, Awaitable, Callable, Optional, Tuple
+from config import settings
+from rag.tokenizer import count_tokens
+
+
+EmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+WriteFn = Callable[[List[str], List[List[float]], List[Dict[str, Any]], List[str]], None]
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that backs off on rate limiting.
+    The limit halves on every 429 and grows back by one after each success
+    (AIMD), and a Retry-After pause blocks every worker until it expires.
+    """
+    
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self._active = 0
+        self._paused_until = 0.0
+        self._condition = asyncio.Condition()
+    
+    async def acquire(self) -> None:
+        """Wait until a slot is free and no rate-limit pause is in effect."""
+        async with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=pause)
+                    except asyncio.TimeoutError:
+                        pass
+                elif self._active >= self.limit:
+                    await self._condition.wait()
+                else:
+                    self._active += 1
+                    return
+    
+    async def release(self, success: bool) -> None:
+        """
+        Free a slot and adjust the limit.
+        
+        Args:
+            success: Whether the request succeeded (grows the limit by one)
+        """
+        async with self._condition:
+            self._active -= 1
+            if success and self.limit < self.max_concurrency:
+                self.limit += 1
+            self._condition.notify_all()
+    
+    async def throttle(self, retry_after: float) -> None:
+        """
+        Record a rate-limit response.
+        
+        Args:
+            retry_after: Seconds every worker should wait before the next request
+        """
+        async with self._condition:
+            self.limit = max(1, self.limit // 2)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self._condition.notify_all()
+
+
+class IngestionPipeline:
+    """
+    Embeds documents in token-packed batches with bounded parallelism and
+    writes each batch to the vector store as soon as its embeddings arrive,
+    so Chroma writes (run in a worker thread) overlap with the embedding
+    requests still in flight.
+    """
+    
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        max_concurrency: Optional[int] = None,
+        batch_max_tokens: Optional[int] = None,
+        batch_max_items: Optional[int] = None,
+        max_retries: Optional[int] = None
+    ):
+        self.embed_fn = embed_fn
+        self.batch_max_tokens = batch_max_tokens or settings.embedding_batch_max_tokens
+        self.batch_max_items = batch_max_items or settings.embedding_batch_max_items
+        self.max_retries = max_retries if max_retries is not None else settings.embedding_max_retries
+        self.limiter = AdaptiveLimiter(max_concurrency or settings.embedding_max_concurrency)
+    
+    async def run(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        write_fn: WriteFn
+    ) -> None:
+        """
+        Embed and write documents.
+        
+        Args:
+            documents: List of text documents
+            metadatas: List of metadata dictionaries
+            ids: List of document IDs
+            write_fn: Blocking writer called as write_fn(documents, embeddings, metadatas, ids) per batch
+        """
+        batches = self.pack_batches(documents)
+        if not batches:
+            return
+        
+        pending = {
+            asyncio.create_task(self._embed_with_retry([documents[i] for i in batch])): batch
+            for batch in batches
+        }
+        # Writes are chained so only one runs against Chroma at a time
+        last_write: Optional[asyncio.Task] = None
+        
+        async def write_after(previous: Optional[asyncio.Task], *args) -> None:
+            if previous is not None:
+                await previous
+            await asyncio.to_thread(write_fn, *args)
+        
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    batch = pending.pop(task)
+                    embeddings = task.result()
+                    last_write = asyncio.create_task(write_after(
+                        last_write,
+                        [documents[i] for i in batch],
+                        embeddings,
+                        [metadatas[i] for i in batch],
+                        [ids[i] for i in batch]
+                    ))
+        except BaseException as error:
+            for task in pending:
+                task.cancel()
+            # Collect the outcome of every other task, including ones that failed
+            # in the same round, and let an in-flight write finish
+            leftover = list(pending)
+            if last_write is not None:
+                leftover.append(last_write)
+            outcomes = await asyncio.gather(*leftover, return_exceptions=True)
+            for outcome in outcomes:
+                if isinstance(outcome, Exception) and outcome is not error:
+                    print(f"Ingestion batch also failed: {outcome}")
+            raise
+        
+        # Surface write errors
+        if last_write is not None:
+            await last_write
+    
+    def pack_batches(self, documents: List[str]) -> List[List[int]]:
+        """
+        Group document indexes into batches bounded by token count and size.
+        
+        Args:
+            documents: List of text documents
+            
+        Returns:
+            List of batches, each a list of document indexes
+        """
+        batches = []
+        current: List[int] = []
+        current_tokens = 0
+        
+        for idx, doc in enumerate(documents):
+            tokens = count_tokens(doc)
+            if current and (
+                current_tokens + tokens > self.batch_max_tokens
+                or len(current) >= self.batch_max_items
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(idx)
+            current_tokens += tokens
+        
+        if current:
+            batches.append(current)
+        
+        return batches
+    
+    async def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch, retrying rate-limit and transient server errors."""
+        attempt = 0
+        while True:
+            await self.limiter.acquire()
+            try:
+                embeddings = await self.embed_fn(texts)
+            except Exception as e:
+                await self.limiter.release(success=False)
+                retryable, retry_after = self._classify_error(e, attempt)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                if retry_after is not None:
+                    await self.limiter.throttle(retry_after)
+                else:
+                    await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            
+            await self.limiter.release(success=True)
+            return embeddings
+    
+    def _classify_error(self, error: Exception, attempt: int) -> Tuple[bool, Optional[float]]:
+        """
+        Decide whether an embedding error is worth retrying.
+        
+        Returns:
+            (retryable, retry_after) where retry_after is set for rate limiting
+        """
+        status = getattr(error, "status_code", None)
+        if status == 429:
+            return True, self._retry_after(error) or self._backoff(attempt)
+        if status is not None and status >= 500:
+            return True, None
+        # Connection errors and timeouts have no status code
+        if status is None and type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+            return True, None
+        return False, None
+    
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Read the Retry-After header from an API error, if present."""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        for header in ("retry-after-ms", "retry-after"):
+            value = headers.get(header)
+            if value is None:
+                continue
+            try:
+                seconds = float(value)
+            except ValueError:
+                continue
+            return seconds / 1000 if header == "retry-after-ms" else seconds
+        return None
+    
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Exponential backoff with jitter, capped at 30 seconds."""
+        return min(30.0, (2 ** attempt) * 0.5) + random.uniform(0, 0.25)
@@ -0,0 +1,210 @@
+"""
+Local full-text (BM25) index kept alongside the vector store.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from config import settings
+
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+_COMPARISONS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def where_sql(where: Optional[Dict[str, Any]], column: str = "metadata") -> Tuple[str, List[Any]]:
+    """
+    Translate a ChromaDB-style metadata filter into an SQL condition on a JSON column.
+    Supports equality, $eq, $ne, $in, $nin, $gt/$gte/$lt/$lte, $and and $or.
+    
+    Args:
+        where: ChromaDB metadata filter (None matches everything)
+        column: Column holding the metadata as JSON
+        
+    Returns:
+        SQL condition and its parameters
+    """
+    if not where:
+        return "1", []
+    
+    clauses = []
+    params: List[Any] = []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            parts = [where_sql(clause, column) for clause in condition]
+            if not parts:
+                clauses.append("1" if key == "$and" else "0")
+                continue
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+            for _, part_params in parts:
+                params += part_params
+            continue
+        
+        field = f"json_extract({column}, ?)"
+        path = '$."' + key.replace('"', '\\"') + '"'
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        
+        for op, expected in condition.items():
+            if op == "$eq":
+                clauses.append(f"{field} IS ?")
+                params += [path, expected]
+            elif op == "$ne":
+                clauses.append(f"{field} IS NOT ?")
+                params += [path, expected]
+            elif op in ("$in", "$nin"):
+                if not expected:
+                    clauses.append("0" if op == "$in" else "1")
+                    continue
+                placeholders = ",".join("?" * len(expected))
+                if op == "$in":
+                    clauses.append(f"{field} IN ({placeholders})")
+                    params += [path, *expected]
+                else:
+                    # Documents without the key don't match a $nin value
+                    clauses.append(f"({field} IS NULL OR {field} NOT IN ({placeholders}))")
+                    params += [path, path, *expected]
+            elif op in _COMPARISONS:
+                clauses.append(f"{field} {_COMPARISONS[op]} ?")
+                params += [path, expected]
+            else:
+                raise ValueError(f"Unsupported metadata filter operator: {op}")
+    
+    return " AND ".join(clauses) or "1", params
+
+
+class LexicalIndex:
+    """SQLite FTS5 index over the same documents stored in ChromaDB."""
+    
+    _MAX_VARIABLES = 500
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.chroma_persist_directory, "lexical_index.sqlite3")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL UNIQUE,
+                content TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                content, content='documents', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+                INSERT INTO documents_fts (rowid, content) VALUES (new.id, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+                INSERT INTO documents_fts (documents_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+                INSERT INTO documents_fts (documents_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                INSERT INTO documents_fts (rowid, content) VALUES (new.id, new.content);
+            END;
+        """)
+        self._conn.commit()
+    
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """
+        Insert or replace documents in the index.
+        
+        Args:
+            ids: Document IDs (same IDs as in ChromaDB)
+            documents: Document texts
+            metadatas: Document metadata dictionaries
+        """
+        rows = [
+            (doc_id, doc, json.dumps(meta or {}))
+            for doc_id, doc, meta in zip(ids, documents, metadatas)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO documents (doc_id, content, metadata) VALUES (?, ?, ?) "
+                "ON CONFLICT (doc_id) DO UPDATE SET content = excluded.content, metadata = excluded.metadata",
+                rows
+            )
+            self._conn.commit()
+    
+    def delete(self, ids: List[str]) -> None:
+        """
+        Remove documents from the index.
+        
+        Args:
+            ids: Document IDs to remove
+        """
+        with self._lock:
+            for i in range(0, len(ids), self._MAX_VARIABLES):
+                batch = ids[i:i + self._MAX_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM documents WHERE doc_id IN ({placeholders})", batch)
+            self._conn.commit()
+    
+    def clear(self) -> None:
+        """Remove every document from the index."""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.commit()
+    
+    def close(self) -> None:
+        """Close the database connection (e.g. before the index file is removed)."""
+        with self._lock:
+            self._conn.close()
+    
+    def count(self) -> int:
+        """Return the number of indexed documents."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        where: Optional[Dict[str, Any]] = None,
+        phrase: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Rank documents by BM25 against the query.
+        
+        Args:
+            query: Search query text
+            top_k: Number of results to return
+            where: Optional ChromaDB-style metadata filter
+            phrase: Require the query words to appear consecutively
+            
+        Returns:
+            Search results with ids, documents, metadatas and bm25 scores (lower is better)
+        """
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'scores': []}
+        words = _WORD_PATTERN.findall(query.lower())
+        if not words:
+            return results
+        
+        quoted = ['"' + word.replace('"', '""') + '"' for word in words]
+        match = '"' + " ".join(words).replace('"', '""') + '"' if phrase else " OR ".join(quoted)
+        
+        # The metadata filter runs in SQL, so the LIMIT applies to matching documents
+        condition, params = where_sql(where, "d.metadata")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.doc_id, d.content, d.metadata, bm25(documents_fts) AS score "
+                "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+                f"WHERE documents_fts MATCH ? AND {condition} ORDER BY score LIMIT ?",
+                (match, *params, top_k)
+            ).fetchall()
+        
+        for doc_id, content, metadata_json, score in rows:
+            results['ids'].append(doc_id)
+            results['documents'].append(content)
+            results['metadatas'].append(json.loads(metadata_json))
+            results['scores'].append(score)
+        
+        return results
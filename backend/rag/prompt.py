@@ -0,0 +1,148 @@
+"""
+Token-budgeted prompt assembly for the chat and analysis endpoints.
+"""
+from typing import Callable, Dict, List, Optional, Union
+from config import settings
+from rag.tokenizer import count_tokens, truncate_tokens
+
+
+# Tokens the chat format adds around each message (role, separators)
+_MESSAGE_OVERHEAD = 4
+
+SectionContent = Union[str, Callable[[int], str]]
+
+
+class PromptTooLongError(ValueError):
+    """The user message doesn't fit in the prompt budget on its own."""
+
+
+class PromptBuilder:
+    """
+    Assembles chat messages within a fixed prompt token budget.
+    The system message starts with the static instructions so the prefix is
+    identical across requests (and eligible for provider-side prompt
+    caching), followed by the dynamic sections in the order they were added.
+    Budget is handed out in priority order: the instructions and the user
+    message first, then conversation history, then sections by priority.
+    The user message is always sent in full; history and sections shrink to
+    make room for it.
+    """
+    
+    def __init__(self, instructions: str, budget: Optional[int] = None):
+        self.instructions = instructions
+        self.budget = budget or settings.prompt_token_budget
+        self._sections: List[tuple] = []
+        self._history: List[Dict[str, str]] = []
+        self._history_tokens = 0
+    
+    def add_section(
+        self,
+        content: SectionContent,
+        max_tokens: Optional[int] = None,
+        priority: int = 0
+    ) -> "PromptBuilder":
+        """
+        Add a dynamic section to the system message.
+        
+        Args:
+            content: Section text, or a function that renders the section
+                within a token budget (e.g. packing whole documents)
+            max_tokens: Cap on the section's tokens
+            priority: Lower priorities are allocated budget first
+            
+        Returns:
+            The builder, for chaining
+        """
+        self._sections.append((content, max_tokens, priority))
+        return self
+    
+    def add_history(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> "PromptBuilder":
+        """
+        Add conversation history; the most recent messages that fit are kept.
+        
+        Args:
+            messages: Prior messages with role and content
+            max_tokens: Cap on the history's tokens
+            
+        Returns:
+            The builder, for chaining
+        """
+        self._history = list(messages)
+        self._history_tokens = max_tokens if max_tokens is not None else settings.prompt_history_tokens
+        return self
+    
+    def check(self, user_message: str) -> int:
+        """
+        Check that the user message fits in the budget next to the instructions.
+        
+        Args:
+            user_message: The current user message
+            
+        Returns:
+            Tokens left for history and sections
+            
+        Raises:
+            PromptTooLongError: If the message alone exceeds the budget
+        """
+        message_tokens = count_tokens(user_message)
+        remaining = (
+            self.budget
+            - count_tokens(self.instructions)
+            - message_tokens
+            - 2 * _MESSAGE_OVERHEAD
+        )
+        if remaining < 0:
+            raise PromptTooLongError(
+                f"Message is {message_tokens} tokens; the most that fits is {message_tokens + remaining}"
+            )
+        return remaining
+    
+    def build(self, user_message: str) -> List[Dict[str, str]]:
+        """
+        Render the messages for a chat completion.
+        
+        Args:
+            user_message: The current user message
+            
+        Returns:
+            Messages list (system, history, user)
+            
+        Raises:
+            PromptTooLongError: If the message alone exceeds the budget
+        """
+        remaining = self.check(user_message)
+        
+        history = self._fit_history(min(self._history_tokens, remaining))
+        remaining -= sum(count_tokens(msg["content"]) + _MESSAGE_OVERHEAD for msg in history)
+        
+        rendered: Dict[int, str] = {}
+        order = sorted(range(len(self._sections)), key=lambda i: self._sections[i][2])
+        for i in order:
+            content, max_tokens, _ = self._sections[i]
+            allowance = max(remaining, 0) if max_tokens is None else min(max_tokens, max(remaining, 0))
+            text = content(allowance) if callable(content) else content
+            text = truncate_tokens(text, allowance) if text else ""
+            rendered[i] = text
+            remaining -= count_tokens(text)
+        
+        sections = [rendered[i] for i in range(len(self._sections)) if rendered[i].strip()]
+        system_prompt = "\n\n".join([self.instructions] + sections)
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            *history,
+            {"role": "user", "content": user_message}
+        ]
+    
+    def _fit_history(self, max_tokens: int) -> List[Dict[str, str]]:
+        """Keep the newest history messages whose total fits in max_tokens."""
+        kept = []
+        used = 0
+        for msg in reversed(self._history):
+            message = {"role": msg.get("role", "user"), "content": msg.get("content", "")}
+            tokens = count_tokens(message["content"]) + _MESSAGE_OVERHEAD
+            if used + tokens > max_tokens:
+                break
+            kept.insert(0, message)
+            used += tokens
+        return kept
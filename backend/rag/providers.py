@@ -0,0 +1,139 @@
+"""
+Embedding providers: OpenAI and an offline local backend.
+"""
+import asyncio
+import hashlib
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import List, Optional
+from config import settings
+
+
+# Vector sizes of the OpenAI embedding models at their default dimensions
+OPENAI_EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class EmbeddingProvider(ABC):
+    """Interface for turning texts into embedding vectors."""
+    
+    name: str = ""
+    
+    # Vector size, if known without embedding anything
+    dimensions: Optional[int] = None
+    
+    def __init__(self, model: str):
+        self.model = model
+    
+    @property
+    def model_id(self) -> str:
+        """Identifier for the provider/model pair; vectors from different ids never mix."""
+        return f"{self.name}:{self.model}"
+    
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of texts.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            Embedding vectors, aligned with texts
+        """
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from the OpenAI API."""
+    
+    name = "openai"
+    
+    def __init__(self, model: Optional[str] = None, api_key: Optional[str] = None):
+        super().__init__(model or settings.embedding_model)
+        self.dimensions = OPENAI_EMBEDDING_DIMENSIONS.get(self.model)
+        from openai import AsyncOpenAI
+        
+        self.client = AsyncOpenAI(api_key=api_key or settings.openai_api_key)
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        response = await self.client.embeddings.create(
+            model=self.model,
+            input=texts
+        )
+        return [item.embedding for item in response.data]
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Local CPU embeddings via feature hashing.
+    Words and character trigrams are hashed into a fixed number of signed
+    buckets with sublinear term-frequency weighting and L2-normalized. No
+    network, no model files, deterministic across runs - suited to latency-
+    critical paths, offline development, benchmarks and CI.
+    """
+    
+    name = "hashing"
+    
+    _WORD = re.compile(r"\w+", re.UNICODE)
+    
+    def __init__(self, dimensions: Optional[int] = None):
+        self.dimensions = dimensions or settings.local_embedding_dim
+        super().__init__(f"hash-{self.dimensions}")
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        # Pure-Python hashing is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(lambda: [self.embed_text(text) for text in texts])
+    
+    def embed_text(self, text: str) -> List[float]:
+        """
+        Embed a single text synchronously.
+        
+        Args:
+            text: Text to embed
+            
+        Returns:
+            L2-normalized embedding vector
+        """
+        vector = [0.0] * self.dimensions
+        for feature, count in self._features(text).items():
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            sign = 1.0 if digest >> 63 else -1.0
+            vector[digest % self.dimensions] += sign * (1.0 + math.log(count))
+        
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm > 0:
+            vector = [v / norm for v in vector]
+        return vector
+    
+    def _features(self, text: str) -> Counter:
+        """Word unigrams plus character trigrams of each word."""
+        features: Counter = Counter()
+        for word in self._WORD.findall(text.lower()):
+            features[f"w:{word}"] += 1
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                features[f"c:{padded[i:i + 3]}"] += 1
+        return features
+
+
+def get_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """
+    Create the embedding provider selected in settings.
+    
+    Args:
+        name: Provider name ("openai" or "hashing"); defaults to settings.embedding_provider
+        
+    Returns:
+        Embedding provider instance
+    """
+    name = (name or settings.embedding_provider).lower()
+    if name == "openai":
+        return OpenAIEmbeddingProvider()
+    if name in ("hashing", "local"):
+        return HashingEmbeddingProvider()
+    raise ValueError(f"Unknown embedding provider: {name}")
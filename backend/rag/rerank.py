@@ -0,0 +1,66 @@
+"""
+Diversity-aware reranking of retrieved documents.
+"""
+from typing import List, Optional
+import numpy as np
+from config import settings
+
+
+def mmr_select(
+    embeddings: List[List[float]],
+    top_k: int,
+    lambda_mult: Optional[float] = None,
+    duplicate_threshold: Optional[float] = None
+) -> List[int]:
+    """
+    Pick documents by maximal marginal relevance.
+    Each step takes the candidate that best trades relevance against
+    similarity to what was already picked; candidates nearly identical to a
+    picked document (e.g. overlapping chunks of one page) are dropped
+    outright. Relevance comes from retrieval order (1 for the first
+    candidate, 1/2 for the second, ...), so fused and exact rankings are
+    respected; embeddings only measure redundancy.
+    
+    Args:
+        embeddings: Candidate document embeddings, in retrieval order
+        top_k: Number of documents to pick
+        lambda_mult: Weight of relevance versus diversity (1.0 is pure relevance)
+        duplicate_threshold: Cosine similarity at which a candidate counts as a duplicate
+        
+    Returns:
+        Indexes into embeddings, in the order they were picked
+    """
+    lambda_mult = settings.mmr_lambda if lambda_mult is None else lambda_mult
+    duplicate_threshold = settings.mmr_duplicate_threshold if duplicate_threshold is None else duplicate_threshold
+    
+    if not len(embeddings) or top_k <= 0:
+        return []
+    
+    matrix = _normalize(np.asarray(embeddings, dtype=np.float32))
+    relevance = 1.0 / np.arange(1, len(matrix) + 1, dtype=np.float32)
+    similarity = matrix @ matrix.T
+    
+    selected: List[int] = []
+    # Highest similarity of each candidate to anything selected so far
+    redundancy = np.full(len(matrix), -np.inf, dtype=np.float32)
+    available = np.ones(len(matrix), dtype=bool)
+    
+    while len(selected) < top_k and available.any():
+        diversity = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * diversity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+        available &= redundancy < duplicate_threshold
+    
+    return selected
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length so dot products are cosine similarities."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
@@ -1,50 +1,426 @@
 """
 Document retrieval and context management for RAG.
 """
+import asyncio
+import re
+import threading
+import numpy as np
 from typing import List, Dict, Any, Optional
-from rag.embeddings import embedding_manager
+from rag.embeddings import EmbeddingManager, get_embedding_manager
+from rag.embedding_cache import QueryEmbeddingCache
+from rag.rerank import mmr_select
+from rag.tokenizer import count_tokens
 from config import settings
 
 
+# Queries that are just a hex code, e.g. "#1B8751"
+_HEX_QUERY = re.compile(r"^#?[0-9a-fA-F]{6}$")
+_WORD = re.compile(r"\w+")
+
+
 class RetrievalManager:
     """Manages document retrieval for RAG pipeline."""
     
-    def __init__(self):
-        self.embedding_manager = embedding_manager
-        self.collection = embedding_manager.design_collection
+    def __init__(self, embedding_manager: Optional[EmbeddingManager] = None):
+        self.embedding_manager = embedding_manager or get_embedding_manager()
+        self.query_cache = QueryEmbeddingCache(
+            persistent=self.embedding_manager.embedding_cache if settings.query_embedding_cache_persist else None
+        )
+        # Live collection whose full-text index has been checked for drift
+        self._lexical_synced_for: Optional[str] = None
+    
+    @property
+    def collection(self):
+        """The live ChromaDB collection (follows reindex swaps; see refresh_live)."""
+        return self.embedding_manager.design_collection
+    
+    @property
+    def lexical_index(self):
+        """The full-text index paired with the live collection."""
+        return self.embedding_manager.lexical_index
     
-    def search(
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Get the embedding for a query, using the query embedding cache.
+        
+        Args:
+            query: Search query text
+            
+        Returns:
+            Query embedding vector
+        """
+        return (await self.embed_queries([query]))[0]
+    
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Get embeddings for several queries, sending every cache miss to the
+        embedding provider in a single request.
+        
+        Args:
+            queries: Search query texts
+            
+        Returns:
+            Query embedding vectors, aligned with queries
+        """
+        model = self.embedding_manager.model_id
+        
+        def lookup():
+            return [self.query_cache.get(model, query) for query in queries]
+        
+        embeddings = await asyncio.to_thread(lookup)
+        missing = list(dict.fromkeys(q for q, e in zip(queries, embeddings) if e is None))
+        if not missing:
+            return embeddings
+        
+        new_embeddings = dict(zip(missing, await self.embedding_manager.provider.embed(missing)))
+        
+        def store():
+            for query, embedding in new_embeddings.items():
+                self.query_cache.put(model, query, embedding)
+        
+        await asyncio.to_thread(store)
+        return [e if e is not None else new_embeddings[q] for q, e in zip(queries, embeddings)]
+    
+    async def search(
         self,
         query: str,
         top_k: Optional[int] = None,
-        filter_dict: Optional[Dict[str, Any]] = None
+        filter_dict: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """
-        Search for relevant documents using semantic similarity.
+        Search for relevant documents.
+        With hybrid search enabled, BM25 full-text and vector results are fused
+        with reciprocal rank fusion, and exact name/hex lookups are answered
+        from the full-text index without an embedding call.
         
         Args:
             query: Search query text
             top_k: Number of results to return (default from settings)
             filter_dict: Optional metadata filters
+            include: ChromaDB fields to return (default documents, metadatas and distances)
             
         Returns:
             Search results with documents and metadata
         """
         top_k = top_k or settings.top_k_results
+        include = include or ["documents", "metadatas", "distances"]
+        await self.embedding_manager.refresh_live()
+        
+        if not self.lexical_index:
+            return await self._vector_search(query, top_k, filter_dict, include)
+        
+        await self._ensure_lexical_synced()
+        
+        exact = await asyncio.to_thread(self._exact_lookup, query, top_k, filter_dict)
+        if exact is not None:
+            return self._select_fields(exact, include)
+        
+        return await self._hybrid_search(query, top_k, filter_dict, include)
+    
+    async def _hybrid_search(
+        self,
+        query: str,
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        include: List[str]
+    ) -> Dict[str, Any]:
+        """Fuse vector and BM25 full-text results with reciprocal rank fusion."""
+        candidates = max(top_k * 2, 10)
+        vector_include = ["documents", "metadatas", "distances"]
+        if "embeddings" in include:
+            vector_include.append("embeddings")
+        vector_results, lexical_results = await asyncio.gather(
+            self._vector_search(query, candidates, filter_dict, vector_include),
+            asyncio.to_thread(self.lexical_index.search, query, candidates, filter_dict)
+        )
+        
+        return self._select_fields(self._fuse(vector_results, lexical_results, top_k), include)
+    
+    async def search_many(
+        self,
+        queries: List[str],
+        top_k: Optional[List[int]] = None,
+        include: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several unfiltered searches together: one embedding request for
+        all of them and one ChromaDB query with many query embeddings.
+        Results match what search() returns for each query on its own.
+        
+        Args:
+            queries: Search query texts
+            top_k: Number of results per query (default from settings)
+            include: ChromaDB fields to return (default documents, metadatas and distances)
+            
+        Returns:
+            Search results, aligned with queries
+        """
+        if not queries:
+            return []
+        
+        top_ks = list(top_k) if top_k else [settings.top_k_results] * len(queries)
+        include = include or ["documents", "metadatas", "distances"]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        await self.embedding_manager.refresh_live()
+        
+        if self.lexical_index:
+            await self._ensure_lexical_synced()
+            exact = await asyncio.to_thread(
+                lambda: [self._exact_lookup(q, k, None) for q, k in zip(queries, top_ks)]
+            )
+            for i, hits in enumerate(exact):
+                if hits is not None:
+                    results[i] = self._select_fields(hits, include)
         
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+        
+        if not self.lexical_index:
+            vector_results = await self._vector_search_many(
+                [queries[i] for i in pending], [top_ks[i] for i in pending], include
+            )
+            for i, result in zip(pending, vector_results):
+                results[i] = result
+            return results
+        
+        candidates = [max(top_ks[i] * 2, 10) for i in pending]
+        vector_results, lexical_results = await asyncio.gather(
+            self._vector_search_many(
+                [queries[i] for i in pending], candidates, ["documents", "metadatas", "distances"]
+            ),
+            asyncio.to_thread(
+                lambda: [self.lexical_index.search(queries[i], n) for i, n in zip(pending, candidates)]
+            )
+        )
+        for i, vector, lexical in zip(pending, vector_results, lexical_results):
+            results[i] = self._select_fields(self._fuse(vector, lexical, top_ks[i]), include)
+        
+        return results
+    
+    async def _ensure_lexical_synced(self) -> None:
+        """Backfill the full-text index once per live collection before the first hybrid search."""
+        live = self.embedding_manager.live_collection_name
+        if self._lexical_synced_for != live:
+            await asyncio.to_thread(self.embedding_manager.sync_lexical_index)
+            self._lexical_synced_for = live
+    
+    async def _vector_search_many(
+        self,
+        queries: List[str],
+        top_ks: List[int],
+        include: List[str]
+    ) -> List[Dict[str, Any]]:
+        """Run unfiltered embedding searches for several queries in one ChromaDB call."""
+        query_embeddings = await self.embed_queries(queries)
+        results = await asyncio.to_thread(
+            self.collection.query,
+            query_embeddings=query_embeddings,
+            n_results=max(top_ks),
+            include=include
+        )
+        
+        formatted = []
+        for row, top_k in enumerate(top_ks):
+            result = self._format_results(results, row)
+            formatted.append({field: values[:top_k] for field, values in result.items()})
+        return formatted
+    
+    async def _vector_search(
+        self,
+        query: str,
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        include: List[str]
+    ) -> Dict[str, Any]:
+        """Run a pure embedding search against ChromaDB."""
         # Create query embedding
-        query_embedding = self.embedding_manager.create_embedding(query)
+        query_embedding = await self.embed_query(query)
         
-        # Search in ChromaDB
-        results = self.collection.query(
+        # Search in ChromaDB (blocking, so run it off the event loop)
+        if filter_dict:
+            return await asyncio.to_thread(
+                self._filtered_query, query_embedding, top_k, filter_dict, include
+            )
+        
+        results = await asyncio.to_thread(
+            self.collection.query,
             query_embeddings=[query_embedding],
             n_results=top_k,
-            where=filter_dict
+            include=include
         )
         
         return self._format_results(results)
     
-    def search_by_source(
+    def _filtered_query(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        where: Dict[str, Any],
+        include: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Nearest neighbours among documents matching a metadata filter.
+        The filter is evaluated inside ChromaDB, first as an ID-only probe of the
+        matching set's size. Small sets are then fetched with their embeddings
+        and ranked exactly (the HNSW graph can miss neighbours when most of it is
+        filtered out); larger ones go straight to a filtered index query.
+        
+        Args:
+            query_embedding: Query embedding vector
+            top_k: Number of results to return
+            where: ChromaDB metadata filter
+            include: ChromaDB fields to return
+            
+        Returns:
+            Formatted results
+        """
+        limit = settings.filtered_search_exact_max
+        fields = [field for field in include if field not in ("distances", "embeddings")]
+        probe = self.collection.get(where=where, include=[], limit=limit + 1)
+        
+        if len(probe['ids']) <= limit:
+            matching = self.collection.get(ids=probe['ids'], include=fields + ["embeddings"]) if probe['ids'] else probe
+            return self._rank_exact(query_embedding, matching, top_k, include)
+        
+        results = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k,
+            where=where,
+            include=include
+        )
+        return self._format_results(results)
+    
+    def _rank_exact(
+        self,
+        query_embedding: List[float],
+        candidates: Dict[str, Any],
+        top_k: int,
+        include: List[str]
+    ) -> Dict[str, Any]:
+        """Rank fetched documents by squared L2 distance, ChromaDB's default metric."""
+        if not candidates['ids']:
+            return {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        
+        matrix = np.asarray(candidates['embeddings'], dtype=np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        distances = np.sum((matrix - query) ** 2, axis=1)
+        order = np.argsort(distances, kind="stable")[:top_k]
+        
+        count = len(order)
+        
+        def field(name):
+            values = candidates.get(name) if name in include else None
+            return [values[i] for i in order] if values is not None else [None] * count
+        
+        ranked = {
+            'ids': [candidates['ids'][i] for i in order],
+            'documents': field('documents'),
+            'metadatas': field('metadatas'),
+            'distances': [float(distances[i]) for i in order] if "distances" in include else [None] * count
+        }
+        if "embeddings" in include:
+            ranked['embeddings'] = [candidates['embeddings'][i] for i in order]
+        return ranked
+    
+    def _exact_lookup(
+        self,
+        query: str,
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Answer exact-token queries (hex codes, color/icon/file names) lexically.
+        
+        Returns:
+            Results if the query is an exact lookup with matches, otherwise None
+        """
+        stripped = query.strip()
+        words = _WORD.findall(stripped.lower())
+        if not words or len(words) > settings.lexical_exact_max_words:
+            return None
+        
+        hits = self.lexical_index.search(stripped, top_k, filter_dict, phrase=True)
+        if not hits['ids']:
+            return None
+        
+        # Hex codes are exact by nature; names must match a document's name
+        if not _HEX_QUERY.match(stripped):
+            phrase = " ".join(words)
+            named = [
+                " ".join(_WORD.findall(str(meta.get('name', '')).lower()))
+                for meta in hits['metadatas']
+            ]
+            if not any(phrase in name for name in named):
+                return None
+        
+        return {
+            'ids': hits['ids'],
+            'documents': hits['documents'],
+            'metadatas': hits['metadatas'],
+            'distances': [None] * len(hits['ids'])
+        }
+    
+    def _fuse(
+        self,
+        vector_results: Dict[str, Any],
+        lexical_results: Dict[str, Any],
+        top_k: int
+    ) -> Dict[str, Any]:
+        """
+        Combine vector and lexical rankings with reciprocal rank fusion.
+        Embeddings returned by the vector search are carried through; documents
+        found only by the full-text index have None in their place.
+        """
+        scores: Dict[str, float] = {}
+        entries: Dict[str, tuple] = {}
+        vector_embeddings = vector_results.get('embeddings')
+        
+        for rank, doc_id in enumerate(vector_results['ids']):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (settings.rrf_k + rank + 1)
+            entries[doc_id] = (
+                vector_results['documents'][rank],
+                vector_results['metadatas'][rank],
+                vector_results['distances'][rank],
+                vector_embeddings[rank] if vector_embeddings is not None else None
+            )
+        
+        for rank, doc_id in enumerate(lexical_results['ids']):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (settings.rrf_k + rank + 1)
+            entries.setdefault(doc_id, (
+                lexical_results['documents'][rank],
+                lexical_results['metadatas'][rank],
+                None,
+                None
+            ))
+        
+        ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        fused = {
+            'ids': ranked,
+            'documents': [entries[doc_id][0] for doc_id in ranked],
+            'metadatas': [entries[doc_id][1] for doc_id in ranked],
+            'distances': [entries[doc_id][2] for doc_id in ranked]
+        }
+        if vector_embeddings is not None:
+            fused['embeddings'] = [entries[doc_id][3] for doc_id in ranked]
+        return fused
+    
+    def _select_fields(self, results: Dict[str, Any], include: List[str]) -> Dict[str, Any]:
+        """Blank out fields the caller didn't ask for, matching ChromaDB's include semantics."""
+        count = len(results['ids'])
+        selected = {
+            'ids': results['ids'],
+            **{
+                field: results[field] if field in include else [None] * count
+                for field in ('documents', 'metadatas', 'distances')
+            }
+        }
+        if "embeddings" in include:
+            selected['embeddings'] = results.get('embeddings') or [None] * count
+        return selected
+    
+    async def search_by_source(
         self,
         query: str,
         source: str,
@@ -61,13 +437,13 @@ class RetrievalManager:
         Returns:
             Filtered search results
         """
-        return self.search(
+        return await self.search(
             query=query,
             top_k=top_k,
             filter_dict={"source": source}
         )
     
-    def search_by_type(
+    async def search_by_type(
         self,
         query: str,
         doc_type: str,
@@ -84,57 +460,154 @@ class RetrievalManager:
         Returns:
             Filtered search results
         """
-        return self.search(
+        return await self.search(
             query=query,
             top_k=top_k,
             filter_dict={"type": doc_type}
         )
     
-    def build_context(
+    async def retrieve(self, query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run the single search that both the LLM context and the citations come from.
+        The context is formatted by the caller with format_context, once its
+        token budget is known.
+        
+        Args:
+            query: User query
+            top_k: Number of results to return (default from settings)
+            
+        Returns:
+            Dictionary with 'results' (reranked search results) and 'sources' (citations)
+        """
+        results = await self.search_diverse(query, top_k)
+        return {
+            "results": results,
+            "sources": self.format_sources(results)
+        }
+    
+    async def search_diverse(self, query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Search, then rerank a larger candidate pool with maximal marginal
+        relevance so near-duplicate chunks don't crowd out other information.
+        Relevance is the candidate's rank in the search results, so the
+        fused ordering is kept and no query embedding is needed; exact
+        lookups are returned as they are.
+        
+        Args:
+            query: Search query text
+            top_k: Number of results to return (default from settings)
+            
+        Returns:
+            Search results with documents and metadata, most useful first
+        """
+        top_k = top_k or settings.top_k_results
+        include = ["documents", "metadatas"]
+        if not settings.mmr_enabled:
+            return await self.search(query, top_k, include=include)
+        
+        fetch_k = max(top_k, settings.mmr_fetch_k)
+        await self.embedding_manager.refresh_live()
+        if self.lexical_index:
+            await self._ensure_lexical_synced()
+            exact = await asyncio.to_thread(self._exact_lookup, query, top_k, None)
+            if exact is not None:
+                return self._select_fields(exact, include)
+            results = await self._hybrid_search(query, fetch_k, None, include + ["embeddings"])
+        else:
+            results = await self._vector_search(query, fetch_k, None, include + ["embeddings"])
+        embeddings = results.pop('embeddings', None) or [None] * len(results['ids'])
+        if len(results['ids']) <= 1:
+            return results
+        
+        # Only documents found by the full-text index alone still need their vectors
+        missing = [doc_id for doc_id, embedding in zip(results['ids'], embeddings) if embedding is None]
+        if missing:
+            stored = await asyncio.to_thread(self.collection.get, ids=missing, include=["embeddings"])
+            fetched = dict(zip(stored['ids'], stored['embeddings']))
+            if len(fetched) < len(missing):
+                # Full-text hits the vector store no longer has; keep retrieval order
+                return {field: values[:top_k] for field, values in results.items()}
+            embeddings = [
+                fetched[doc_id] if embedding is None else embedding
+                for doc_id, embedding in zip(results['ids'], embeddings)
+            ]
+        
+        order = mmr_select(embeddings, top_k)
+        return {field: [values[i] for i in order] for field, values in results.items()}
+    
+    async def build_context(
         self,
         query: str,
-        max_context_length: int = 3000
+        max_context_tokens: Optional[int] = None
     ) -> str:
         """
         Build context string for LLM from retrieved documents.
         
         Args:
             query: User query
-            max_context_length: Maximum character length for context
+            max_context_tokens: Token budget for the context (default from settings)
             
         Returns:
             Formatted context string
         """
-        results = self.search(query)
+        retrieval = await self.retrieve(query)
+        return self.format_context(retrieval['results'], max_context_tokens)
+    
+    async def get_sources(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Get source citations for a query.
+        
+        Args:
+            query: User query
+            
+        Returns:
+            List of source citations with URLs
+        """
+        return (await self.retrieve(query))['sources']
+    
+    def format_context(self, results: Dict[str, Any], max_context_tokens: Optional[int] = None) -> str:
+        """
+        Format search results into a context string for the LLM.
+        Whole documents are packed in order until the token budget is used.
+        
+        Args:
+            results: Formatted search results
+            max_context_tokens: Token budget for the context (default from settings)
+            
+        Returns:
+            Formatted context string
+        """
+        if max_context_tokens is None:
+            max_context_tokens = settings.context_max_tokens
         
         context_parts = ["Relevant information from the design system:\n"]
-        current_length = len(context_parts[0])
+        current_tokens = count_tokens(context_parts[0])
         
         for doc, metadata in zip(results['documents'], results['metadatas']):
             # Format the document with its source
             source_info = self._format_source_info(metadata)
             doc_text = f"\n{source_info}\n{doc}\n"
+            doc_tokens = count_tokens(doc_text)
             
             # Check if adding this document would exceed the limit
-            if current_length + len(doc_text) > max_context_length:
+            if current_tokens + doc_tokens > max_context_tokens:
                 break
             
             context_parts.append(doc_text)
-            current_length += len(doc_text)
+            current_tokens += doc_tokens
         
         return "".join(context_parts)
     
-    def get_sources(self, query: str) -> List[Dict[str, Any]]:
+    def format_sources(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
-        Get source citations for a query.
+        Format search results into source citations.
         
         Args:
-            query: User query
+            results: Formatted search results
             
         Returns:
             List of source citations with URLs
         """
-        results = self.search(query)
         sources = []
         
         for metadata in results['metadatas']:
@@ -148,32 +621,48 @@ class RetrievalManager:
         
         return sources
     
-    def _format_results(self, raw_results: Dict[str, Any]) -> Dict[str, Any]:
+    def _format_results(self, raw_results: Dict[str, Any], row: int = 0) -> Dict[str, Any]:
         """
         Format ChromaDB results into a cleaner structure.
         
         Args:
             raw_results: Raw results from ChromaDB
+            row: Which query embedding's results to take
             
         Returns:
             Formatted results
         """
-        if not raw_results.get('documents') or not raw_results['documents'][0]:
+        if not raw_results.get('ids') or not raw_results['ids'][row]:
             return {
+                'ids': [],
                 'documents': [],
                 'metadatas': [],
                 'distances': []
             }
         
-        return {
-            'documents': raw_results['documents'][0],
-            'metadatas': raw_results['metadatas'][0],
-            'distances': raw_results.get('distances', [[]])[0]
+        count = len(raw_results['ids'][row])
+        
+        def field(name):
+            # Fields left out of `include` come back as None
+            values = raw_results.get(name)
+            return values[row] if values else [None] * count
+        
+        formatted = {
+            'ids': raw_results['ids'][row],
+            'documents': field('documents'),
+            'metadatas': field('metadatas'),
+            'distances': field('distances')
         }
+        # Only present when asked for, so the vectors can be reused without another fetch
+        if raw_results.get('embeddings') is not None:
+            formatted['embeddings'] = list(raw_results['embeddings'][row])
+        return formatted
     
-    def search_examples(self, example_type: str, top_k: int = 5) -> Dict[str, Any]:
+    async def search_examples(self, example_type: str, top_k: int = 5) -> Dict[str, Any]:
         """
         Search for example designs by type (email or ad).
+        The example filter runs inside ChromaDB, so this returns top_k examples
+        whenever that many exist.
         
         Args:
             example_type: Type of example to search for ("email" or "ad")
@@ -182,32 +671,68 @@ class RetrievalManager:
         Returns:
             Search results with example designs
         """
-        # Search for examples with specific type
-        query = f"{example_type} design template example"
+        return (await self.search_examples_many([example_type], top_k))[0]
+    
+    async def search_examples_many(self, example_types: List[str], top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search for example designs of several types with one embedding request
+        and, while the examples are few enough to rank exactly, one ChromaDB call.
         
-        results = self.collection.query(
-            query_embeddings=[self.embedding_manager.create_embedding(query)],
-            n_results=top_k * 2,  # Get more to filter
+        Args:
+            example_types: Types of example to search for ("email", "ad")
+            top_k: Number of examples to return per type
+            
+        Returns:
+            Search results for each type, aligned with example_types
+        """
+        await self.embedding_manager.refresh_live()
+        query_embeddings = await self.embed_queries([self.example_query(t) for t in example_types])
+        return await asyncio.to_thread(self._examples_query, example_types, query_embeddings, top_k)
+    
+    def _examples_query(
+        self,
+        example_types: List[str],
+        query_embeddings: List[List[float]],
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch the examples of every requested type in a single filtered get and
+        rank each type exactly. If there are more than filtered_search_exact_max,
+        each type falls back to its own filtered query (see _filtered_query).
+        """
+        include = ["documents", "metadatas", "distances"]
+        limit = settings.filtered_search_exact_max
+        matching = self.collection.get(
+            where={"$and": [{"is_example": True}, {"example_type": {"$in": list(example_types)}}]},
+            include=["documents", "metadatas", "embeddings"],
+            limit=limit + 1
         )
         
-        formatted = self._format_results(results)
-        
-        # Filter for actual examples
-        filtered_docs = []
-        filtered_metas = []
-        
-        for doc, meta in zip(formatted['documents'], formatted['metadatas']):
-            if (meta.get('is_example') == 'True' and 
-                meta.get('example_type') == example_type):
-                filtered_docs.append(doc)
-                filtered_metas.append(meta)
-                if len(filtered_docs) >= top_k:
-                    break
+        if len(matching['ids']) > limit:
+            return [
+                self._filtered_query(
+                    query_embedding,
+                    top_k,
+                    {"$and": [{"is_example": True}, {"example_type": example_type}]},
+                    include
+                )
+                for example_type, query_embedding in zip(example_types, query_embeddings)
+            ]
         
-        return {
-            'documents': filtered_docs,
-            'metadatas': filtered_metas
-        }
+        results = []
+        for example_type, query_embedding in zip(example_types, query_embeddings):
+            rows = [i for i, metadata in enumerate(matching['metadatas']) if metadata.get('example_type') == example_type]
+            candidates = {
+                field: [matching[field][i] for i in rows]
+                for field in ('ids', 'documents', 'metadatas', 'embeddings')
+            }
+            results.append(self._rank_exact(query_embedding, candidates, top_k, include))
+        return results
+    
+    @staticmethod
+    def example_query(example_type: str) -> str:
+        """Query text used to rank approved examples of a creative type."""
+        return f"{example_type} design template example"
     
     def _format_source_info(self, metadata: Dict[str, Any]) -> str:
         """
@@ -233,6 +758,24 @@ class RetrievalManager:
             return f"[{source}: {name}]"
 
 
-# Global retrieval manager instance
-retrieval_manager = RetrievalManager()
+# Global retrieval manager instance, created on first use
+_retrieval_manager: Optional[RetrievalManager] = None
+_retrieval_manager_lock = threading.Lock()
+
+
+def get_retrieval_manager() -> RetrievalManager:
+    """Get the global retrieval manager, creating it (and the embedding manager) on first use."""
+    global _retrieval_manager
+    if _retrieval_manager is None:
+        with _retrieval_manager_lock:
+            if _retrieval_manager is None:
+                _retrieval_manager = RetrievalManager()
+    return _retrieval_manager
+
+
+async def get_retrieval_manager_async() -> RetrievalManager:
+    """Get the global retrieval manager from async code; ChromaDB is opened in a worker thread, not on the event loop."""
+    if _retrieval_manager is not None:
+        return _retrieval_manager
+    return await asyncio.to_thread(get_retrieval_manager)
 
@@ -0,0 +1,264 @@
+"""
+Portable single-file snapshots of the vector store.
+
+A snapshot holds every document in the live collection with its vector,
+text and metadata, plus the embedding model id, so a new container can
+load the index in seconds instead of re-embedding its sources.
+
+File layout (all integers little-endian):
+    magic             8 bytes, b"DRAVSNAP"
+    format version    uint32
+    header length     uint32
+    header            UTF-8 JSON (model id, counts, offsets, checksum)
+    padding           to a 64-byte boundary
+    vectors           count x dimensions float32 matrix, memory-mappable
+    records           zlib-compressed JSON list of [id, document, metadata]
+
+Usage (from backend/):
+    python -m rag.snapshot export data/index.snapshot
+    python -m rag.snapshot import data/index.snapshot
+    python -m rag.snapshot info data/index.snapshot
+"""
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+
+MAGIC = b"DRAVSNAP"
+FORMAT_VERSION = 1
+
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGNMENT = 64
+_PAGE_SIZE = 1000
+
+
+def export_snapshot(path: str, manager=None) -> Dict[str, Any]:
+    """
+    Write the live collection to a snapshot file.
+    
+    Args:
+        path: Destination file (replaced atomically)
+        manager: EmbeddingManager to export (defaults to the global one)
+        
+    Returns:
+        Snapshot header
+    """
+    if manager is None:
+        from rag.embeddings import get_embedding_manager
+        manager = get_embedding_manager()
+    
+    collection = manager.design_collection
+    total = collection.count()
+    
+    records: List[list] = []
+    pages: List[np.ndarray] = []
+    for offset in range(0, total, _PAGE_SIZE):
+        page = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=_PAGE_SIZE,
+            offset=offset
+        )
+        records += [list(record) for record in zip(page['ids'], page['documents'], page['metadatas'])]
+        pages.append(np.asarray(page['embeddings'], dtype="<f4"))
+    
+    vectors = np.concatenate(pages) if pages else np.zeros((0, 0), dtype="<f4")
+    vector_bytes = np.ascontiguousarray(vectors, dtype="<f4").tobytes()
+    record_bytes = zlib.compress(json.dumps(records, separators=(",", ":")).encode("utf-8"), 6)
+    
+    checksum = hashlib.sha256()
+    checksum.update(vector_bytes)
+    checksum.update(record_bytes)
+    
+    header = {
+        "format_version": FORMAT_VERSION,
+        "model_id": manager.model_id,
+        "collection_name": manager.collection_name,
+        "collection_version": manager.collection_version,
+        "created_at": time.time(),
+        "count": len(records),
+        "dimensions": int(vectors.shape[1]) if len(records) else 0,
+        "dtype": "<f4",
+        "vectors_length": len(vector_bytes),
+        "records_length": len(record_bytes),
+        "records_compression": "zlib",
+        "sha256": checksum.hexdigest()
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_offset = _data_offset(len(header_bytes))
+    
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_offset - _PREAMBLE.size - len(header_bytes)))
+        f.write(vector_bytes)
+        f.write(record_bytes)
+    os.replace(tmp_path, path)
+    
+    return header
+
+
+def read_header(path: str) -> Tuple[Dict[str, Any], int]:
+    """
+    Read and check a snapshot's header.
+    
+    Args:
+        path: Snapshot file
+        
+    Returns:
+        Header dictionary and the file offset where the vectors start
+        
+    Raises:
+        ValueError: If the file is not a snapshot or uses an unsupported format version
+    """
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError(f"{path} is not a vector store snapshot")
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a vector store snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {version} (expected {FORMAT_VERSION})")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    return header, _data_offset(header_length)
+
+
+def read_snapshot(path: str, verify: bool = True) -> Tuple[Dict[str, Any], np.ndarray, List[list]]:
+    """
+    Open a snapshot file. Vectors are memory-mapped rather than read into memory.
+    
+    Args:
+        path: Snapshot file
+        verify: Check the data against the header's checksum
+        
+    Returns:
+        Header, (count x dimensions) vector matrix, and [id, document, metadata] records
+        
+    Raises:
+        ValueError: If the file is malformed, truncated or fails its checksum
+    """
+    header, data_offset = read_header(path)
+    count = header["count"]
+    
+    vectors = np.zeros((0, header["dimensions"]), dtype="<f4")
+    if count:
+        vectors = np.memmap(
+            path,
+            dtype=header["dtype"],
+            mode="r",
+            offset=data_offset,
+            shape=(count, header["dimensions"])
+        )
+    
+    with open(path, "rb") as f:
+        f.seek(data_offset + header["vectors_length"])
+        record_bytes = f.read(header["records_length"])
+    if len(record_bytes) != header["records_length"]:
+        raise ValueError(f"Snapshot {path} is truncated")
+    
+    if verify:
+        checksum = hashlib.sha256()
+        checksum.update(memoryview(vectors).cast("B") if count else b"")
+        checksum.update(record_bytes)
+        if checksum.hexdigest() != header["sha256"]:
+            raise ValueError(f"Snapshot {path} failed its checksum")
+    
+    records = json.loads(zlib.decompress(record_bytes).decode("utf-8"))
+    if len(records) != count:
+        raise ValueError(f"Snapshot {path} has {len(records)} records, header says {count}")
+    
+    return header, vectors, records
+
+
+async def import_snapshot(path: str, manager=None) -> Dict[str, Any]:
+    """
+    Replace the live collection with a snapshot's contents.
+    Documents are bulk-inserted with their stored vectors into a shadow
+    collection that is validated and swapped in like any full reindex, and
+    the embedding cache is seeded so later syncs of unchanged content make
+    no embedding calls.
+    
+    Args:
+        path: Snapshot file
+        manager: EmbeddingManager to load into (defaults to the global one)
+        
+    Returns:
+        Snapshot header
+        
+    Raises:
+        ValueError: If the snapshot is invalid or was built with a different embedding model
+    """
+    if manager is None:
+        from rag.embeddings import get_embedding_manager
+        manager = get_embedding_manager()
+    
+    header, vectors, records = await asyncio.to_thread(read_snapshot, path)
+    if header["model_id"] != manager.model_id:
+        raise ValueError(
+            f"Snapshot was built with {header['model_id']}, "
+            f"but the configured embedding model is {manager.model_id}"
+        )
+    
+    ids = [record[0] for record in records]
+    documents = [record[1] for record in records]
+    metadatas = [record[2] for record in records]
+    
+    async with manager.rebuild():
+        await asyncio.to_thread(manager.write_embedded, ids, documents, metadatas, vectors)
+    
+    if manager.embedding_cache:
+        await asyncio.to_thread(manager.embedding_cache.put_many, manager.model_id, documents, vectors)
+    
+    return header
+
+
+def _data_offset(header_length: int) -> int:
+    """File offset of the vector matrix: just past the header, aligned for memory mapping."""
+    end = _PREAMBLE.size + header_length
+    return (end + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Export or import a vector store snapshot")
+    parser.add_argument("command", choices=["export", "import", "info"])
+    parser.add_argument("path", help="Snapshot file")
+    args = parser.parse_args(argv)
+    
+    if args.command == "info":
+        header, _ = read_header(args.path)
+        print(json.dumps(header, indent=2))
+        return 0
+    
+    if args.command == "export":
+        header = export_snapshot(args.path)
+        print(f"Exported {header['count']} documents ({header['model_id']}) to {args.path}")
+        return 0
+    
+    header = asyncio.run(_import_and_collect(args.path))
+    print(f"Imported {header['count']} documents ({header['model_id']}) from {args.path}")
+    return 0
+
+
+async def _import_and_collect(path: str) -> Dict[str, Any]:
+    """Import a snapshot, then stay up to remove the replaced generation once running servers have switched."""
+    from config import settings
+    from rag.embeddings import get_embedding_manager
+    
+    header = await import_snapshot(path)
+    print(f"Removing the replaced index in {settings.reindex_gc_grace_seconds:.0f}s, once running servers have switched")
+    await get_embedding_manager().wait_for_garbage_collection()
+    return header
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,101 @@
+"""
+Persistent record of what was ingested by the last successful sync.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+from config import settings
+
+
+class SyncStateStore:
+    """Tracks the source version of every synced item so unchanged items can be skipped."""
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.chroma_persist_directory, "sync_state.json")
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = self._load()
+    
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the recorded state for an item.
+        
+        Args:
+            namespace: Item namespace (e.g. "figma_file", "figma_file_metadata")
+            key: Item key within the namespace (e.g. the Figma file key)
+            
+        Returns:
+            Recorded state dictionary, or None if the item was never synced
+        """
+        return self._state.get(namespace, {}).get(key)
+    
+    def is_unchanged(self, namespace: str, key: str, version: Optional[str]) -> bool:
+        """
+        Check whether an item's version matches the last successful sync.
+        
+        Args:
+            namespace: Item namespace
+            key: Item key within the namespace
+            version: Current version marker from the source (lastModified, version id, ...)
+            
+        Returns:
+            True if the item was synced before at exactly this version
+        """
+        if not version:
+            return False
+        recorded = self.get(namespace, key)
+        return recorded is not None and recorded.get("version") == version
+    
+    def record(self, namespace: str, key: str, version: Optional[str], **extra: Any) -> None:
+        """
+        Record a successful sync of an item and persist the state.
+        
+        Args:
+            namespace: Item namespace
+            key: Item key within the namespace
+            version: Version marker that was synced
+            **extra: Additional fields to store alongside the version
+        """
+        with self._lock:
+            self._state.setdefault(namespace, {})[key] = {
+                "version": version,
+                "synced_at": time.time(),
+                **extra
+            }
+            self._save()
+    
+    def forget(self, namespace: str, key: Optional[str] = None) -> None:
+        """
+        Drop recorded state for one item, or a whole namespace if key is None.
+        
+        Args:
+            namespace: Item namespace
+            key: Optional item key
+        """
+        with self._lock:
+            if key is None:
+                self._state.pop(namespace, None)
+            else:
+                self._state.get(namespace, {}).pop(key, None)
+            self._save()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load state from disk, starting empty if the file is missing or unreadable."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save(self) -> None:
+        """Atomically write state to disk (caller holds the lock)."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(tmp_path, self.path)
+
+
+# Global sync state instance
+sync_state = SyncStateStore()
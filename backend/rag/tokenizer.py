@@ -0,0 +1,96 @@
+"""
+Local token counting for chunking and prompt budgeting.
+"""
+import re
+from functools import lru_cache
+from typing import List, Union
+from config import settings
+
+
+# Rough stand-in for BPE when tiktoken isn't installed: runs of up to four word
+# characters or a single symbol, with leading whitespace attached. Joining the
+# pieces reproduces the original text exactly.
+_APPROX_TOKEN_PATTERN = re.compile(r"\s*(?:\w{1,4}|[^\w\s])|\s+")
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tiktoken encoding for the embedding model, or None if unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    
+    try:
+        try:
+            return tiktoken.encoding_for_model(settings.embedding_model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # BPE files are downloaded on first use; offline hosts fall back
+        print(f"Could not load tiktoken encoding, using approximate token counts: {e}")
+        return None
+
+
+def encode(text: str) -> List[Union[int, str]]:
+    """
+    Split text into tokens.
+    
+    Args:
+        text: Text to tokenize
+        
+    Returns:
+        Token list (token ids with tiktoken, string pieces otherwise)
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.encode(text, disallowed_special=())
+    return _APPROX_TOKEN_PATTERN.findall(text)
+
+
+def decode(tokens: List[Union[int, str]]) -> str:
+    """
+    Turn tokens produced by encode() back into text.
+    
+    Args:
+        tokens: Token list from encode()
+        
+    Returns:
+        Decoded text
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(tokens)
+    return "".join(tokens)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens in a piece of text.
+    
+    Args:
+        text: Text to measure
+        
+    Returns:
+        Number of tokens
+    """
+    if not text:
+        return 0
+    return len(encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Truncate text to at most max_tokens tokens.
+    
+    Args:
+        text: Text to truncate
+        max_tokens: Maximum number of tokens to keep
+        
+    Returns:
+        Truncated text (unchanged if it already fits)
+    """
+    tokens = encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return decode(tokens[:max(max_tokens, 0)])
@@ -0,0 +1,41 @@
+"""
+Shared test setup: offline, isolated settings for every test module, and
+fixtures for an embedding index persisted under each test's tmp_path.
+Settings are read once, when config is first imported, so they are set here,
+before config is imported, rather than in the modules that import it.
+"""
+import os
+import tempfile
+
+os.environ["CHROMA_PERSIST_DIRECTORY"] = tempfile.mkdtemp(prefix="design-assistant-test-")
+os.environ["EMBEDDING_PROVIDER"] = "hashing"
+os.environ["OPENAI_API_KEY"] = "test"
+os.environ["FIGMA_ACCESS_TOKEN"] = "test"
+os.environ["FIGMA_TEAM_ID"] = "team"
+os.environ["WARM_UP_ON_STARTUP"] = "false"
+
+import pytest
+
+from config import settings
+from rag.embeddings import EmbeddingManager
+from rag.providers import HashingEmbeddingProvider
+
+
+@pytest.fixture
+def embedding_manager_factory(tmp_path, monkeypatch):
+    """
+    Build EmbeddingManagers persisted under tmp_path, or a subdirectory of it.
+    Each call opens the index as another process would, with its own ChromaDB
+    client; dim sizes the hashing embeddings, and provider replaces them.
+    """
+    def make(dim: int = 64, directory: str = "", provider=None) -> EmbeddingManager:
+        monkeypatch.setattr(settings, "chroma_persist_directory", str(tmp_path / directory))
+        return EmbeddingManager(provider=provider or HashingEmbeddingProvider(dim))
+    
+    return make
+
+
+@pytest.fixture
+def embedding_manager(embedding_manager_factory) -> EmbeddingManager:
+    """An empty index on 64-dimensional hashing embeddings, persisted under tmp_path."""
+    return embedding_manager_factory()
@@ -0,0 +1,71 @@
+"""
+Tests for the semantic answer cache in front of the chat endpoints.
+"""
+import asyncio
+
+from rag.answer_cache import SemanticAnswerCache, key_terms
+from rag.providers import HashingEmbeddingProvider
+from rag.retrieval import RetrievalManager
+
+
+VERSION = "v1"
+EMBEDDING = [1.0, 0.0, 0.0]
+
+
+class CountingProvider(HashingEmbeddingProvider):
+    """Hashing embeddings that record every request sent to the provider."""
+    
+    def __init__(self):
+        super().__init__(64)
+        self.requests = []
+    
+    async def embed(self, texts):
+        self.requests.append(list(texts))
+        return await super().embed(texts)
+
+
+def test_answers_kept_per_namespace():
+    cache = SemanticAnswerCache(max_entries=10, ttl_seconds=60, similarity_threshold=0.9)
+    cache.put("chat:a@example.com", "What is our primary color?", EMBEDDING, VERSION, {"response": "for a"})
+    
+    assert cache.get("chat:a@example.com", "What is our primary color?", EMBEDDING, VERSION) == {"response": "for a"}
+    assert cache.get("chat:b@example.com", "What is our primary color?", EMBEDDING, VERSION) is None
+    assert cache.get("chat_simple", "What is our primary color?", EMBEDDING, VERSION) is None
+
+
+def test_key_terms_guard_near_duplicates():
+    cache = SemanticAnswerCache(max_entries=10, ttl_seconds=60, similarity_threshold=0.9)
+    cache.put("chat_simple", "What is the hex code for Lawn?", EMBEDDING, VERSION, {"response": "#1B8751"})
+    
+    # Same embedding, different color: not the same question
+    assert cache.get("chat_simple", "What is the hex code for Dusk?", EMBEDDING, VERSION) is None
+    assert cache.get("chat_simple", "what's the hex code for lawn", EMBEDDING, VERSION) == {"response": "#1B8751"}
+
+
+def test_key_terms():
+    assert key_terms("Is #1B8751 the same as 1b8751?") == {"1b8751"}
+    assert key_terms("Show me the chat-right icon") == {"chat-right"}
+    assert key_terms('Where is "Brand Guide 2024"?') == {"brand guide 2024"}
+    assert key_terms("Use Vista Blue with Dusk") == {"vista blue", "dusk"}
+    assert key_terms("What changed this decade?") == frozenset()
+
+
+def test_new_collection_version_invalidates():
+    cache = SemanticAnswerCache(max_entries=10, ttl_seconds=60, similarity_threshold=0.9)
+    cache.put("chat_simple", "What is Lawn?", EMBEDDING, VERSION, {"response": "green"})
+    assert cache.get("chat_simple", "What is Lawn?", EMBEDDING, "v2") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_lookup_and_retrieval_share_one_embedding_request(embedding_manager_factory):
+    provider = CountingProvider()
+    retrieval_manager = RetrievalManager(embedding_manager_factory(provider=provider))
+    message = "What is the hex code for Lawn?"
+    enhanced_query = message + " brand colors palette"
+    
+    async def scenario():
+        await retrieval_manager.embed_queries([message, enhanced_query])
+        await retrieval_manager.retrieve(enhanced_query)
+    
+    asyncio.run(scenario())
+    assert provider.requests == [[message, enhanced_query]]
@@ -0,0 +1,57 @@
+"""
+Tests for token-aware text chunking.
+"""
+from rag.chunking import TextChunker
+from rag.tokenizer import count_tokens
+
+
+LINES = [f"Line {i} describes the brand guidelines for section {i}.\n" for i in range(40)]
+TEXT = "".join(LINES)
+
+
+def test_short_text_is_one_chunk():
+    assert TextChunker(chunk_size=1000, chunk_overlap=100).chunk("Lawn is #1B8751") == ["Lawn is #1B8751"]
+    assert TextChunker(chunk_size=1000, chunk_overlap=100).chunk("  \n ") == []
+
+
+def test_chunks_fit_and_break_on_lines():
+    chunker = TextChunker(chunk_size=60, chunk_overlap=20)
+    chunks = chunker.chunk(TEXT)
+    
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert count_tokens(chunk) <= 60
+        assert all(line + "\n" in LINES for line in chunk.split("\n"))
+
+
+def test_consecutive_chunks_overlap():
+    chunker = TextChunker(chunk_size=60, chunk_overlap=20)
+    chunks = chunker.chunk(TEXT)
+    
+    for previous, current in zip(chunks, chunks[1:]):
+        previous_lines = previous.split("\n")
+        current_lines = current.split("\n")
+        shared = [line for line in current_lines if line in previous_lines]
+        # The overlap is the tail of one chunk repeated at the head of the next
+        assert shared and current_lines[:len(shared)] == previous_lines[-len(shared):]
+        assert count_tokens("\n".join(shared)) <= 20
+    
+    # Every line is kept
+    assert {line for chunk in chunks for line in chunk.split("\n")} == {line.strip() for line in LINES}
+
+
+def test_no_overlap():
+    chunks = TextChunker(chunk_size=60, chunk_overlap=0).chunk(TEXT)
+    assert "\n".join(chunks) == TEXT.strip()
+
+
+def test_overlap_capped_at_half_a_chunk():
+    assert TextChunker(chunk_size=60, chunk_overlap=50).chunk_overlap == 30
+
+
+def test_long_sentence_split_on_tokens():
+    sentence = " ".join(f"word{i}" for i in range(300)) + "."
+    chunks = TextChunker(chunk_size=50, chunk_overlap=0).chunk(sentence)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 50 for chunk in chunks)
+    assert "".join(chunks).replace(" ", "") == sentence.replace(" ", "")
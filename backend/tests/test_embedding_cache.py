@@ -0,0 +1,107 @@
+"""
+Tests for the persistent embedding cache.
+"""
+from rag import embedding_cache
+from rag.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+
+MODEL = "hashing-64"
+
+
+def _vectors(count: int, start: int = 0):
+    texts = [f"text {i}" for i in range(start, start + count)]
+    return texts, [[float(i), 0.0] for i in range(start, start + count)]
+
+
+def test_round_trip(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), max_entries=100)
+    texts, vectors = _vectors(3)
+    cache.put_many(MODEL, texts, vectors)
+    
+    assert cache.get_many(MODEL, ["missing", texts[2], texts[0]]) == {1: vectors[2], 2: vectors[0]}
+    assert cache.get_many("other-model", texts) == {}
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), max_entries=10)
+    texts, vectors = _vectors(10)
+    cache.put_many(MODEL, texts, vectors)
+    assert cache.count() == 10
+    
+    # Touch the oldest entry so it survives
+    cache.get_many(MODEL, texts[:1])
+    cache.put_many(MODEL, *_vectors(1, start=10))
+    
+    # Trimmed to the low-water mark, not just back to max_entries
+    assert cache.count() == 9
+    survivors = cache.get_many(MODEL, texts)
+    assert 0 in survivors and len(survivors) == 8
+
+
+def test_eviction_counts_only_past_the_limit(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), max_entries=10)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    for i in range(5):
+        cache.put_many(MODEL, *_vectors(1, start=i))
+    assert not any("COUNT" in statement for statement in statements)
+
+
+def test_eviction_sees_rows_from_other_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    a = EmbeddingCache(path=path, max_entries=10)
+    b = EmbeddingCache(path=path, max_entries=10)
+    b.put_many(MODEL, *_vectors(8))
+    
+    # A's own count stays under the limit until its exact recount sees B's rows
+    a.put_many(MODEL, *_vectors(3, start=8))
+    a.put_many(MODEL, *_vectors(8, start=11))
+    assert a.count() <= 10
+
+
+class Clock:
+    """Stands in for time.monotonic so TTLs can expire without waiting."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_query_cache_entries_expire(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(embedding_cache.time, "monotonic", clock)
+    cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=60)
+    cache.put(MODEL, "lawn", [1.0])
+    
+    clock.now += 59
+    assert cache.get(MODEL, "lawn") == [1.0]
+    clock.now += 1
+    assert cache.get(MODEL, "lawn") is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_query_cache_keeps_most_recently_used():
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=60)
+    cache.put(MODEL, "lawn", [1.0])
+    cache.put(MODEL, "dusk", [2.0])
+    cache.get(MODEL, "lawn")
+    cache.put(MODEL, "pine", [3.0])
+    
+    assert cache.get(MODEL, "dusk") is None
+    assert cache.get(MODEL, "lawn") == [1.0]
+    assert cache.get("other-model", "lawn") is None
+
+
+def test_query_cache_falls_back_to_persistent_cache(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(embedding_cache.time, "monotonic", clock)
+    persistent = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), max_entries=100)
+    QueryEmbeddingCache(max_entries=10, ttl_seconds=60, persistent=persistent).put(MODEL, "lawn", [1.0])
+    
+    # A new process, or an expired in-memory entry, reads the vector back from disk
+    cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=60, persistent=persistent)
+    assert cache.get(MODEL, "lawn") == [1.0]
+    clock.now += 120
+    assert cache.get(MODEL, "lawn") == [1.0]
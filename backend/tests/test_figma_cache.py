@@ -0,0 +1,167 @@
+"""
+Tests for the local Figma file cache.
+"""
+import io
+import json
+import os
+from contextlib import contextmanager
+
+import ijson
+import pytest
+import requests
+
+from integrations.figma import FigmaClient
+from integrations.figma_cache import FigmaFileCache
+from integrations.figma_index import NodeNameIndex
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+
+def _fixture_file():
+    with open(os.path.join(FIXTURES, "figma_files.json"), "r", encoding="utf-8") as f:
+        return json.load(f)["files"][0]["file"]
+
+
+class StreamingClient(FigmaClient):
+    """Serves a fixed response body instead of calling the Figma API."""
+    
+    def __init__(self, body: bytes, file_cache: FigmaFileCache):
+        super().__init__(access_token="test", file_cache=file_cache)
+        self.body = body
+        self.downloads = 0
+    
+    @contextmanager
+    def get_file_stream(self, file_key):
+        self.downloads += 1
+        yield io.BytesIO(self.body)
+
+
+def _temporary_files(cache: FigmaFileCache):
+    return [name for name in os.listdir(cache.directory) if name.endswith(".tmp")]
+
+
+def test_streamed_extraction_fills_cache(tmp_path):
+    data = _fixture_file()
+    cache = FigmaFileCache(directory=str(tmp_path))
+    client = StreamingClient(json.dumps(data).encode("utf-8"), cache)
+    
+    file_name, pages = client._read_page_texts("file1")
+    
+    assert file_name == data["name"]
+    assert cache.known_version("file1") == data["version"]
+    assert FigmaFileCache(directory=str(tmp_path)).get("file1", data["version"]) == data
+    assert not _temporary_files(cache)
+    
+    # The next extraction is streamed from the cached copy on disk, never loading it into memory
+    assert client._read_page_texts("file1") == (file_name, pages)
+    assert client.downloads == 1
+    assert cache.stats()["memory_files"] == 0
+
+
+def test_depth_limited_request_skips_cached_copy_on_disk(tmp_path, monkeypatch):
+    data = _fixture_file()
+    cache = FigmaFileCache(directory=str(tmp_path))
+    client = StreamingClient(json.dumps(data).encode("utf-8"), cache)
+    client._read_page_texts("file1")
+    
+    class Response:
+        def raise_for_status(self):
+            pass
+        
+        def json(self):
+            return {"name": data["name"], "version": data["version"], "document": {"id": "0:0", "children": []}}
+    
+    requested = []
+    monkeypatch.setattr("integrations.figma.requests.get", lambda url, **kwargs: requested.append(kwargs) or Response())
+    
+    assert client.get_file("file1", depth=1)["document"]["children"] == []
+    assert requested == [{"headers": client.headers, "params": {"depth": 1}}]
+    assert cache.stats()["memory_files"] == 0
+
+
+def test_truncated_stream_leaves_no_cache_entry(tmp_path):
+    body = json.dumps(_fixture_file()).encode("utf-8")
+    cache = FigmaFileCache(directory=str(tmp_path))
+    client = StreamingClient(body[:len(body) // 2], cache)
+    
+    with pytest.raises(ijson.IncompleteJSONError):
+        client._read_page_texts("file1")
+    
+    assert cache.get("file1") is None
+    assert not _temporary_files(cache)
+
+
+class VersionedClient(FigmaClient):
+    """Serves whatever version of a file is current instead of calling the Figma API."""
+    
+    def __init__(self, file_cache: FigmaFileCache):
+        super().__init__(access_token="test", file_cache=file_cache)
+        self.version = "1"
+        self.version_checks = 0
+        self.downloads = 0
+        self.offline = False
+    
+    def get_file_version(self, file_key):
+        if self.offline:
+            raise requests.ConnectionError("Figma is unreachable")
+        self.version_checks += 1
+        self.file_cache.note_version(file_key, self.version)
+        return {"name": "Brand", "last_modified": "", "version": self.version}
+    
+    def _download_file(self, file_key):
+        self.downloads += 1
+        return {"name": "Brand", "version": self.version, "document": {"id": "0:0", "children": []}}
+
+
+def test_cached_file_served_until_version_changes(tmp_path):
+    cache = FigmaFileCache(directory=str(tmp_path), check_interval=0)
+    client = VersionedClient(cache)
+    
+    assert client.get_file("file1")["version"] == "1"
+    assert client.get_file("file1")["version"] == "1"
+    assert client.downloads == 1
+    assert client.version_checks == 2
+    
+    client.version = "2"
+    assert client.get_file("file1")["version"] == "2"
+    assert client.downloads == 2
+    
+    # Only the current version stays on disk
+    assert [name for name in os.listdir(tmp_path) if FigmaFileCache._is_document(name)] == ["file1.2.json.gz"]
+    assert FigmaFileCache(directory=str(tmp_path)).get("file1", "1") is None
+
+
+def test_version_check_skipped_within_interval(tmp_path):
+    cache = FigmaFileCache(directory=str(tmp_path), check_interval=3600)
+    client = VersionedClient(cache)
+    client.get_file("file1")
+    client.version = "2"
+    
+    # The version seen a moment ago is trusted until the interval passes
+    assert client.get_file("file1")["version"] == "1"
+    assert client.version_checks == 1
+    assert client.downloads == 1
+
+
+def test_cached_copy_used_when_version_check_fails(tmp_path):
+    cache = FigmaFileCache(directory=str(tmp_path), check_interval=0)
+    client = VersionedClient(cache)
+    client.get_file("file1")
+    
+    client.offline = True
+    assert client.get_file("file1")["version"] == "1"
+    assert client.downloads == 1
+
+
+def test_node_index_belongs_to_one_version(tmp_path):
+    cache = FigmaFileCache(directory=str(tmp_path))
+    cache.put("file1", {"name": "Brand", "version": "1", "document": {}})
+    cache.put_index("file1", "1", NodeNameIndex(["button/primary"], [(1000, 3, "1:3")]))
+    
+    assert FigmaFileCache(directory=str(tmp_path)).get_index("file1", "1") is not None
+    assert cache.get_index("file1", "2") is None
+    
+    # A new version removes the old version's index from disk
+    cache.put("file1", {"name": "Brand", "version": "2", "document": {}})
+    assert FigmaFileCache(directory=str(tmp_path)).get_index("file1", "1") is None
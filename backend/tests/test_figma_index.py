@@ -0,0 +1,148 @@
+"""
+Tests for the indexed Figma document lookups, checked against plain walks
+of the document tree.
+"""
+import io
+import json
+import os
+
+import pytest
+
+from integrations.figma_stream import iter_file_events
+from integrations.figma_tree import FileTree
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+TYPE_PRIORITY = {
+    'INSTANCE': 1000,
+    'COMPONENT': 800,
+    'FRAME': 600,
+    'GROUP': 400,
+    'RECTANGLE': 200,
+    'ELLIPSE': 200,
+    'TEXT': 0
+}
+
+
+def _fixture_files():
+    with open(os.path.join(FIXTURES, "figma_files.json"), "r", encoding="utf-8") as f:
+        return [entry["file"] for entry in json.load(f)["files"]]
+
+
+def _iter_nodes(node):
+    yield node
+    for child in node.get("children", []):
+        yield from _iter_nodes(child)
+
+
+def _walk_search(document, node_name):
+    """The recursive search the name index replaced."""
+    target_lower = node_name.lower().strip()
+    target_words = set(target_lower.split())
+    best_match = None
+    best_score = 0
+    
+    def search_recursive(node):
+        nonlocal best_match, best_score
+        name_lower = node.get("name", "").lower()
+        score = 0
+        if name_lower == target_lower:
+            score = 1000
+        elif name_lower.replace('-', ' ') == target_lower or target_lower.replace(' ', '-') == name_lower:
+            score = 900
+        elif target_lower in name_lower or name_lower in target_lower:
+            score = 50 + len(target_words & set(name_lower.split())) * 10
+        
+        total_score = score + TYPE_PRIORITY.get(node.get("type", ""), 100)
+        if score > 0 and total_score > best_score:
+            best_score = total_score
+            best_match = node.get("id")
+        
+        for child in node.get("children", []):
+            search_recursive(child)
+    
+    search_recursive(document)
+    return best_match
+
+
+def _node(node_id, name, node_type, children=None):
+    node = {"id": node_id, "type": node_type}
+    if name is not None:
+        node["name"] = name
+    if children:
+        node["children"] = children
+    return node
+
+
+# Covers exact names, hyphen/space variants, unnamed nodes, short names and
+# nodes that share a name and type priority
+DOCUMENT = _node("0:0", "Document", "DOCUMENT", [
+    _node("1:1", "Icons", "CANVAS", [
+        _node("2:1", "ice-cream-cone", "COMPONENT"),
+        _node("2:2", "Ice Cream Cone", "TEXT"),
+        _node("2:3", "chat-right", "INSTANCE"),
+        _node("2:4", "chat-right", "INSTANCE"),
+        _node("2:5", None, "VECTOR"),
+        _node("2:6", "", "GROUP"),
+        _node("2:7", "ad", "FRAME", [
+            _node("3:1", "ad", "FRAME"),
+            _node("3:2", "Ad Templates", "TEXT"),
+        ]),
+        _node("2:8", "home", "INSTANCE"),
+        _node("2:9", "home", "COMPONENT"),
+    ]),
+    _node("1:2", "Buttons", "CANVAS", [
+        _node("4:1", "Button/Primary", "COMPONENT"),
+        _node("4:2", "Button/Secondary", "COMPONENT"),
+        _node("4:3", "Button", "RECTANGLE"),
+        _node("4:4", "Button", "ELLIPSE"),
+        _node("4:5", "x", "VECTOR"),
+    ]),
+])
+
+QUERIES = [
+    # Exact matches
+    "chat-right", "Button", "HOME", "  home  ",
+    # Hyphen/space variants
+    "ice cream cone", "chat right", "ice-cream-cone",
+    # Names contained in the query, including unnamed nodes
+    "show me the chat-right icon", "primary button/primary", "an ad", "nothing like it",
+    # Queries shorter than a trigram
+    "ad", "x", "Bu", "", " ",
+    # Substrings of names
+    "button/", "cream", "templates", "secondary",
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_name_index_matches_walk(query):
+    assert FileTree(DOCUMENT).name_index.search(query) == _walk_search(DOCUMENT, query)
+
+
+def test_name_index_matches_walk_on_fixture_files():
+    for file_data in _fixture_files():
+        document = file_data["document"]
+        index = FileTree(document).name_index
+        names = {node.get("name", "") for node in _iter_nodes(document)}
+        queries = set(names)
+        for name in names:
+            queries.update({name.upper(), name.replace('-', ' '), name[:2], name[1:-1], f"the {name} asset"})
+        for query in sorted(queries):
+            assert index.search(query) == _walk_search(document, query), query
+
+
+def test_stream_pages_match_file_tree():
+    for file_data in _fixture_files():
+        tree = FileTree(file_data["document"])
+        
+        pages = []
+        texts = []
+        for event, fields in iter_file_events(io.BytesIO(json.dumps(file_data).encode("utf-8"))):
+            if event == "text":
+                texts.append(fields["characters"])
+            elif event == "page":
+                pages.append((fields["id"], fields["name"], texts))
+                texts = []
+        
+        assert pages == tree.pages
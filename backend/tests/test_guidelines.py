@@ -0,0 +1,100 @@
+"""
+Tests for the brand guidelines snapshot used by image analysis.
+"""
+import asyncio
+
+import pytest
+
+import analyzer
+from rag.guidelines import GuidelinesStore
+from rag.retrieval import RetrievalManager
+
+
+DOCUMENTS = [
+    "Color Style: Lawn\nDescription: Primary green #1B8751\n",
+    "Typography Style: Saans Bold\nDescription: Headline font\n",
+    "Email: Spring newsletter template example\n",
+]
+METADATAS = [
+    {"source": "figma", "type": "color", "name": "Lawn"},
+    {"source": "figma", "type": "typography", "name": "Saans Bold"},
+    {"source": "figma", "type": "example", "name": "Spring newsletter", "is_example": True, "example_type": "email"},
+]
+
+
+def test_snapshot_stale_for_other_version(tmp_path):
+    store = GuidelinesStore(str(tmp_path / "guidelines.json"))
+    assert store.get("v1") is None
+    
+    store.save({"collection_version": "v1", "brand_context": "colors"})
+    assert store.get("v1")["brand_context"] == "colors"
+    assert store.get("v2") is None
+    
+    # Survives a restart
+    assert GuidelinesStore(str(tmp_path / "guidelines.json")).get("v1")["brand_context"] == "colors"
+
+
+def test_unreadable_snapshot_ignored(tmp_path):
+    path = tmp_path / "guidelines.json"
+    path.write_text("{not json")
+    assert GuidelinesStore(str(path)).get("v1") is None
+
+
+@pytest.fixture
+def brand_analyzer(embedding_manager, tmp_path, monkeypatch):
+    retrieval_manager = RetrievalManager(embedding_manager)
+    
+    async def get_retrieval_manager_async():
+        return retrieval_manager
+    
+    async def get_embedding_manager_async():
+        return retrieval_manager.embedding_manager
+    
+    monkeypatch.setattr(analyzer, "guidelines_store", GuidelinesStore(str(tmp_path / "guidelines.json")))
+    monkeypatch.setattr(analyzer, "get_retrieval_manager", lambda: retrieval_manager)
+    monkeypatch.setattr(analyzer, "get_retrieval_manager_async", get_retrieval_manager_async)
+    monkeypatch.setattr(analyzer, "get_embedding_manager_async", get_embedding_manager_async)
+    
+    brand_analyzer = analyzer.BrandAnalyzer()
+    brand_analyzer.builds = 0
+    build = brand_analyzer._build_guidelines
+    
+    async def counting_build():
+        brand_analyzer.builds += 1
+        return await build()
+    
+    brand_analyzer._build_guidelines = counting_build
+    return brand_analyzer
+
+
+def test_snapshot_rebuilt_only_after_collection_changes(brand_analyzer):
+    async def scenario():
+        manager = await analyzer.get_embedding_manager_async()
+        await manager.add_documents(DOCUMENTS, METADATAS)
+        
+        first = await brand_analyzer.get_guidelines()
+        assert first["collection_version"] == manager.collection_version
+        assert "#1B8751" in first["brand_context"]
+        assert await brand_analyzer.get_guidelines() is first
+        assert brand_analyzer.builds == 1
+        
+        await manager.add_documents(
+            ["Color Style: Dusk\nDescription: Dark navy #232F46\n"],
+            [{"source": "figma", "type": "color", "name": "Dusk"}]
+        )
+        second = await brand_analyzer.get_guidelines()
+        assert brand_analyzer.builds == 2
+        assert second["collection_version"] == manager.collection_version != first["collection_version"]
+    
+    asyncio.run(scenario())
+
+
+def test_concurrent_requests_build_once(brand_analyzer):
+    async def scenario():
+        manager = await analyzer.get_embedding_manager_async()
+        await manager.add_documents(DOCUMENTS, METADATAS)
+        return await asyncio.gather(*(brand_analyzer.get_guidelines() for _ in range(5)))
+    
+    snapshots = asyncio.run(scenario())
+    assert brand_analyzer.builds == 1
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
@@ -0,0 +1,107 @@
+"""
+Tests for the embedding ingestion pipeline: retries, backoff and rate limiting.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from rag.ingestion import AdaptiveLimiter, IngestionPipeline
+
+
+class APIError(Exception):
+    """Stands in for an OpenAI API error carrying an HTTP status and headers."""
+    
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class APIConnectionError(Exception):
+    """Named like the OpenAI client's connection error, which has no status code."""
+
+
+class FlakyEmbedder:
+    """Fails with the given errors, in order, then embeds every text."""
+    
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+    
+    async def __call__(self, texts):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(IngestionPipeline, "_backoff", staticmethod(lambda attempt: sleeps.append(attempt) or 0.0))
+    return sleeps
+
+
+def _run(pipeline, documents):
+    written = []
+    
+    def write(docs, embeddings, metadatas, ids):
+        written.extend(zip(ids, embeddings))
+    
+    asyncio.run(pipeline.run(documents, [{} for _ in documents], [f"id{i}" for i in range(len(documents))], write))
+    return dict(written)
+
+
+def test_transient_errors_retried(no_backoff):
+    embed = FlakyEmbedder(APIError(503), APIConnectionError("reset"))
+    pipeline = IngestionPipeline(embed, max_concurrency=1, max_retries=3)
+    
+    assert _run(pipeline, ["a", "bb"]) == {"id0": [1.0], "id1": [2.0]}
+    assert embed.calls == 3
+    # Exponential backoff by attempt number
+    assert no_backoff == [0, 1]
+
+
+def test_client_errors_not_retried():
+    embed = FlakyEmbedder(APIError(400))
+    with pytest.raises(APIError):
+        _run(IngestionPipeline(embed, max_retries=3), ["a"])
+    assert embed.calls == 1
+
+
+def test_gives_up_after_max_retries():
+    embed = FlakyEmbedder(*(APIError(500) for _ in range(5)))
+    with pytest.raises(APIError):
+        _run(IngestionPipeline(embed, max_retries=2), ["a"])
+    assert embed.calls == 3
+
+
+def test_rate_limit_honours_retry_after(no_backoff):
+    embed = FlakyEmbedder(APIError(429, {"retry-after-ms": "20"}))
+    pipeline = IngestionPipeline(embed, max_concurrency=4, max_retries=1)
+    
+    assert _run(pipeline, ["a"]) == {"id0": [1.0]}
+    # The server's delay is used instead of the backoff schedule
+    assert no_backoff == []
+    assert IngestionPipeline._retry_after(APIError(429, {"retry-after": "2"})) == 2.0
+
+
+def test_limiter_halves_on_throttle_and_recovers():
+    async def scenario():
+        limiter = AdaptiveLimiter(8)
+        await limiter.throttle(0)
+        await limiter.throttle(0)
+        assert limiter.limit == 2
+        for _ in range(3):
+            await limiter.acquire()
+            await limiter.release(success=True)
+        return limiter.limit
+    
+    assert asyncio.run(scenario()) == 5
+
+
+def test_batches_bounded_by_items_and_tokens():
+    pipeline = IngestionPipeline(FlakyEmbedder(), batch_max_tokens=10, batch_max_items=3)
+    batches = pipeline.pack_batches(["one"] * 7 + ["word " * 20, "two"])
+    assert batches == [[0, 1, 2], [3, 4, 5], [6], [7], [8]]
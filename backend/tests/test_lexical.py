@@ -0,0 +1,75 @@
+"""
+Tests for the full-text index and its translation of ChromaDB metadata
+filters to SQL, checked against ChromaDB's own filtering.
+"""
+import chromadb
+import pytest
+
+from rag.lexical import LexicalIndex, where_sql
+
+
+METADATAS = [
+    {"source": "figma", "type": "color", "name": "Lawn", "is_example": False, "slide_number": 1},
+    {"source": "figma", "type": "component", "name": "Email hero", "is_example": True, "example_type": "email"},
+    {"source": "figma", "type": "component", "name": "Ad banner", "is_example": True, "example_type": "ad"},
+    {"source": "google_slides", "type": "slide", "name": "Brand deck", "slide_number": 3},
+    {"source": "google_slides", "type": "slide", "name": "Research", "slide_number": 7},
+]
+IDS = [f"doc{i}" for i in range(len(METADATAS))]
+DOCUMENTS = [f"Brand design document about {m['name']}" for m in METADATAS]
+
+FILTERS = [
+    {"source": "figma"},
+    {"is_example": True},
+    {"type": {"$ne": "slide"}},
+    {"type": {"$in": ["color", "slide"]}},
+    {"example_type": {"$nin": ["email"]}},
+    {"slide_number": {"$gte": 3}},
+    {"slide_number": {"$lt": 7}},
+    {"$and": [{"is_example": True}, {"example_type": "ad"}]},
+    {"$or": [{"type": "color"}, {"slide_number": {"$gt": 5}}]},
+    {"$and": [{"source": "google_slides"}, {"$or": [{"name": "Research"}, {"slide_number": 1}]}]},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    lexical_index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    lexical_index.upsert(IDS, DOCUMENTS, METADATAS)
+    yield lexical_index
+    lexical_index.close()
+
+
+@pytest.fixture(scope="module")
+def collection():
+    collection = chromadb.EphemeralClient().get_or_create_collection("where_sql_test")
+    collection.upsert(ids=IDS, documents=DOCUMENTS, metadatas=METADATAS, embeddings=[[1.0, 0.0]] * len(IDS))
+    return collection
+
+
+@pytest.mark.parametrize("where", FILTERS)
+def test_filter_matches_chromadb(index, collection, where):
+    expected = set(collection.get(where=where, include=[])["ids"])
+    assert set(index.search("brand design", top_k=10, where=where)["ids"]) == expected
+
+
+def test_unsupported_operator_rejected():
+    with pytest.raises(ValueError):
+        where_sql({"name": {"$contains": "Lawn"}})
+
+
+def test_empty_filter_matches_everything():
+    assert where_sql(None) == ("1", [])
+    assert where_sql({"type": {"$in": []}})[0] == "0"
+
+
+def test_limit_applies_after_filter(index):
+    # Only one document is a color; it is found even though four others rank alongside it
+    results = index.search("brand design document", top_k=1, where={"type": "color"})
+    assert results["ids"] == ["doc0"]
+
+
+def test_search_terms_and_phrases(index):
+    assert index.search("research", top_k=5)["ids"] == ["doc4"]
+    assert index.search("Email hero", top_k=5, phrase=True)["ids"] == ["doc1"]
+    assert index.search("hero email", top_k=5, phrase=True)["ids"] == []
@@ -0,0 +1,93 @@
+"""
+Tests for token-budgeted prompt assembly.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from rag.prompt import PromptBuilder, PromptTooLongError
+from rag.tokenizer import count_tokens
+
+
+INSTRUCTIONS = "You are a helpful design system assistant."
+
+
+def _words(count: int, word: str = "token") -> str:
+    return " ".join([word] * count)
+
+
+def _prompt_tokens(messages) -> int:
+    return sum(count_tokens(message["content"]) + 4 for message in messages)
+
+
+def test_long_message_sent_in_full():
+    message = _words(400)
+    prompt = PromptBuilder(INSTRUCTIONS, budget=count_tokens(INSTRUCTIONS) + count_tokens(message) + 50)
+    prompt.add_section("Relevant information: " + _words(200, "context"))
+    prompt.add_history([{"role": "user", "content": _words(100, "earlier")}])
+    
+    messages = prompt.build(message)
+    
+    # History and context shrink to make room; the message is untouched
+    assert messages[-1] == {"role": "user", "content": message}
+    assert [m["role"] for m in messages] == ["system", "user"]
+    assert count_tokens(messages[0]["content"]) <= count_tokens(INSTRUCTIONS) + 50
+
+
+def test_message_over_budget_rejected():
+    prompt = PromptBuilder(INSTRUCTIONS, budget=100)
+    with pytest.raises(PromptTooLongError):
+        prompt.build(_words(200))
+
+
+def test_chat_endpoint_rejects_message_over_budget():
+    message = main.ChatMessage(message=_words(main.settings.prompt_token_budget + 1))
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(main.chat_simple(message, current_user={"email": "test@example.com"}))
+    assert raised.value.status_code == 413
+
+
+def test_sections_allocated_by_priority():
+    budget = 300
+    prompt = PromptBuilder(INSTRUCTIONS, budget=budget)
+    allowances = []
+    
+    def context(allowance):
+        allowances.append(allowance)
+        return _words(1000, "context")
+    
+    # Added first but allocated last
+    prompt.add_section(_words(1000, "files"), max_tokens=40)
+    prompt.add_section(context, priority=1)
+    messages = prompt.build("What is Lawn?")
+    system = messages[0]["content"]
+    
+    files_tokens = count_tokens(system.split("\n\n")[1])
+    assert files_tokens <= 40
+    # The context gets what the capped section left over
+    assert allowances and allowances[0] <= budget - files_tokens
+    assert system.index("files") < system.index("context")
+    assert _prompt_tokens(messages) <= budget + 4
+
+
+def test_history_keeps_newest_messages():
+    history = [
+        {"role": "user", "content": _words(30, "oldest")},
+        {"role": "assistant", "content": _words(30, "older")},
+        {"role": "user", "content": _words(30, "newest")},
+    ]
+    prompt = PromptBuilder(INSTRUCTIONS, budget=1000)
+    prompt.add_history(history, max_tokens=count_tokens(history[-1]["content"]) * 2 + 8)
+    
+    messages = prompt.build("And now?")
+    
+    assert [m["content"] for m in messages[1:-1]] == [history[1]["content"], history[2]["content"]]
+
+
+def test_static_instructions_come_first():
+    first = PromptBuilder(INSTRUCTIONS).add_section("User: A").build("hi")
+    second = PromptBuilder(INSTRUCTIONS).add_section("User: B").build("hello")
+    assert first[0]["content"].startswith(INSTRUCTIONS)
+    assert second[0]["content"].startswith(INSTRUCTIONS)
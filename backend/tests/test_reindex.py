@@ -0,0 +1,272 @@
+"""
+Tests for shadow-collection reindexes, including several processes sharing
+one persist directory (replicas on a shared volume, the snapshot CLI).
+"""
+import asyncio
+import os
+
+import pytest
+
+from config import settings
+from rag.embeddings import LEGACY_COLLECTION_NAME, EmbeddingManager
+from rag.providers import OPENAI_EMBEDDING_DIMENSIONS, OpenAIEmbeddingProvider
+from rag.retrieval import RetrievalManager
+
+
+DOCUMENTS = [
+    "Color Style: Lawn\nDescription: Primary green #1B8751\n",
+    "Color Style: Dusk\nDescription: Dark navy #232F46\n",
+    "Typography Style: Saans Bold\n",
+    "Component: Button/Primary\nDescription: Main call to action\n",
+    "Component: chat-right\nDescription: Chat icon\n",
+]
+METADATAS = [
+    {"source": "figma", "type": "color", "name": "Lawn", "file_key": "f", "style_id": "1"},
+    {"source": "figma", "type": "color", "name": "Dusk", "file_key": "f", "style_id": "2"},
+    {"source": "figma", "type": "typography", "name": "Saans Bold", "file_key": "f", "style_id": "3"},
+    {"source": "figma", "type": "component", "name": "Button/Primary", "file_key": "f", "component_id": "4"},
+    {"source": "figma", "type": "component", "name": "chat-right", "file_key": "f", "component_id": "5"},
+]
+
+
+@pytest.fixture
+def new_manager(embedding_manager_factory, monkeypatch):
+    """Opens a manager as another process would: its own client and view of the alias."""
+    monkeypatch.setattr(settings, "reindex_gc_grace_seconds", 0)
+    return embedding_manager_factory
+
+
+def _collection_names(manager: EmbeddingManager):
+    return {c if isinstance(c, str) else c.name for c in manager.chroma_client.list_collections()}
+
+
+async def _reindex(manager: EmbeddingManager, documents=DOCUMENTS, metadatas=METADATAS) -> None:
+    async with manager.rebuild():
+        await manager.add_documents(documents, metadatas)
+    await manager.wait_for_garbage_collection()
+
+
+def test_rebuild_swaps_in_new_generation(new_manager):
+    a = new_manager()
+    asyncio.run(a.add_documents(DOCUMENTS, METADATAS))
+    old_name = a.live_collection_name
+    old_version = a.collection_version
+    
+    renamed = [doc.replace("Lawn", "Meadow") for doc in DOCUMENTS]
+    asyncio.run(_reindex(a, renamed))
+    
+    assert a.live_collection_name != old_name
+    assert a.collection_version != old_version
+    assert a.design_collection.count() == len(DOCUMENTS)
+    results = asyncio.run(RetrievalManager(a).search("Meadow", top_k=1))
+    assert "Meadow" in results['documents'][0]
+    
+    # The old generation and its full-text index are gone after the grace period
+    assert old_name not in _collection_names(a)
+    assert not os.path.exists(a._lexical_path(old_name))
+    assert not os.path.exists(a._shadow_marker_path(a.live_collection_name))
+
+
+def test_failed_rebuild_leaves_live_collection(new_manager, tmp_path):
+    a = new_manager()
+    asyncio.run(a.add_documents(DOCUMENTS, METADATAS))
+    live = a.live_collection_name
+    
+    async def scenario():
+        async with a.rebuild():
+            await a.add_documents(DOCUMENTS[:2], METADATAS[:2])
+            raise ValueError("Figma sync failed")
+    
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+    
+    assert a.live_collection_name == live
+    assert not a.rebuilding
+    assert _collection_names(a) == {live}
+    assert a.design_collection.count() == len(DOCUMENTS)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".shadow")]
+
+
+def test_rebuild_rejected_when_much_smaller(new_manager):
+    a = new_manager()
+    asyncio.run(a.add_documents(DOCUMENTS, METADATAS))
+    live = a.live_collection_name
+    
+    with pytest.raises(RuntimeError, match="fewer than"):
+        asyncio.run(_reindex(a, DOCUMENTS[:1], METADATAS[:1]))
+    assert a.live_collection_name == live
+    assert _collection_names(a) == {live}
+
+
+def test_rebuild_rejected_when_empty(new_manager):
+    a = new_manager()
+    with pytest.raises(RuntimeError, match="empty"):
+        asyncio.run(_reindex(a, [], []))
+
+
+class MismatchedIndex:
+    """A full-text index that missed some of the documents."""
+    
+    def count(self):
+        return 1
+
+
+def test_validation_checks_full_text_index(new_manager):
+    a = new_manager()
+    asyncio.run(a.add_documents(DOCUMENTS, METADATAS))
+    with pytest.raises(RuntimeError, match="Full-text index"):
+        a.validate_generation(a.design_collection, MismatchedIndex())
+
+
+class UnsearchableCollection:
+    """A collection whose vector index lost its entries: documents are stored but never found."""
+    
+    def __init__(self, collection):
+        self._collection = collection
+    
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+    
+    def query(self, query_embeddings, n_results, include):
+        return {"ids": [[] for _ in query_embeddings], "distances": [[] for _ in query_embeddings]}
+
+
+def test_validation_spot_checks_vectors(new_manager):
+    a = new_manager()
+    asyncio.run(a.add_documents(DOCUMENTS, METADATAS))
+    a.validate_generation(a.design_collection, a.lexical_index)
+    
+    with pytest.raises(RuntimeError, match="spot-check"):
+        a.validate_generation(UnsearchableCollection(a.design_collection), a.lexical_index)
+
+
+def test_other_process_follows_swap(new_manager):
+    a = new_manager()
+    b = new_manager()
+    asyncio.run(a.add_documents(DOCUMENTS, METADATAS))
+    old_name = b.live_collection_name
+    
+    # A reindexes and removes the generation B was reading
+    asyncio.run(_reindex(a))
+    assert old_name not in _collection_names(a)
+    assert b.live_collection_name == old_name
+    
+    # B's next query switches to the new generation instead of failing
+    results = asyncio.run(RetrievalManager(b).search("Lawn green", top_k=2))
+    assert b.live_collection_name == a.live_collection_name
+    assert results['ids']
+    
+    # So do B's writes, and A sees them
+    asyncio.run(b.add_documents(["Color Style: Pine\n"], [{"source": "figma", "type": "color", "name": "Pine", "file_key": "f", "style_id": "6"}]))
+    assert a.design_collection.count() == len(DOCUMENTS) + 1
+
+
+def test_collection_version_follows_other_process(new_manager):
+    a = new_manager()
+    b = new_manager()
+    asyncio.run(a.add_documents(DOCUMENTS, METADATAS))
+    assert b.collection_version == a.collection_version
+    
+    asyncio.run(_reindex(a))
+    assert b.collection_version == a.collection_version
+
+
+def test_gc_keeps_other_process_reindex(new_manager):
+    a = new_manager()
+    b = new_manager()
+    asyncio.run(a.add_documents(DOCUMENTS, METADATAS))
+    
+    async def scenario():
+        async with b.rebuild():
+            await b.add_documents(DOCUMENTS, METADATAS)
+            shadow = b._shadow[0]
+            
+            # A swaps and collects garbage, and a third process starts up, mid-reindex
+            await _reindex(a)
+            new_manager()
+            assert shadow in _collection_names(a)
+        await b.wait_for_garbage_collection()
+        return shadow
+    
+    shadow = asyncio.run(scenario())
+    
+    # B's reindex went live, A's generation was removed once the alias moved on
+    assert a.follow_alias()
+    assert a.live_collection_name == shadow
+    generations = {name for name in _collection_names(a) if name.startswith(a.collection_name)}
+    assert generations == {shadow}
+
+
+def test_gc_removes_abandoned_reindex(new_manager, monkeypatch):
+    a = new_manager()
+    asyncio.run(a.add_documents(DOCUMENTS, METADATAS))
+    
+    # A reindex whose process died before swapping it in
+    name, _, lexical_index = a._create_generation()
+    lexical_index.close()
+    assert a.collect_garbage() == []
+    
+    monkeypatch.setattr(settings, "reindex_shadow_max_age_seconds", 0)
+    assert a.collect_garbage() == [name]
+    assert not os.path.exists(a._shadow_marker_path(name))
+
+
+def test_clear_refused_during_reindex(new_manager):
+    a = new_manager()
+    asyncio.run(a.add_documents(DOCUMENTS, METADATAS))
+    
+    async def scenario():
+        async with a.rebuild():
+            await a.add_documents(DOCUMENTS[:2], METADATAS[:2])
+            shadow = a._shadow[0]
+            with pytest.raises(RuntimeError):
+                await a.clear_collection()
+            # Later writes still go to the shadow
+            await a.add_documents(DOCUMENTS[2:], METADATAS[2:])
+        return shadow
+    
+    shadow = asyncio.run(scenario())
+    assert a.live_collection_name == shadow
+    assert a.design_collection.count() == len(DOCUMENTS)
+
+
+def _legacy_collection(manager: EmbeddingManager, dimensions: int):
+    """The single collection an index built before per-model collections has."""
+    collection = manager.chroma_client.get_or_create_collection(LEGACY_COLLECTION_NAME)
+    collection.upsert(
+        ids=[f"legacy{i}" for i in range(len(DOCUMENTS))],
+        documents=DOCUMENTS,
+        # Older ingestion stored is_example as a string
+        metadatas=[{**m, "is_example": str(m["type"] == "component")} for m in METADATAS],
+        embeddings=[[float(i + 1)] + [0.0] * (dimensions - 1) for i in range(len(DOCUMENTS))]
+    )
+    return collection
+
+
+def test_legacy_collection_adopted(new_manager):
+    _legacy_collection(new_manager(), OPENAI_EMBEDDING_DIMENSIONS[settings.embedding_model])
+    
+    manager = new_manager(provider=OpenAIEmbeddingProvider())
+    assert manager.live_collection_name == LEGACY_COLLECTION_NAME
+    assert manager.design_collection.count() == len(DOCUMENTS)
+    
+    # Other processes follow it too
+    assert new_manager(provider=OpenAIEmbeddingProvider()).live_collection_name == LEGACY_COLLECTION_NAME
+    
+    # Its string is_example flags are converted so example filters match them
+    examples = manager.design_collection.get(where={"is_example": True}, include=["metadatas"])
+    assert sorted(m["name"] for m in examples["metadatas"]) == ["Button/Primary", "chat-right"]
+    assert manager.design_collection.get(where={"is_example": False}, include=[])["ids"]
+    assert not manager.design_collection.get(where={"is_example": {"$in": ["True", "False"]}}, include=[])["ids"]
+
+
+def test_legacy_collection_removed_after_resync(new_manager):
+    # Vectors from another model can't be served by this one
+    a = new_manager()
+    _legacy_collection(a, 32)
+    a = new_manager()
+    assert a.live_collection_name == a.collection_name
+    assert a.design_collection.count() == 0
+    
+    asyncio.run(_reindex(a))
+    assert LEGACY_COLLECTION_NAME not in _collection_names(a)
@@ -0,0 +1,86 @@
+"""
+Tests for maximal marginal relevance reranking.
+"""
+import asyncio
+
+import pytest
+
+from rag.rerank import mmr_select
+from rag.retrieval import RetrievalManager
+
+
+def test_pure_relevance_keeps_retrieval_order():
+    embeddings = [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]
+    assert mmr_select(embeddings, 3, lambda_mult=1.0, duplicate_threshold=1.1) == [0, 1, 2]
+
+
+def test_near_duplicates_dropped():
+    embeddings = [[1.0, 0.0], [0.999, 0.01], [0.0, 1.0], [1.0, 0.001]]
+    assert mmr_select(embeddings, 4, lambda_mult=0.7, duplicate_threshold=0.95) == [0, 2]
+
+
+def test_diversity_promotes_different_documents():
+    # The second candidate is close to the first but not a duplicate
+    embeddings = [[1.0, 0.0, 0.0], [0.9, 0.3, 0.0], [0.0, 0.0, 1.0]]
+    assert mmr_select(embeddings, 2, lambda_mult=0.5, duplicate_threshold=0.99) == [0, 2]
+    assert mmr_select(embeddings, 2, lambda_mult=1.0, duplicate_threshold=0.99) == [0, 1]
+
+
+def test_empty_and_zero_vectors():
+    assert mmr_select([], 3) == []
+    assert mmr_select([[1.0, 0.0]], 0) == []
+    assert mmr_select([[0.0, 0.0], [1.0, 0.0]], 2, lambda_mult=0.7, duplicate_threshold=0.95) == [0, 1]
+
+
+PAGE = "Lawn #1B8751 is the primary brand green used for buttons and links."
+DOCUMENTS = [PAGE, PAGE + " ", "Dusk #232F46 is the dark navy used for text.", "Saans is the headline typeface."]
+
+
+@pytest.fixture
+def retrieval_manager(embedding_manager):
+    retrieval_manager = RetrievalManager(embedding_manager)
+    metadatas = [{"source": "figma", "type": "page", "name": f"chunk {i}"} for i in range(len(DOCUMENTS))]
+    asyncio.run(retrieval_manager.embedding_manager.add_documents(DOCUMENTS, metadatas))
+    return retrieval_manager
+
+
+def _record_gets(retrieval_manager, monkeypatch):
+    fetched = []
+    collection = retrieval_manager.collection
+    get = collection.get
+    
+    def recording_get(*args, **kwargs):
+        fetched.append(kwargs.get("ids"))
+        return get(*args, **kwargs)
+    
+    monkeypatch.setattr(collection, "get", recording_get)
+    return fetched
+
+
+def test_search_diverse_drops_duplicate_chunks(retrieval_manager, monkeypatch):
+    fetched = _record_gets(retrieval_manager, monkeypatch)
+    results = asyncio.run(retrieval_manager.search_diverse("primary brand green for buttons", top_k=3))
+    
+    names = [m['name'] for m in results['metadatas']]
+    assert len(names) == 3
+    assert len({"chunk 0", "chunk 1"} & set(names)) == 1
+    assert 'embeddings' not in results
+    
+    # Every candidate came back from the vector query with its embedding
+    assert fetched == []
+
+
+def test_search_diverse_fetches_only_full_text_hits(retrieval_manager, monkeypatch):
+    vector_search = retrieval_manager._vector_search
+    
+    async def first_two(query, top_k, filter_dict, include):
+        results = await vector_search(query, top_k, filter_dict, include)
+        return {field: values[:2] for field, values in results.items()}
+    
+    monkeypatch.setattr(retrieval_manager, "_vector_search", first_two)
+    fetched = _record_gets(retrieval_manager, monkeypatch)
+    asyncio.run(retrieval_manager.search_diverse("primary brand green used for text", top_k=3))
+    
+    vector_ids = set(asyncio.run(first_two("primary brand green used for text", 10, None, ["documents"]))['ids'])
+    assert len(fetched) == 1
+    assert fetched[0] and not set(fetched[0]) & vector_ids
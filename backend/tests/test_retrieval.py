@@ -0,0 +1,126 @@
+"""
+Tests for hybrid retrieval, filtered searches and reranking.
+"""
+import asyncio
+
+import pytest
+
+from config import settings
+from rag.retrieval import RetrievalManager
+
+
+EXAMPLES = [
+    ("Email: Spring newsletter template example", "email"),
+    ("Email: Neighbor welcome design", "email"),
+    ("Ad: Local business ad design template", "ad"),
+    ("Ad: Holiday promotion example", "ad"),
+    ("Email: Event invitation template", "email"),
+]
+
+
+class CountingCollection:
+    """Wraps a ChromaDB collection and records each call made to it."""
+    
+    def __init__(self, collection):
+        self._collection = collection
+        self.calls = []
+    
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if name in ("get", "query"):
+            def call(*args, **kwargs):
+                self.calls.append(name)
+                return attribute(*args, **kwargs)
+            return call
+        return attribute
+
+
+@pytest.fixture
+def retrieval_manager(embedding_manager):
+    return RetrievalManager(embedding_manager)
+
+
+def _add_examples(retrieval_manager):
+    documents = [document for document, _ in EXAMPLES] + ["Color Style: Lawn\n"]
+    metadatas = [
+        {"source": "figma", "type": "example", "name": f"example {i}", "is_example": True, "example_type": example_type}
+        for i, (_, example_type) in enumerate(EXAMPLES)
+    ] + [{"source": "figma", "type": "color", "name": "Lawn"}]
+    asyncio.run(retrieval_manager.embedding_manager.add_documents(documents, metadatas))
+
+
+def _results(ids, distances=None):
+    return {
+        'ids': ids,
+        'documents': [f"doc {doc_id}" for doc_id in ids],
+        'metadatas': [{"name": doc_id} for doc_id in ids],
+        'distances': distances or [None] * len(ids)
+    }
+
+
+def test_rrf_ranks_documents_found_by_both_searches_first(retrieval_manager):
+    vector = _results(["a", "b", "c"], [0.1, 0.2, 0.3])
+    lexical = _results(["c", "d"])
+    
+    fused = retrieval_manager._fuse(vector, lexical, top_k=4)
+    
+    # c: 1/63 + 1/61 beats a: 1/61, b: 1/62 and d: 1/62
+    assert fused['ids'] == ["c", "a", "b", "d"]
+    assert fused['distances'] == [0.3, 0.1, 0.2, None]
+    assert fused['metadatas'][0] == {"name": "c"}
+    assert retrieval_manager._fuse(vector, lexical, top_k=2)['ids'] == ["c", "a"]
+
+
+def test_rrf_constant(retrieval_manager, monkeypatch):
+    # A small k rewards the top of each list more than agreement lower down
+    monkeypatch.setattr(settings, "rrf_k", 0)
+    fused = retrieval_manager._fuse(_results(["a", "b", "c"]), _results(["x", "y", "c"]), top_k=3)
+    assert fused['ids'] == ["a", "x", "c"]
+
+
+def test_hybrid_search_finds_exact_terms(retrieval_manager):
+    documents = [f"Component: Card/{i}\nDescription: Content card variant {i}\n" for i in range(20)]
+    documents.append("Typography Style: Saans Bold\nDescription: Headline font\n")
+    metadatas = [{"source": "figma", "type": "component", "name": f"Card/{i}"} for i in range(20)]
+    metadatas.append({"source": "figma", "type": "typography", "name": "Saans Bold"})
+    asyncio.run(retrieval_manager.embedding_manager.add_documents(documents, metadatas))
+    
+    results = asyncio.run(retrieval_manager.search("which headline font is Saans", top_k=3))
+    assert results['metadatas'][0]['name'] == "Saans Bold"
+    
+    filtered = asyncio.run(retrieval_manager.search("Saans headline card", top_k=3, filter_dict={"type": "component"}))
+    assert {m['type'] for m in filtered['metadatas']} == {"component"}
+
+
+def _counting(retrieval_manager, monkeypatch):
+    collection = CountingCollection(retrieval_manager.embedding_manager.design_collection)
+    monkeypatch.setattr(type(retrieval_manager), "collection", property(lambda self: collection))
+    return collection
+
+
+def test_examples_for_every_type_in_one_call(retrieval_manager, monkeypatch):
+    _add_examples(retrieval_manager)
+    collection = _counting(retrieval_manager, monkeypatch)
+    
+    email, ad = asyncio.run(retrieval_manager.search_examples_many(["email", "ad"], top_k=2))
+    
+    assert collection.calls == ["get"]
+    assert len(email['ids']) == 2 and len(ad['ids']) == 2
+    assert {m['example_type'] for m in email['metadatas']} == {"email"}
+    assert {m['example_type'] for m in ad['metadatas']} == {"ad"}
+    assert email['distances'] == sorted(email['distances'])
+    
+    # Same ranking as searching each type on its own
+    assert asyncio.run(retrieval_manager.search_examples("email", top_k=2))['ids'] == email['ids']
+
+
+def test_examples_fall_back_to_filtered_queries(retrieval_manager, monkeypatch):
+    _add_examples(retrieval_manager)
+    monkeypatch.setattr(settings, "filtered_search_exact_max", 2)
+    collection = _counting(retrieval_manager, monkeypatch)
+    
+    email, ad = asyncio.run(retrieval_manager.search_examples_many(["email", "ad"], top_k=2))
+    
+    assert len(email['ids']) == 2 and len(ad['ids']) == 2
+    assert {m['example_type'] for m in ad['metadatas']} == {"ad"}
+    assert collection.calls[0] == "get"
@@ -0,0 +1,94 @@
+"""
+Tests for vector store snapshot export and import.
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from config import settings
+from rag.snapshot import export_snapshot, import_snapshot, read_header, read_snapshot
+
+
+DOCUMENTS = [
+    "Color Style: Lawn\nDescription: Primary green #1B8751\n",
+    "Color Style: Dusk\nDescription: Dark navy #232F46\n",
+    "Typography Style: Saans Bold\n",
+]
+METADATAS = [
+    {"source": "figma", "type": "color", "name": "Lawn"},
+    {"source": "figma", "type": "color", "name": "Dusk"},
+    {"source": "figma", "type": "typography", "name": "Saans Bold"},
+]
+
+
+@pytest.fixture
+def source(embedding_manager_factory, monkeypatch):
+    monkeypatch.setattr(settings, "reindex_gc_grace_seconds", 0)
+    manager = embedding_manager_factory(directory="source")
+    asyncio.run(manager.add_documents(DOCUMENTS, METADATAS))
+    return manager
+
+
+def _contents(manager):
+    stored = manager.design_collection.get(include=["embeddings", "documents", "metadatas"])
+    return {
+        doc_id: (document, metadata, np.asarray(embedding, dtype=np.float32).tolist())
+        for doc_id, document, metadata, embedding in zip(
+            stored['ids'], stored['documents'], stored['metadatas'], stored['embeddings']
+        )
+    }
+
+
+def test_round_trip(source, embedding_manager_factory, tmp_path):
+    path = str(tmp_path / "index.snapshot")
+    header = export_snapshot(path, source)
+    assert header["count"] == len(DOCUMENTS)
+    assert header["dimensions"] == 64
+    assert read_header(path)[0] == header
+    
+    # A fresh container loads it without embedding anything
+    target = embedding_manager_factory(directory="target")
+    target.provider.embed = None
+    asyncio.run(import_snapshot(path, target))
+    
+    assert _contents(target) == _contents(source)
+    assert target.lexical_index.count() == len(DOCUMENTS)
+    assert len(target.embedding_cache.get_many(target.model_id, DOCUMENTS)) == len(DOCUMENTS)
+
+
+def test_corrupted_snapshot_rejected(source, tmp_path):
+    path = tmp_path / "index.snapshot"
+    export_snapshot(str(path), source)
+    data = bytearray(path.read_bytes())
+    data[-10] ^= 0xFF
+    path.write_bytes(bytes(data))
+    
+    with pytest.raises(ValueError, match="checksum"):
+        read_snapshot(str(path))
+
+
+def test_truncated_snapshot_rejected(source, tmp_path):
+    path = tmp_path / "index.snapshot"
+    export_snapshot(str(path), source)
+    path.write_bytes(path.read_bytes()[:-10])
+    
+    with pytest.raises(ValueError, match="truncated"):
+        read_snapshot(str(path))
+
+
+def test_not_a_snapshot_rejected(tmp_path):
+    path = tmp_path / "index.snapshot"
+    path.write_bytes(b"not a snapshot at all")
+    with pytest.raises(ValueError, match="not a vector store snapshot"):
+        read_header(str(path))
+
+
+def test_other_model_rejected(source, embedding_manager_factory, tmp_path):
+    path = str(tmp_path / "index.snapshot")
+    export_snapshot(path, source)
+    
+    target = embedding_manager_factory(dim=32, directory="target")
+    with pytest.raises(ValueError, match="configured embedding model"):
+        asyncio.run(import_snapshot(path, target))
+    assert target.design_collection.count() == 0
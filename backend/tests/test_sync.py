@@ -0,0 +1,159 @@
+"""
+Regression tests for the Figma and Google Slides sync endpoints.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from googleapiclient.errors import HttpError
+
+import main
+from integrations.google_slides import GoogleSlidesClient, SlidesListingError
+
+
+TEAM_FILES = [
+    {
+        "key": f"file{i}",
+        "name": f"Brand File {i}",
+        "project": "Brand",
+        "url": f"https://www.figma.com/file/file{i}",
+        "last_modified": "2024-01-01T00:00:00Z"
+    }
+    for i in range(3)
+]
+
+
+class FakeFigmaClient:
+    """Serves a fixed team file list instead of calling the Figma API."""
+    
+    def __init__(self, files):
+        self.files = files
+    
+    def get_all_team_files_with_metadata(self, team_id=None):
+        return self.files
+
+
+class FakeSlidesClient:
+    """Serves a fixed presentation listing, or fails the way the Drive listing can."""
+    
+    def __init__(self, presentations=None, error=None):
+        self.presentations = presentations or []
+        self.error = error
+    
+    def get_all_presentations_content(self, folder_id=None):
+        if self.error:
+            raise self.error
+        return self.presentations
+
+
+PRESENTATION = {
+    "presentation_id": "deck1",
+    "name": "Brand Research",
+    "web_view_link": "https://docs.google.com/presentation/d/deck1",
+    "slides": [{"slide_number": 1, "texts": ["Neighbors trust local recommendations"], "speaker_notes": ""}]
+}
+
+
+def _file_metadata_count() -> int:
+    collection = main.get_embedding_manager().design_collection
+    return len(collection.get(where={"type": "file_metadata"}, include=[])["ids"])
+
+
+def _sync(monkeypatch, files):
+    monkeypatch.setattr(main, "get_figma_client", lambda: FakeFigmaClient(files))
+    return asyncio.run(main.sync_figma(main.SyncRequest(), current_user={"email": "test@example.com"}))
+
+
+def test_resync_keeps_file_metadata(monkeypatch):
+    _sync(monkeypatch, TEAM_FILES)
+    assert _file_metadata_count() == len(TEAM_FILES)
+    
+    # Unchanged files are skipped but their entries must survive the prune
+    _sync(monkeypatch, TEAM_FILES)
+    assert _file_metadata_count() == len(TEAM_FILES)
+    
+    # Renaming a file updates its entry in place
+    renamed = [dict(TEAM_FILES[0], name="Renamed", last_modified="2024-02-01T00:00:00Z")] + TEAM_FILES[1:]
+    _sync(monkeypatch, renamed)
+    assert _file_metadata_count() == len(TEAM_FILES)
+    
+    # Removed files are pruned
+    _sync(monkeypatch, TEAM_FILES[1:])
+    assert _file_metadata_count() == len(TEAM_FILES) - 1
+
+
+
+def _slide_count() -> int:
+    collection = main.get_embedding_manager().design_collection
+    return len(collection.get(where={"source": "google_slides"}, include=[])["ids"])
+
+
+def _sync_slides(monkeypatch, client):
+    monkeypatch.setattr(main, "get_google_slides_client", lambda: client)
+    return asyncio.run(main.sync_slides(main.SyncRequest(), current_user={"email": "test@example.com"}))
+
+
+def test_empty_slides_listing_keeps_documents(monkeypatch):
+    _sync_slides(monkeypatch, FakeSlidesClient([PRESENTATION]))
+    assert _slide_count() == 1
+    
+    _sync_slides(monkeypatch, FakeSlidesClient([]))
+    assert _slide_count() == 1
+
+
+def test_failed_slides_listing_keeps_documents(monkeypatch):
+    _sync_slides(monkeypatch, FakeSlidesClient([PRESENTATION]))
+    
+    with pytest.raises(HTTPException) as raised:
+        _sync_slides(monkeypatch, FakeSlidesClient(error=SlidesListingError("Drive is down")))
+    assert raised.value.status_code == 502
+    assert _slide_count() == 1
+
+
+class FakeDriveService:
+    """Drive files().list that pages its results and fails for one folder."""
+    
+    def __init__(self, failing_folder=None):
+        self.failing_folder = failing_folder
+        self.params = {}
+    
+    def files(self):
+        return self
+    
+    def list(self, **params):
+        self.params = params
+        return self
+    
+    def execute(self):
+        if self.failing_folder and f"'{self.failing_folder}' in parents" in self.params["q"]:
+            raise HttpError(SimpleNamespace(status=500, reason="Backend Error"), b"{}")
+        if "folder" in self.params["q"]:
+            if "'root' in parents" in self.params["q"]:
+                return {"files": [{"id": "sub", "name": "Research"}]}
+            return {"files": []}
+        # Two pages of presentations per folder
+        if self.params.get("pageToken"):
+            return {"files": [{"id": "second", "name": "Second"}]}
+        return {"files": [{"id": "first", "name": "First"}], "nextPageToken": "page2"}
+
+
+def _slides_client(drive_service):
+    client = GoogleSlidesClient.__new__(GoogleSlidesClient)
+    client.credentials_path = "credentials.json"
+    client.drive_service = drive_service
+    return client
+
+
+def test_listing_follows_every_page_and_folder():
+    presentations = _slides_client(FakeDriveService()).list_presentations_in_folder("root")
+    assert [p["id"] for p in presentations] == ["first", "second", "first", "second"]
+
+
+def test_listing_errors_raised():
+    with pytest.raises(SlidesListingError):
+        _slides_client(None).list_presentations_in_folder("root")
+    
+    # A subfolder that can't be listed would hide its decks
+    with pytest.raises(SlidesListingError):
+        _slides_client(FakeDriveService(failing_folder="sub")).list_presentations_in_folder("root")